@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark of JSON decoding and encoding paths on synthetic payload resembling response of DSM 'VolumeList' endpoint.
+Compares decoding via requests-style 'resp.json()' (bytes -> str -> objects) with decoding directly from response bytes
+by every installed codec, building of VolumeCollection from decoded payload and encoding of CLI json output.
+
+Usage: python3 benchmarks/codec_benchmark.py [-n VOLUMES] [-r REPEAT]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dell_storage_api import codec  # noqa: E402  # pylint: disable=C0413
+from dell_storage_api.storage_center import StorageCenter  # noqa: E402  # pylint: disable=C0413
+from dell_storage_api.transport import MemoryTransport  # noqa: E402  # pylint: disable=C0413
+
+
+def synthetic_volumes(count: int) -> List[Dict[str, Any]]:
+    """
+    Generate raw volume records with attributes typically returned by DSM
+    :param count: Number of volumes
+    :return: List of raw volume records
+    """
+    return [{'instanceId': '64702.%d' % index,
+             'instanceName': 'volume-%06d' % index,
+             'name': 'volume-%06d' % index,
+             'objectType': 'ScVolume',
+             'scName': 'sc1',
+             'scSerialNumber': 64702,
+             'deviceId': '6000d31000fcbe000000000000%06d' % index,
+             'status': 'Up',
+             'active': True,
+             'inRecycleBin': False,
+             'configuredSize': '%d Bytes' % (index * 1073741824),
+             'volumeFolder': {'instanceId': '64702.%d' % (index % 500), 'instanceName': 'folder-%d' % (index % 500),
+                              'objectType': 'ScVolumeFolder'},
+             'storageCenter': {'instanceId': '64702', 'instanceName': 'sc1', 'objectType': 'StorageCenter'}}
+            for index in range(count)]
+
+
+def measure(function: Callable[[], Any], repeat: int) -> float:
+    """
+    Return the best duration of the function out of 'repeat' runs
+    :param function: Measured function
+    :param repeat: Number of runs
+    :return: Duration in seconds
+    """
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='JSON codec benchmark')
+    parser.add_argument('-n', '--volumes', type=int, default=50000, help='Number of volumes in payload')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='Number of runs of every benchmark')
+    args = parser.parse_args()
+
+    volumes = synthetic_volumes(args.volumes)
+    payload = json.dumps(volumes).encode()
+    storage = StorageCenter(MemoryTransport(), 'https://dsm/api/rest', 'sc1', '64702', '64702', '127.0.0.1')
+    rows = [{'name': volume['name'], 'instanceId': volume['instanceId'], 'status': volume['status']}
+            for volume in volumes]
+    print("Payload: %d volumes, %.1f MB" % (args.volumes, len(payload) / 1024 ** 2))
+
+    results = [('decode', 'resp.json() (bytes -> str -> json)',
+                measure(lambda: json.loads(payload.decode('utf-8')), args.repeat))]
+    for name in codec.available_codecs():
+        selected = codec.get_codec(name)
+        results.append(('decode', '%s from bytes' % name, measure(lambda: selected.loads(payload), args.repeat)))
+    decoded = codec.loads(payload)
+    build = storage._build_volume_collection  # pylint: disable=W0212
+    results.append(('build', 'VolumeCollection', measure(lambda: build(decoded), args.repeat)))
+    for name in sorted(codec.available_codecs(), key=lambda name: name != codec.STDLIB):
+        selected = codec.get_codec(name)
+        results.append(('encode', '%s (CLI json output)' % name, measure(lambda: selected.dumps(rows), args.repeat)))
+
+    # Speedup is relative to the first (standard library) path of every operation
+    baseline: Dict[str, float] = {}
+    for operation, path, duration in results:
+        baseline.setdefault(operation, duration)
+        print("%-7s %-40s %8.1f ms  %5.2fx" % (operation, path, duration * 1000, baseline[operation] / duration))
+
+
+if __name__ == '__main__':
+    main()
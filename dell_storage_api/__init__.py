@@ -1,2 +1,3 @@
 from dell_storage_api.session import DsmSession
 from dell_storage_api.storage_center import StorageCenterCollection, StorageCenter
+from dell_storage_api.resolver import NameResolver
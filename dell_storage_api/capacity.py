@@ -0,0 +1,203 @@
+"""
+This module contains classes for capacity reporting of volumes in Storage Centers managed by Dell Storage Manager.
+Usage data are stored in array-backed columns (one value per volume) and aggregated per Storage Center, volume folder
+or server. If numpy is installed, aggregation is vectorized, otherwise it falls back to pure python summation.
+"""
+import re
+from array import array
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy  # type: ignore
+except ImportError:  # pragma: no cover
+    numpy = None
+
+SIZE_UNITS = {
+    '': 1,
+    'B': 1,
+    'BYTES': 1,
+    'KB': 1024,
+    'MB': 1024 ** 2,
+    'GB': 1024 ** 3,
+    'TB': 1024 ** 4,
+    'PB': 1024 ** 5,
+}
+SIZE_PATTERN = re.compile(r'^\s*([0-9]+(?:\.[0-9]+)?)\s*([A-Za-z]*)\s*$')
+
+
+def parse_size(value: Any) -> int:
+    """
+    Convert size reported by DSM (e.g.: '10737418240 Bytes' or '1.5 TB') to number of bytes. Unknown or missing
+    values are converted to 0.
+    :param value: Size reported by DSM
+    :return: Size in bytes
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = SIZE_PATTERN.match(str(value or ''))
+    if match is None or match.group(2).upper() not in SIZE_UNITS:
+        return 0
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+
+def _group_sum(keys: Sequence[Hashable], values: 'array[int]') -> Dict[Hashable, int]:
+    """
+    Sum values that share the same key. Sums are exact (computed in 64-bit integers, not in floating point).
+    :param keys: Group key for every value
+    :param values: Array of values
+    :return: Dictionary of sums indexed by group key
+    """
+    codes: Dict[Hashable, int] = {}
+    key_codes = array('q', [codes.setdefault(key, len(codes)) for key in keys])
+    if numpy is not None and key_codes:
+        sums = numpy.zeros(len(codes), dtype=numpy.int64)
+        numpy.add.at(sums, numpy.frombuffer(key_codes, dtype=numpy.int64), numpy.frombuffer(values, dtype=numpy.int64))
+        totals = [int(total) for total in sums]
+    else:
+        totals = [0] * len(codes)
+        for code, value in zip(key_codes, values):
+            totals[code] += value
+    return {key: totals[code] for key, code in codes.items()}
+
+
+class CapacityReport:
+    """
+    Capacity report for set of volumes. Every volume is represented by single row in column arrays: instance ID,
+    name, Storage Center, parent folder, configured size and used (active) space in bytes. Servers to which volumes
+    are mapped are kept separately, because single volume can be mapped to multiple servers. Servers are identified by
+    tuple (Storage Center instance ID, server instance ID), their names are kept only as labels in 'server_names'.
+    """
+    GROUP_STORAGE_CENTER = 'storage_center'
+    GROUP_FOLDER = 'folder'
+    GROUP_SERVER = 'server'
+    GROUPS = [GROUP_STORAGE_CENTER, GROUP_FOLDER, GROUP_SERVER]
+
+    UNMAPPED = ''
+
+    def __init__(self) -> None:
+        self.volume_ids: List[str] = []
+        self.volume_names: List[str] = []
+        self.storage_center_ids: List[str] = []
+        self.folder_ids: List[str] = []
+        self.configured = array('q')
+        self.used = array('q')
+        self.mapping: Dict[str, List[Tuple[str, str]]] = {}
+        self.server_names: Dict[Tuple[str, str], str] = {}
+        # Instance IDs of volumes whose storage usage could not be fetched (their used space is reported as 0)
+        self.missing_usage: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.volume_ids)
+
+    def add(self, volume_id: str, name: str, storage_center_id: str, folder_id: str,
+            configured: int, used: int) -> None:
+        """
+        Add usage of single volume to this report
+        :param volume_id: Instance ID of a volume
+        :param name: Name of a volume
+        :param storage_center_id: Instance ID of a Storage Center where the volume is located
+        :param folder_id: Instance ID of volume's parent folder
+        :param configured: Configured size of the volume in bytes
+        :param used: Space used by the volume in bytes
+        :return: None
+        """
+        self.volume_ids.append(volume_id)
+        self.volume_names.append(name)
+        self.storage_center_ids.append(storage_center_id)
+        self.folder_ids.append(folder_id)
+        self.configured.append(configured)
+        self.used.append(used)
+
+    def extend(self, other: 'CapacityReport') -> None:
+        """
+        Append all rows of other report to this report (e.g.: to combine reports from multiple Storage Centers)
+        :param other: Report to append
+        :return: None
+        """
+        self.volume_ids.extend(other.volume_ids)
+        self.volume_names.extend(other.volume_names)
+        self.storage_center_ids.extend(other.storage_center_ids)
+        self.folder_ids.extend(other.folder_ids)
+        self.configured.extend(other.configured)
+        self.used.extend(other.used)
+        self.mapping.update(other.mapping)
+        self.server_names.update(other.server_names)
+        self.missing_usage.extend(other.missing_usage)
+
+    def totals(self) -> Tuple[int, int]:
+        """
+        Return total configured size and total used space of all volumes in this report
+        :return: Tuple (configured bytes, used bytes)
+        """
+        if numpy is not None and self.configured:
+            return (int(numpy.frombuffer(self.configured, dtype=numpy.int64).sum()),
+                    int(numpy.frombuffer(self.used, dtype=numpy.int64).sum()))
+        return sum(self.configured), sum(self.used)
+
+    def _keys(self, group_by: str) -> Tuple[Sequence[Hashable], 'array[int]', 'array[int]']:
+        """
+        Internal method that returns group key for every row together with value columns. When grouping by server,
+        rows of volumes mapped to multiple servers are repeated for each server and unmapped volumes are grouped under
+        UNMAPPED key.
+        :param group_by: One of GROUPS
+        :return: Tuple (keys, configured column, used column)
+        """
+        if group_by == self.GROUP_STORAGE_CENTER:
+            return self.storage_center_ids, self.configured, self.used
+        if group_by == self.GROUP_FOLDER:
+            return self.folder_ids, self.configured, self.used
+        if group_by != self.GROUP_SERVER:
+            raise ValueError("Unknown capacity group '%s'" % group_by)
+        keys: List[Hashable] = []
+        configured = array('q')
+        used = array('q')
+        for index, volume_id in enumerate(self.volume_ids):
+            servers: Sequence[Hashable] = self.mapping.get(volume_id) or [self.UNMAPPED]
+            for server in servers:
+                keys.append(server)
+                configured.append(self.configured[index])
+                used.append(self.used[index])
+        return keys, configured, used
+
+    def aggregate(self, group_by: str) -> Dict[Hashable, Tuple[int, int, int]]:
+        """
+        Aggregate report per Storage Center, volume folder or server
+        :param group_by: One of GROUPS (CapacityReport.GROUP_STORAGE_CENTER, GROUP_FOLDER or GROUP_SERVER)
+        :return: Dictionary of tuples (number of volumes, configured bytes, used bytes) indexed by group key (instance
+                 ID of Storage Center or volume folder, tuple (Storage Center ID, server ID) or UNMAPPED)
+        """
+        keys, configured, used = self._keys(group_by)
+        counts = _group_sum(keys, array('q', [1] * len(keys)))
+        configured_sums = _group_sum(keys, configured)
+        used_sums = _group_sum(keys, used)
+        return {key: (counts[key], configured_sums[key], used_sums[key]) for key in counts}
+
+    @classmethod
+    def from_usage(cls, storage_center_id: str, volumes: Iterable[Any], usage: Dict[str, Dict[str, Any]],
+                   mapping: Optional[Dict[str, Dict[str, str]]] = None) -> 'CapacityReport':
+        """
+        Class method that creates report from volumes and raw storage usage records returned by DSM. Configured size
+        of volumes without usage record is taken from the volume itself and they are listed in 'missing_usage'.
+        :param storage_center_id: Instance ID of a Storage Center
+        :param volumes: Volume objects
+        :param usage: Raw storage usage records indexed by volume instance ID
+        :param mapping: Names of servers to which volumes are mapped indexed by server instance ID, indexed by volume
+                        instance ID
+        :return: instance of CapacityReport class
+        """
+        report = CapacityReport()
+        for volume in volumes:
+            volume_usage = usage.get(volume.instance_id) or {}
+            if not volume_usage:
+                report.missing_usage.append(volume.instance_id)
+            report.add(volume_id=volume.instance_id,
+                       name=volume.name,
+                       storage_center_id=storage_center_id,
+                       folder_id=volume.parent_folder_id,
+                       configured=parse_size(volume_usage.get('configuredSpace', volume.configured_size)),
+                       used=parse_size(volume_usage.get('activeSpace')))
+        for volume_id, servers in (mapping or {}).items():
+            report.mapping[volume_id] = [(storage_center_id, server_id) for server_id in sorted(servers)]
+            for server_id, server_name in servers.items():
+                report.server_names[(storage_center_id, server_id)] = server_name
+        return report
@@ -0,0 +1,134 @@
+"""
+This module contains JSON codecs used for decoding responses from Dell Storage Manager (DSM) and encoding output.
+Accelerated JSON libraries (orjson, ujson) are optional. If one of them is installed, it is used by default, otherwise
+codec falls back to standard json module. Responses are decoded directly from their raw bytes, without creating
+intermediate decoded string.
+"""
+import json
+from typing import Any, Callable, Dict, List, Union
+
+from dell_storage_api import profiling
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+try:
+    import ujson  # type: ignore
+except ImportError:  # pragma: no cover
+    ujson = None  # type: ignore
+
+
+class Codec:
+    """
+    JSON codec with pair of functions for decoding (from bytes or str) and encoding (to str)
+    """
+
+    def __init__(self, name: str, loads: Callable[[Union[bytes, str]], Any], dumps: Callable[[Any], str]) -> None:
+        self.name = name
+        self._loads = loads
+        self._dumps = dumps
+
+    def __str__(self) -> str:
+        return self.name
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        """
+        Decode JSON document
+        :param data: JSON document as bytes or str
+        :return: Decoded object
+        """
+        return self._loads(data)
+
+    def dumps(self, obj: Any) -> str:
+        """
+        Encode object to JSON document
+        :param obj: Encoded object
+        :return: JSON document
+        """
+        return self._dumps(obj)
+
+    def decode_response(self, resp: Any) -> Any:
+        """
+        Decode JSON body of HTTP response from its raw bytes
+        :param resp: Response object (e.g.: requests.Response)
+        :return: Decoded body
+        """
+        with profiling.phase(profiling.PHASE_DECODE):
+            return self._loads(resp.content)
+
+
+STDLIB = 'json'
+ORJSON = 'orjson'
+UJSON = 'ujson'
+
+CODECS: Dict[str, Codec] = {STDLIB: Codec(STDLIB, json.loads, json.dumps)}
+if ujson is not None:
+    CODECS[UJSON] = Codec(UJSON, ujson.loads, lambda obj: ujson.dumps(obj, ensure_ascii=False))
+if orjson is not None:
+    CODECS[ORJSON] = Codec(ORJSON, orjson.loads, lambda obj: orjson.dumps(obj).decode())
+
+# Codecs in order of preference
+PREFERENCE = [ORJSON, UJSON, STDLIB]
+
+_default = [CODECS[name] for name in PREFERENCE if name in CODECS][0]
+
+
+def available_codecs() -> List[str]:
+    """
+    Return names of installed codecs in order of preference
+    :return: List of codec names
+    """
+    return [name for name in PREFERENCE if name in CODECS]
+
+
+def get_codec(name: str = '') -> Codec:
+    """
+    Return codec by its name
+    :param name: Name of the codec (Defaults to current default codec)
+    :return: Codec
+    """
+    if not name:
+        return _default
+    if name not in CODECS:
+        raise ValueError("JSON codec '%s' is not available. Available codecs: %s" % (name,
+                                                                                     ', '.join(available_codecs())))
+    return CODECS[name]
+
+
+def set_default_codec(name: str) -> None:
+    """
+    Change codec used by module level functions (and therefore by all storage objects)
+    :param name: Name of the codec
+    :return: None
+    """
+    global _default  # pylint: disable=W0603
+    _default = get_codec(name)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Decode JSON document using default codec
+    :param data: JSON document as bytes or str
+    :return: Decoded object
+    """
+    return _default.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """
+    Encode object to JSON document using default codec
+    :param obj: Encoded object
+    :return: JSON document
+    """
+    return _default.dumps(obj)
+
+
+def decode_response(resp: Any) -> Any:
+    """
+    Decode JSON body of HTTP response using default codec
+    :param resp: Response object (e.g.: requests.Response)
+    :return: Decoded body
+    """
+    return _default.decode_response(resp)
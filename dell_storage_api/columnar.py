@@ -0,0 +1,446 @@
+"""
+This module contains compact columnar binary format for export of inventories (volumes, servers, volume folders) from
+Dell Storage Manager. Format is inspired by Parquet/Arrow but does not require any third party library:
+    - File starts with header containing magic bytes, format version, kind of exported objects and column schema
+    - Rows are written in row groups, every column of the row group is stored as separate zlib compressed block
+    - String columns with repeated values (e.g.: folder IDs, status or server type) are dictionary encoded, string
+      columns with mostly unique values (e.g.: instance IDs) are stored plain
+    - Integer columns are stored as arrays of little endian 64-bit integers
+    - File ends with footer containing total number of rows
+Reader works on any bytes-like object (bytes, memoryview, mmap), so the files can be read without copying them into
+memory first.
+"""
+import struct
+import sys
+import zlib
+from array import array
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from dell_storage_api.server import Server, ServerCollection
+from dell_storage_api.storage_object import StorageObjectFolderCollection
+from dell_storage_api.transport import Transport
+from dell_storage_api.volume import Volume, VolumeCollection, VolumeFolder
+
+MAGIC = b'DSCF'
+FOOTER_MAGIC = b'DSCE'
+ROW_GROUP_MAGIC = b'RG'
+FORMAT_VERSION = 1
+
+TYPE_STRING = b'S'
+TYPE_INT = b'Q'
+
+ENCODING_PLAIN = b'P'
+ENCODING_DICTIONARY = b'D'
+
+# Type codes of integer arrays stored in files and their width in bytes. Width of C types behind type codes depends on
+# platform, so it is checked whenever an array is encoded or decoded.
+INT_TYPECODE_SIZES = {'B': 1, 'H': 2, 'I': 4, 'q': 8}
+
+KIND_VOLUME = 'volume'
+KIND_SERVER = 'server'
+KIND_VOLUME_FOLDER = 'volume_folder'
+
+SCHEMAS: Dict[str, List[Tuple[str, bytes]]] = {
+    KIND_VOLUME: [('instance_id', TYPE_STRING), ('name', TYPE_STRING), ('parent_folder_id', TYPE_STRING),
+                  ('wwid', TYPE_STRING), ('status', TYPE_STRING)],
+    KIND_SERVER: [('instance_id', TYPE_STRING), ('name', TYPE_STRING), ('type', TYPE_STRING),
+                  ('parent_id', TYPE_STRING)],
+    KIND_VOLUME_FOLDER: [('instance_id', TYPE_STRING), ('name', TYPE_STRING), ('parent_id', TYPE_STRING)],
+}
+
+DEFAULT_ROW_GROUP_SIZE = 10000
+
+
+class ColumnarFormatError(Exception):
+    """ Exception raised when columnar file is corrupted or has unsupported format """
+
+
+def _pack_string(value: str) -> bytes:
+    """
+    Encode string as length prefixed utf-8 bytes
+    :param value: String to encode
+    :return: Encoded string
+    """
+    encoded = value.encode('utf-8')
+    return struct.pack('<I', len(encoded)) + encoded
+
+
+def _unpack_string(buffer: memoryview, offset: int) -> Tuple[str, int]:
+    """
+    Decode length prefixed utf-8 string
+    :param buffer: Source buffer
+    :param offset: Position of the string in buffer
+    :return: Tuple (decoded string, offset after the string)
+    """
+    (length,) = struct.unpack_from('<I', buffer, offset)
+    offset += 4
+    return str(buffer[offset:offset + length], 'utf-8'), offset + length
+
+
+def _new_int_array(typecode: str) -> 'array[int]':
+    """
+    Create empty integer array with type code from INT_TYPECODE_SIZES
+    :param typecode: Array type code (e.g.: 'q')
+    :raises ColumnarFormatError: if type code is not supported or its width differs on this platform
+    :return: Empty array
+    """
+    if typecode not in INT_TYPECODE_SIZES:
+        raise ColumnarFormatError("Unsupported integer array type code %r" % typecode)
+    result = array(typecode)
+    if result.itemsize != INT_TYPECODE_SIZES[typecode]:
+        raise ColumnarFormatError("Integer array type code %r is %d bytes wide on this platform, expected %d" %
+                                  (typecode, result.itemsize, INT_TYPECODE_SIZES[typecode]))
+    return result
+
+
+def _int_array(typecode: str, values: Iterable[int]) -> bytes:
+    """
+    Encode integers as little endian array
+    :param typecode: Array type code (e.g.: 'q')
+    :param values: Integers to encode
+    :return: Encoded array
+    """
+    result = _new_int_array(typecode)
+    result.extend(values)
+    if sys.byteorder != 'little':
+        result.byteswap()
+    return result.tobytes()
+
+
+def _read_int_array(typecode: str, data: bytes) -> 'array[int]':
+    """
+    Decode little endian array of integers
+    :param typecode: Array type code (e.g.: 'q')
+    :param data: Encoded array
+    :return: Decoded array
+    """
+    result = _new_int_array(typecode)
+    result.frombytes(data)
+    if sys.byteorder != 'little':
+        result.byteswap()
+    return result
+
+
+def _encode_strings(values: Sequence[str]) -> bytes:
+    """
+    Encode string column. Dictionary encoding is used if at most half of the values are unique.
+    :param values: Column values
+    :return: Encoded column block
+    """
+    dictionary: Dict[str, int] = {}
+    indices = [dictionary.setdefault(value, len(dictionary)) for value in values]
+    if len(dictionary) * 2 > len(values):
+        return ENCODING_PLAIN + b''.join(_pack_string(value) for value in values)
+    if len(dictionary) <= 0xff:
+        typecode = 'B'
+    elif len(dictionary) <= 0xffff:
+        typecode = 'H'
+    else:
+        typecode = 'I'
+    return ENCODING_DICTIONARY + struct.pack('<I', len(dictionary)) + \
+        b''.join(_pack_string(value) for value in dictionary) + typecode.encode('ascii') + \
+        _int_array(typecode, indices)
+
+
+def _decode_strings(block: bytes, rows: int) -> List[str]:
+    """
+    Decode string column block
+    :param block: Encoded column block
+    :param rows: Number of values in block
+    :return: Column values
+    """
+    buffer = memoryview(block)
+    encoding = bytes(buffer[0:1])
+    offset = 1
+    if encoding == ENCODING_PLAIN:
+        values = []
+        for _ in range(rows):
+            value, offset = _unpack_string(buffer, offset)
+            values.append(value)
+        return values
+    if encoding != ENCODING_DICTIONARY:
+        raise ColumnarFormatError("Unknown column encoding %r" % encoding)
+    (size,) = struct.unpack_from('<I', buffer, offset)
+    offset += 4
+    dictionary = []
+    for _ in range(size):
+        value, offset = _unpack_string(buffer, offset)
+        dictionary.append(value)
+    typecode = str(buffer[offset:offset + 1], 'ascii')
+    indices = _read_int_array(typecode, bytes(buffer[offset + 1:]))
+    return [dictionary[index] for index in indices]
+
+
+class ColumnarWriter:
+    """
+    Writer of columnar files. Rows are buffered and written to the output stream in row groups of 'row_group_size'
+    rows, so the memory usage does not depend on the total number of exported rows.
+    """
+
+    def __init__(self, stream: BinaryIO, kind: str, row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+                 compression_level: int = 6) -> None:
+        if kind not in SCHEMAS:
+            raise ValueError("Unknown kind of exported objects '%s'" % kind)
+        self.stream = stream
+        self.kind = kind
+        self.schema = SCHEMAS[kind]
+        self.row_group_size = max(1, row_group_size)
+        self.compression_level = compression_level
+        self.rows_written = 0
+        self._rows: List[Sequence[Any]] = []
+        self._write_header()
+
+    def __enter__(self) -> 'ColumnarWriter':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _write_header(self) -> None:
+        """
+        Internal method that writes file header with column schema
+        :return: None
+        """
+        header = MAGIC + struct.pack('<H', FORMAT_VERSION) + _pack_string(self.kind) + \
+            struct.pack('<H', len(self.schema))
+        for name, column_type in self.schema:
+            header += _pack_string(name) + column_type
+        self.stream.write(header)
+
+    def write_row(self, row: Sequence[Any]) -> None:
+        """
+        Add single row. Values have to be in the order of columns in schema.
+        :param row: Row values
+        :return: None
+        """
+        self._rows.append(row)
+        if len(self._rows) >= self.row_group_size:
+            self.flush()
+
+    def write_rows(self, rows: Iterable[Sequence[Any]]) -> None:
+        """
+        Add multiple rows
+        :param rows: Iterable of rows
+        :return: None
+        """
+        for row in rows:
+            self.write_row(row)
+
+    def flush(self) -> None:
+        """
+        Write buffered rows as a new row group
+        :return: None
+        """
+        if not self._rows:
+            return
+        chunks = [ROW_GROUP_MAGIC, struct.pack('<I', len(self._rows))]
+        for index, (_, column_type) in enumerate(self.schema):
+            values = [row[index] for row in self._rows]
+            if column_type == TYPE_STRING:
+                block = _encode_strings(['' if value is None else str(value) for value in values])
+            else:
+                block = _int_array('q', (int(value or 0) for value in values))
+            compressed = zlib.compress(block, self.compression_level)
+            chunks.append(struct.pack('<I', len(compressed)))
+            chunks.append(compressed)
+        self.stream.write(b''.join(chunks))
+        self.rows_written += len(self._rows)
+        self._rows = []
+
+    def close(self) -> None:
+        """
+        Write remaining rows and file footer
+        :return: None
+        """
+        self.flush()
+        self.stream.write(FOOTER_MAGIC + struct.pack('<Q', self.rows_written))
+
+
+class ColumnarReader:
+    """
+    Reader of columnar files. Reader works directly on supplied bytes-like object (e.g.: bytes or mmap), row groups are
+    decoded lazily when iterated.
+    """
+
+    def __init__(self, buffer: Any) -> None:
+        self.buffer = memoryview(buffer)
+        if bytes(self.buffer[0:4]) != MAGIC:
+            raise ColumnarFormatError("Not a columnar inventory file")
+        (version,) = struct.unpack_from('<H', self.buffer, 4)
+        if version != FORMAT_VERSION:
+            raise ColumnarFormatError("Unsupported format version %d" % version)
+        self.kind, offset = _unpack_string(self.buffer, 6)
+        (column_count,) = struct.unpack_from('<H', self.buffer, offset)
+        offset += 2
+        self.schema: List[Tuple[str, bytes]] = []
+        for _ in range(column_count):
+            name, offset = _unpack_string(self.buffer, offset)
+            self.schema.append((name, bytes(self.buffer[offset:offset + 1])))
+            offset += 1
+        self._data_offset = offset
+
+    @property
+    def column_names(self) -> List[str]:
+        """
+        Return names of columns in this file
+        :return: List of column names
+        """
+        return [name for name, _ in self.schema]
+
+    @property
+    def row_count(self) -> int:
+        """
+        Return total number of rows stored in footer of this file
+        :return: Number of rows
+        """
+        if bytes(self.buffer[-12:-8]) != FOOTER_MAGIC:
+            raise ColumnarFormatError("Columnar file is truncated")
+        (rows,) = struct.unpack_from('<Q', self.buffer, len(self.buffer) - 8)
+        return rows
+
+    def iter_row_groups(self) -> Iterator[Dict[str, List[Any]]]:
+        """
+        Iterate over row groups. Every row group is returned as dictionary of column values indexed by column name.
+        :return: Iterator of row groups
+        """
+        offset = self._data_offset
+        while True:
+            marker = bytes(self.buffer[offset:offset + 2])
+            if marker == FOOTER_MAGIC[:2]:
+                return
+            if marker != ROW_GROUP_MAGIC:
+                raise ColumnarFormatError("Corrupted row group at offset %d" % offset)
+            (rows,) = struct.unpack_from('<I', self.buffer, offset + 2)
+            offset += 6
+            columns: Dict[str, List[Any]] = {}
+            for name, column_type in self.schema:
+                (length,) = struct.unpack_from('<I', self.buffer, offset)
+                offset += 4
+                block = zlib.decompress(self.buffer[offset:offset + length])
+                offset += length
+                if column_type == TYPE_STRING:
+                    columns[name] = _decode_strings(block, rows)
+                else:
+                    columns[name] = list(_read_int_array('q', block))
+            yield columns
+
+    def iter_rows(self) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over rows. Every row is returned as dictionary of values indexed by column name.
+        :return: Iterator of rows
+        """
+        names = self.column_names
+        for columns in self.iter_row_groups():
+            for values in zip(*(columns[name] for name in names)):
+                yield dict(zip(names, values))
+
+
+def export_volumes(stream: BinaryIO, volumes: Iterable[Volume], row_group_size: int = DEFAULT_ROW_GROUP_SIZE) -> int:
+    """
+    Write volumes to columnar file
+    :param stream: Binary output stream
+    :param volumes: Volumes to export (e.g.: VolumeCollection or chained chunks from StorageCenter.iter_volume_chunks)
+    :param row_group_size: Number of rows in row group
+    :return: Number of exported volumes
+    """
+    with ColumnarWriter(stream, KIND_VOLUME, row_group_size) as writer:
+        writer.write_rows((volume.instance_id, volume.name, volume.parent_folder_id, volume.wwid, volume.status)
+                          for volume in volumes)
+    return writer.rows_written
+
+
+def export_servers(stream: BinaryIO, servers: Iterable[Server], row_group_size: int = DEFAULT_ROW_GROUP_SIZE) -> int:
+    """
+    Write servers to columnar file
+    :param stream: Binary output stream
+    :param servers: Servers to export
+    :param row_group_size: Number of rows in row group
+    :return: Number of exported servers
+    """
+    with ColumnarWriter(stream, KIND_SERVER, row_group_size) as writer:
+        writer.write_rows((server.instance_id, server.name, server.type, server.parent_id) for server in servers)
+    return writer.rows_written
+
+
+def export_volume_folders(stream: BinaryIO, folders: Iterable[VolumeFolder],
+                          row_group_size: int = DEFAULT_ROW_GROUP_SIZE) -> int:
+    """
+    Write volume folders to columnar file. Parent ID of root folder is stored as empty string.
+    :param stream: Binary output stream
+    :param folders: Volume folders to export
+    :param row_group_size: Number of rows in row group
+    :return: Number of exported folders
+    """
+    with ColumnarWriter(stream, KIND_VOLUME_FOLDER, row_group_size) as writer:
+        writer.write_rows((folder.instance_id, folder.name, folder.parent_id) for folder in folders)
+    return writer.rows_written
+
+
+def _check_kind(reader: ColumnarReader, kind: str) -> None:
+    """
+    Internal function that verifies that columnar file contains objects of expected kind
+    :param reader: Reader of columnar file
+    :param kind: Expected kind of objects
+    :return: None
+    """
+    if reader.kind != kind:
+        raise ColumnarFormatError("File contains '%s' objects, expected '%s'" % (reader.kind, kind))
+
+
+def load_volumes(buffer: Any, req_session: Transport, base_url: str) -> VolumeCollection:
+    """
+    Load volumes from columnar file into VolumeCollection
+    :param buffer: Content of the columnar file (bytes-like object)
+    :param req_session: Transport with stored login cookies
+    :param base_url: base URL of DSM
+    :return: Collection of loaded volumes
+    """
+    reader = ColumnarReader(buffer)
+    _check_kind(reader, KIND_VOLUME)
+    result = VolumeCollection()
+    for columns in reader.iter_row_groups():
+        for instance_id, name, parent_folder_id, wwid, status in zip(columns['instance_id'], columns['name'],
+                                                                     columns['parent_folder_id'], columns['wwid'],
+                                                                     columns['status']):
+            result.add(Volume(req_session=req_session, base_url=base_url, name=name, instance_id=instance_id,
+                              parent_folder_id=parent_folder_id, wwid=wwid, status=status))
+    return result
+
+
+def load_servers(buffer: Any, req_session: Transport, base_url: str) -> ServerCollection:
+    """
+    Load servers from columnar file into ServerCollection
+    :param buffer: Content of the columnar file (bytes-like object)
+    :param req_session: Transport with stored login cookies
+    :param base_url: base URL of DSM
+    :return: Collection of loaded servers
+    """
+    reader = ColumnarReader(buffer)
+    _check_kind(reader, KIND_SERVER)
+    result = ServerCollection()
+    for columns in reader.iter_row_groups():
+        # Files exported before cluster membership was tracked do not contain 'parent_id' column
+        parent_ids = columns.get('parent_id') or [''] * len(columns['instance_id'])
+        for instance_id, name, object_type, parent_id in zip(columns['instance_id'], columns['name'], columns['type'],
+                                                             parent_ids):
+            result.add(Server(req_session=req_session, base_url=base_url, name=name, instance_id=instance_id,
+                              object_type=object_type, parent_id=parent_id))
+    return result
+
+
+def load_volume_folders(buffer: Any, req_session: Transport, base_url: str) -> StorageObjectFolderCollection:
+    """
+    Load volume folders from columnar file into StorageObjectFolderCollection
+    :param buffer: Content of the columnar file (bytes-like object)
+    :param req_session: Transport with stored login cookies
+    :param base_url: base URL of DSM
+    :return: Collection of loaded volume folders
+    """
+    reader = ColumnarReader(buffer)
+    _check_kind(reader, KIND_VOLUME_FOLDER)
+    result = StorageObjectFolderCollection()
+    for columns in reader.iter_row_groups():
+        for instance_id, name, parent_id in zip(columns['instance_id'], columns['name'], columns['parent_id']):
+            result.add(VolumeFolder(req_session=req_session, base_url=base_url, name=name, instance_id=instance_id,
+                                    parent_id=parent_id or None))
+    return result
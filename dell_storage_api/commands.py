@@ -0,0 +1,819 @@
+"""
+This module contains handlers of dell-storage-client commands. Every handler performs single command against
+Storage Center (or Dell Storage Manager), prints its output (text tables or JSON) and returns ReturnCode. Handlers
+take already resolved instance IDs, translation of names supplied on command line is done by NameResolver (see
+find_storage_center and resolve_volume_folder_id).
+"""
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from dell_storage_api import codec, columnar, profiling
+from dell_storage_api import result as api_result
+from dell_storage_api.capacity import CapacityReport
+from dell_storage_api.jobs import Job, JobProgress, JobQueue, JobStateError
+from dell_storage_api.reconcile import Plan, PlanStep, Reconciler, ReconcileError, load_desired_state
+from dell_storage_api.resolver import NameResolver
+from dell_storage_api.server import Server
+from dell_storage_api.session import DsmSession
+from dell_storage_api.snapshot import SnapshotStore
+from dell_storage_api.storage_center import InventoryError, StorageCenter
+from dell_storage_api.table import FastTable, TextTable
+from dell_storage_api.throttle import EndpointLatencies
+from dell_storage_api.watch import Watcher
+
+
+class ReturnCode:  # pylint: disable=R0903
+    """Convenience class that holds semantic return codes """
+    SUCCESS = 0
+    FAILURE = 1
+
+
+class ServerType:
+    """Convenience class that represents various types of Server object"""
+
+    def __init__(self) -> None:
+        self._server = 'Server'
+        self._cluster = 'Cluster'
+        self._all = 'All'
+        self._all_types = [self._all, self._server, self._cluster]
+
+    @property
+    def server(self) -> str:
+        """
+        Return string representing Physical server type
+        :return: Physical server type
+        """
+        return self._server
+
+    @property
+    def cluster(self) -> str:
+        """
+        Return string representing Custer server type
+        :return: Cluster server type
+        """
+        return self._cluster
+
+    @property
+    def all_keyword(self) -> str:
+        """
+        Return list of all possible server type keywords (including magic keyword 'All')
+        :return: list of all server type keywords
+        """
+        return self._all
+
+    @property
+    def all_types(self) -> List[str]:
+        """
+        Magic keyword representing all/any server types
+        :return: keyword representing all types
+        """
+        return self._all_types
+
+
+SERVER_TYPES = ServerType()
+
+# Tables with more rows are rendered by FastTable instead of Texttable
+LARGE_TABLE_ROWS = 1000
+# Maximum number of concurrent requests that verify names in jobs file against DSM
+RESOLVE_WORKERS = 8
+
+
+def print_table(table: Union[FastTable, TextTable], as_json: bool = False,
+                rows: Optional[Iterable[List[Any]]] = None) -> None:
+    """
+    Print table as text or as JSON list of objects indexed by column names
+    :param table: Printed table
+    :param as_json: Print table in JSON format
+    :param rows: Additional rows produced lazily, which are streamed after rows of the table (FastTable only)
+    :return: None
+    """
+    with profiling.phase(profiling.PHASE_RENDER):
+        header = table.header_names
+        all_rows: Iterable[List[Any]] = table.rows
+        if as_json:
+            if rows is not None:
+                all_rows = itertools.chain(all_rows, rows)
+            text = codec.dumps([dict(zip(header, row)) for row in all_rows])
+        elif rows is not None and isinstance(table, FastTable):
+            table.stream(rows)
+            return
+        elif len(table.rows) > LARGE_TABLE_ROWS and isinstance(table, TextTable):
+            # Texttable wraps and measures every cell in pure Python, which is too slow for large listings
+            fast_table = FastTable(max_width=table.max_width)
+            fast_table.header(header)
+            fast_table.add_rows(table.rows, header=False)
+            text = fast_table.draw()
+        else:
+            text = table.draw()
+
+        print(text)
+
+
+def volume_create(storage: StorageCenter, name: str, size: str, unique_name: bool = True, folder_id: str = '',
+                  map_to_id: str = '', dry_run: bool = False, latencies: Optional[EndpointLatencies] = None,
+                  as_json: bool = False) -> int:
+    """
+    Create new volume in Storage Center. If mapping of the new volume fails, the volume is moved to recycle bin, so
+    that the command can be safely retried.
+    :param storage: Storage Center in which new volume will be created
+    :param name: Name of the volume
+    :param size: Size of the volume (e.g.: '500GB' or '1.5TB')
+    :param unique_name: Should the volume creation fail if the valoume name already exists in this folder ?
+    :param folder_id: Folder in which the volume will be created (Defaults to root folder)
+    :param map_to_id: Instance ID of a server (or cluster) to which this volume should be mapped
+    :param dry_run: Only print DSM calls that would be performed
+    :param latencies: Recorded latencies of DSM endpoints used to estimate duration of dry run
+    :param as_json: Print tables in JSON format
+    :return: ReturnCode.SUCCESS or ReturnCode.FAILURE based on the outcome of a operation
+    """
+    if map_to_id:
+        mapping_server = storage.server(map_to_id)
+        if mapping_server is None:
+            print("Volume can't be mapped to server with instance ID '%s'. No such server" % map_to_id)
+            return ReturnCode.FAILURE
+    if unique_name and storage.volume_list().find_by_name(name):
+        print("Volume with name '%s' already exists" % name)
+        return ReturnCode.FAILURE
+
+    plan = Plan(storage)
+    create_step = plan.add(PlanStep.CREATE_VOLUME, name, {'size': size, 'folder_id': folder_id})
+    if map_to_id:
+        plan.add(PlanStep.MAP, name, {'server_id': map_to_id}, [create_step])
+    if dry_run:
+        _print_plan(plan, latencies, as_json=as_json)
+        return ReturnCode.SUCCESS
+
+    if plan.execute(rollback=True):
+        new_volume = plan.volumes[name]
+        print("OK - Volume '%s' created with instance ID '%s'" % (new_volume.name, new_volume.instance_id))
+        return ReturnCode.SUCCESS
+    else:
+        return ReturnCode.FAILURE
+
+
+def volume_map(storage: StorageCenter, volume_id: str, server_id: str) -> int:
+    """
+    Map existing volume to the server (or cluster).
+    NOTE: Volume that is already mapped to server can not be mapped again without unmapping it first.
+    :param storage: Storage Center where the volume is located
+    :param volume_id: Instance ID of a Volume to be mapped
+    :param server_id: Instance ID of a Server (or a cluster) to which volume will be mapped
+    :return: ReturnCode.SUCCESS or ReturnCode.FAILURE based on the outcome of a operation
+    """
+    volume = storage.volume(volume_id)
+    if volume is None:
+        print("Failed to map volume with ID '%s'. No such volume" % volume_id)
+        return ReturnCode.FAILURE
+    server = storage.server(server_id)
+    if server is None:
+        print("failed to map volume '%s' (%s) to server with ID '%s'. No such server" % (volume.name,
+                                                                                         volume.instance_id,
+                                                                                         server_id))
+        return ReturnCode.FAILURE
+    if volume.map_to_server(server_id=server_id):
+        return ReturnCode.SUCCESS
+    else:
+        return ReturnCode.FAILURE
+
+
+def volume_unmap(storage: StorageCenter, volume_id: str) -> int:
+    """
+    Unmap volume from all servers it is currently mapped to
+    :param storage: Storage Center where volume is located
+    :param volume_id: Instance ID of a volume to be unampped
+    :return: ReturnCode.SUCCESS or ReturnCode.FAILURE based on the outcome of a operation
+    """
+    volume = storage.volume(volume_id)
+    if volume is None:
+        print("Failed to unmap volume with ID '%s'. No such volume" % volume_id)
+        return ReturnCode.FAILURE
+    if volume.unmap():
+        return ReturnCode.SUCCESS
+    else:
+        return ReturnCode.FAILURE
+
+
+def volume_list(storage: StorageCenter, folder_id: str = '', show_mapping: bool = False,
+                chunked: bool = False, recursive: bool = False, as_json: bool = False) -> int:
+    """
+    Print table of Volumes present in Storage Center in specified volume folder.
+    :param storage: Storage Center, from which to list volumes
+    :param folder_id: Volume Folder, from which to list volumes (Defaults to root)
+    :param show_mapping: Show mapping profile of every volume
+    :param chunked: Fetch volumes in smaller slices (one per volume folder) instead of single large response
+    :param recursive: Include volumes from subfolders of specified volume folder
+    :param as_json: Print tables in JSON format
+    :return: ReturnCode.SUCCESS or ReturnCode.FAILURE based on the outcome of a operation
+    """
+    table = FastTable(max_width=120)
+    try:
+        if folder_id and recursive:
+            folder_tree = storage.volume_folder_list().tree()
+            if folder_id not in folder_tree:
+                print("Failed to list volumes. No volume folder with ID '%s'" % folder_id)
+                return ReturnCode.FAILURE
+            all_volumes = storage.volume_list_chunked() if chunked else storage.volume_list()
+            all_volumes = all_volumes.find_in_subtree(folder_tree, folder_id)
+        elif folder_id:
+            all_volumes = storage.volume_list(folder_id)
+        elif chunked:
+            all_volumes = storage.volume_list_chunked()
+        else:
+            all_volumes = storage.volume_list()
+    except InventoryError as exc:
+        print("Error: Failed to list volumes - %s" % exc)
+        return ReturnCode.FAILURE
+
+    if show_mapping:
+        table.header(['volume', 'instance_id', 'parent_folder', 'wwid', 'status', 'mapping'])
+    else:
+        table.header(['volume', 'instance_id', 'parent_folder', 'wwid', 'status'])
+
+    def rows() -> Iterator[List[Any]]:
+        # Rows are produced lazily and streamed, so output starts before mapping of all volumes is fetched
+        for volume in all_volumes:
+            if show_mapping:
+                mapping = volume.mapping()
+                mapping_name = mapping['instanceName'] if mapping else None
+                yield [volume.name, volume.instance_id, volume.parent_folder_id, volume.wwid, volume.status,
+                       mapping_name]
+            else:
+                yield [volume.name, volume.instance_id, volume.parent_folder_id, volume.wwid, volume.status]
+
+    print_table(table, as_json, rows())
+
+    return ReturnCode.SUCCESS
+
+
+def volume_folder_list(storage: StorageCenter, parent_id: str = '', as_json: bool = False) -> int:
+    """
+    Print table of Volume Folders present in Storage Center in specified parent Volume Folder
+    :param storage: Storage Center, from which to list volume folders
+    :param parent_id: Parent volume folder, from which the child volume folders will be listed (Defaults to root)
+    :param as_json: Print tables in JSON format
+    :return: ReturnCode.SUCCESS or ReturnCode.FAILURE based on the outcome of a operation
+    """
+    # TODO: Adaptable table width
+    table = TextTable(max_width=120)
+    table.header(['folder', 'instance_id', 'parent_instance_id'])
+    table.set_cols_dtype(['t', 't', 't'])
+    folder_list = storage.volume_folder_list(parent_id)
+    for folder in folder_list:
+        table.add_row([folder.name, folder.instance_id, folder.parent_id])
+    print_table(table, as_json)
+
+    return ReturnCode.SUCCESS
+
+
+def volume_folder_tree(storage: StorageCenter, folder_id: str = '', as_json: bool = False) -> int:
+    """
+    Print hierarchy of Volume Folders present in Storage Center, starting at specified Volume Folder
+    :param storage: Storage Center, from which to list volume folders
+    :param folder_id: Volume Folder, whose subtree will be printed (Defaults to whole hierarchy)
+    :param as_json: Print tables in JSON format
+    :return: ReturnCode.SUCCESS or ReturnCode.FAILURE based on the outcome of a operation
+    """
+    folder_tree = storage.volume_folder_list().tree()
+    if folder_id and folder_id not in folder_tree:
+        print("Failed to print folder tree. No volume folder with ID '%s'" % folder_id)
+        return ReturnCode.FAILURE
+    table = TextTable(max_width=120)
+    table.header(['folder', 'path', 'instance_id'])
+    table.set_cols_dtype(['t', 't', 't'])
+    for folder in folder_tree.walk(folder_id):
+        indent = '  ' * (folder_tree.depth(folder.instance_id) or 0)
+        table.add_row([indent + folder.name, folder_tree.path(folder.instance_id), folder.instance_id])
+    print_table(table, as_json)
+
+    return ReturnCode.SUCCESS
+
+
+def volume_folder_create(storage: StorageCenter, folder_name: str, folder_parent_id: str = '',
+                         unique_name: bool = True) -> int:
+    """
+    Create new volume folder in Storage Center
+    :param storage: Storage Center where the new folder will be created
+    :param folder_name: Name of the new folder
+    :param folder_parent_id: Instance ID of a parent folder for the new volume folder
+    :param unique_name: Should the volume creation fail if volume with same name already exists within parent folder
+    :return: ReturnCode.SUCCESS or ReturnCode.FAILURE based on the outcome of a operation
+    """
+    if unique_name and storage.volume_folder_list().find_by_name(folder_name):
+        print("Volume folder with name '%s' already exists" % folder_name)
+        return ReturnCode.FAILURE
+    if storage.new_volume_folder(folder_name, folder_parent_id):
+        return ReturnCode.SUCCESS
+    else:
+        return ReturnCode.FAILURE
+
+
+def server_list(storage: StorageCenter, object_type: str, as_json: bool = False) -> int:
+    """
+    Print table of Servers defined in Storage Center.
+    :param storage: Storage Center from which servers will be listed
+    :param object_type: Limit output only to Servers of specific
+           type (e.g.: SERVER_TYPES.server or SERVER_TYPES.cluster)
+    :param as_json: Print tables in JSON format
+    :return: ReturnCode.SUCCESS or ReturnCode.FAILURE based on the outcome of a operation
+    """
+    table = TextTable(max_width=120)
+    table.header(['server', 'type', 'instance_id'])
+    table.set_cols_dtype(['t', 't', 't'])
+
+    if object_type == SERVER_TYPES.server:
+        servers = storage.server_list(Server.TYPE_PHYSICAL_SERVER)
+    elif object_type == SERVER_TYPES.cluster:
+        servers = storage.server_list(Server.TYPE_SERVER_CLUSTER)
+    else:
+        servers = storage.server_list()
+
+    for server in servers:
+        table.add_row([server.name,
+                       server.pretty_type(),
+                       server.instance_id])
+    print_table(table, as_json)
+    return ReturnCode.SUCCESS
+
+
+def server_show(storage: StorageCenter, reference: str, as_json: bool = False) -> int:
+    """
+    Print details of a server (or a cluster) together with members of the cluster and volumes mapped to the server.
+    Mapping profiles, servers and volumes are fetched by one request each (see StorageCenter.mapping_index).
+    :param storage: Storage Center where the server is defined
+    :param reference: Instance ID or name of a server
+    :param as_json: Print tables in JSON format
+    :return: ReturnCode.SUCCESS or ReturnCode.FAILURE based on the outcome of a operation
+    """
+    index = storage.mapping_index()
+    if index is None:
+        print("Failed to fetch mapping of volumes in Storage Center '%s'" % storage.name)
+        return ReturnCode.FAILURE
+    candidates = [server for server in index.servers if server.instance_id == reference] or \
+                 [server for server in index.servers if server.name == reference]
+    if len(candidates) != 1:
+        print("Failed to find server. %s servers matching '%s'" % ('Multiple' if candidates else 'No', reference))
+        return ReturnCode.FAILURE
+    server = candidates[0]
+
+    table = TextTable(max_width=120)
+    table.set_cols_dtype(['t', 't'])
+    cluster = index.servers.find_by_instance_id(server.parent_id) if server.parent_id else None
+    table.add_rows([['server', server.name],
+                    ['type', server.pretty_type()],
+                    ['instance_id', server.instance_id],
+                    ['cluster', cluster.name if cluster else '-']], header=False)
+    print_table(table, as_json)
+
+    if server.is_cluster():
+        table = TextTable(max_width=120)
+        table.header(['member', 'instance_id'])
+        table.set_cols_dtype(['t', 't'])
+        for member in server.members():
+            table.add_row([member.name, member.instance_id])
+        print_table(table, as_json)
+
+    table = TextTable(max_width=120)
+    table.header(['volume', 'instance_id', 'wwid', 'status', 'mapped_via'])
+    table.set_cols_dtype(['t', 't', 't', 't', 't'])
+    direct_ids = set(index.volume_ids(server.instance_id, include_cluster=False))
+    for volume in server.volumes():
+        mapped_via = 'direct' if volume.instance_id in direct_ids else 'cluster %s' % (cluster.name if cluster else '')
+        table.add_row([volume.name, volume.instance_id, volume.wwid, volume.status, mapped_via])
+    print_table(table, as_json)
+    return ReturnCode.SUCCESS
+
+
+def storage_center_list(session: DsmSession, as_json: bool = False) -> int:
+    """
+    Print table of Storage Centers connected to Dell Storage Manager
+    :param session: Authenticated session with Dell Storage Manager
+    :param as_json: Print tables in JSON format
+    :return: ReturnCode.SUCCESS or ReturnCode.FAILURE based on the outcome of a operation
+    """
+    storage_centers = session.storage_centers()
+    table = TextTable()
+    table.header(["name", "ip", "instance_id", "serial"])
+    table.set_cols_dtype(['t', 't', 't', 't'])
+
+    for storage_center in storage_centers:
+        table.add_row([storage_center.name,
+                       storage_center.ip_addr,
+                       storage_center.instance_id,
+                       storage_center.serial_num])
+    print_table(table, as_json)
+
+    return ReturnCode.SUCCESS
+
+
+def report_capacity(storage_centers: List[StorageCenter], group_by: str,  # pylint: disable=R0914
+                    as_json: bool = False) -> int:
+    """
+    Print capacity report (configured size and used space of volumes) aggregated per Storage Center, volume folder or
+    server.
+    :param storage_centers: Storage Centers included in the report
+    :param group_by: Aggregation of the report (one of CapacityReport.GROUPS)
+    :param as_json: Print tables in JSON format
+    :return: ReturnCode.SUCCESS or ReturnCode.FAILURE based on the outcome of a operation
+    """
+    report = CapacityReport()
+    labels: Dict[Any, str] = {CapacityReport.UNMAPPED: '(unmapped)'}
+    for storage_center in storage_centers:
+        try:
+            usage = storage_center.storage_usage(include_mapping=group_by == CapacityReport.GROUP_SERVER)
+        except InventoryError as exc:
+            print("Error: Failed to collect capacity report - %s" % exc)
+            return ReturnCode.FAILURE
+        report.extend(usage)
+        labels[storage_center.instance_id] = storage_center.name
+        if group_by == CapacityReport.GROUP_FOLDER:
+            folders = storage_center.volume_folder_list()
+            if not folders:
+                print("Error: Failed to fetch volume folders of Storage Center '%s'" % storage_center.instance_id)
+                return ReturnCode.FAILURE
+            folder_tree = folders.tree()
+            for folder in folder_tree.walk():
+                labels[folder.instance_id] = '%s:%s' % (storage_center.name, folder_tree.path(folder.instance_id))
+        for server_key, server_name in usage.server_names.items():
+            labels[server_key] = '%s:%s' % (storage_center.name, server_name)
+    if report.missing_usage:
+        print("WARNING: Storage usage of %d volumes could not be fetched, their used space is reported as 0"
+              % len(report.missing_usage))
+
+    gib = float(1024 ** 3)
+    table = TextTable(max_width=120)
+    table.header([group_by, 'volumes', 'configured_gb', 'used_gb', 'used_percent'])
+    table.set_cols_dtype(['t', 'i', 'f', 'f', 'f'])
+    rows = [(labels.get(key, key), count, configured, used)
+            for key, (count, configured, used) in report.aggregate(group_by).items()]
+    configured_total, used_total = report.totals()
+    rows.sort()
+    rows.append(('TOTAL', len(report), configured_total, used_total))
+    for label, count, configured, used in rows:
+        table.add_row([label, count, configured / gib, used / gib, 100.0 * used / configured if configured else 0.0])
+    print_table(table, as_json)
+
+    return ReturnCode.SUCCESS
+
+
+def export_inventory(storage: StorageCenter, kind: str, output_path: str, chunked: bool = False,
+                     row_group_size: int = columnar.DEFAULT_ROW_GROUP_SIZE) -> int:
+    """
+    Export inventory of Storage Center objects to compact columnar file
+    :param storage: Storage Center, from which the objects will be exported
+    :param kind: Kind of exported objects (one of columnar.SCHEMAS)
+    :param output_path: Path to output file
+    :param chunked: Fetch volumes in slices (one per volume folder) and write them as they arrive
+    :param row_group_size: Number of rows in single row group
+    :return: ReturnCode.SUCCESS or ReturnCode.FAILURE based on the outcome of a operation
+    """
+    try:
+        with open(output_path, 'wb') as output:
+            if kind == columnar.KIND_VOLUME:
+                volumes = itertools.chain.from_iterable(storage.iter_volume_chunks()) if chunked \
+                    else storage.volume_list()
+                rows = columnar.export_volumes(output, volumes, row_group_size)
+            elif kind == columnar.KIND_SERVER:
+                rows = columnar.export_servers(output, storage.server_list(), row_group_size)
+            else:
+                rows = columnar.export_volume_folders(output, storage.volume_folder_list(), row_group_size)
+    except InventoryError as exc:
+        # Incomplete export would look like complete one, so partially written file is removed
+        os.remove(output_path)
+        print("Error: Failed to export objects of type '%s' - %s" % (kind, exc))
+        return ReturnCode.FAILURE
+    except OSError as exc:
+        print("Error: Failed to write objects of type '%s' to '%s' - %s" % (kind, output_path, exc))
+        return ReturnCode.FAILURE
+    print("OK - Exported %d objects of type '%s' to '%s'" % (rows, kind, output_path))
+    return ReturnCode.SUCCESS
+
+
+def snapshot_refresh(storage_centers: List[StorageCenter], snapshot_store: SnapshotStore) -> int:
+    """
+    Fetch volumes, servers and volume folders of Storage Centers and write them as inventory snapshots shared by all
+    processes on this host (see --use-snapshot)
+    :param storage_centers: Storage Centers whose snapshots will be refreshed
+    :param snapshot_store: Store where the snapshots are written
+    :return: ReturnCode.SUCCESS or ReturnCode.FAILURE based on the outcome of a operation
+    """
+    ret_code = ReturnCode.SUCCESS
+    for storage_center in storage_centers:
+        path = storage_center.refresh_snapshot(snapshot_store)
+        if path is None:
+            print("Failed to refresh snapshot of Storage Center '%s'" % storage_center.name)
+            ret_code = ReturnCode.FAILURE
+        else:
+            print("OK - Snapshot of Storage Center '%s' written to '%s'" % (storage_center.name, path))
+    return ret_code
+
+
+def watch(storage_centers: List[StorageCenter], interval: float, jitter: float, include_servers: bool,
+          include_mapping: bool, max_polls: Optional[int] = None) -> int:
+    """
+    Poll Storage Centers in a loop and print detected changes of volumes and servers as JSON lines
+    :param storage_centers: Watched Storage Centers
+    :param interval: Number of seconds between polls
+    :param jitter: Random deviation of the interval (fraction of the interval)
+    :param include_servers: Watch also changes of servers
+    :param include_mapping: Watch also changes of volume mapping
+    :param max_polls: Stop after this number of polls (Defaults to infinite loop)
+    :return: ReturnCode.SUCCESS or ReturnCode.FAILURE based on the outcome of a operation
+    """
+    watcher = Watcher(storage_centers, interval, jitter, include_servers, include_mapping)
+    try:
+        for event in watcher.watch(max_polls):
+            print(codec.dumps(event.to_dict()), flush=True)
+    except KeyboardInterrupt:
+        pass
+    return ReturnCode.SUCCESS
+
+
+def load_jobs(resolver: NameResolver, jobs_path: str) -> Optional[List[Job]]:  # pylint: disable=R0914
+    """
+    Load volume operations from jobs file and translate names of Storage Centers, volumes and servers in them to
+    instance IDs. Jobs file is json list of objects with keys 'storage_center', 'volume', 'operation' and optional
+    'arguments' (e.g.: {"storage_center": "sc1", "volume": "db01", "operation": "expand_to_size",
+    "arguments": {"size": "2TB"}}).
+    :param resolver: Resolver of object names
+    :param jobs_path: Path to jobs file
+    :return: List of jobs or None if jobs file is invalid or some reference can not be resolved
+    """
+    try:
+        with open(jobs_path, 'r', encoding='utf-8') as jobs_file:
+            jobs_data = json.load(jobs_file)
+    except (OSError, ValueError) as exc:
+        print("Failed to load jobs file '%s' - %s" % (jobs_path, exc))
+        return None
+    storage_centers: Dict[str, StorageCenter] = {}
+    for job_data in jobs_data:
+        reference = job_data.get('storage_center', '')
+        if reference not in storage_centers:
+            storage_center = find_storage_center(resolver, reference)
+            if storage_center is None:
+                return None
+            storage_centers[reference] = storage_center
+
+    # Every distinct volume and server is resolved (and verified against DSM) only once, concurrently
+    futures: Dict[Tuple[str, str, str], Any] = {}
+    with ThreadPoolExecutor(max_workers=RESOLVE_WORKERS) as executor:
+        for job_data in jobs_data:
+            storage_center = storage_centers[job_data.get('storage_center', '')]
+            key = ('volume', storage_center.instance_id, job_data.get('volume', ''))
+            if key not in futures:
+                futures[key] = executor.submit(resolver.volume_id, storage_center, key[2], True)
+            server_reference = job_data.get('arguments', {}).get('server_id', None)
+            key = ('server', storage_center.instance_id, server_reference)
+            if server_reference is not None and key not in futures:
+                futures[key] = executor.submit(resolver.server_id, storage_center, server_reference, True)
+        instance_ids: Dict[Tuple[str, str, str], Optional[str]] = {key: future.result()
+                                                                   for key, future in futures.items()}
+    if None in instance_ids.values():
+        return None
+
+    jobs = []
+    occurrences: Dict[Any, int] = {}
+    for index, job_data in enumerate(jobs_data):
+        storage_center_id = storage_centers[job_data.get('storage_center', '')].instance_id
+        volume_id = instance_ids[('volume', storage_center_id, job_data.get('volume', ''))]
+        arguments = dict(job_data.get('arguments', {}))
+        if 'server_id' in arguments:
+            arguments['server_id'] = instance_ids[('server', storage_center_id, arguments['server_id'])]
+        operation = job_data.get('operation', '')
+        # Identical jobs (e.g.: volume expanded twice by the same amount) are told apart by their occurrence
+        content = (storage_center_id, volume_id, operation, json.dumps(arguments, sort_keys=True))
+        occurrences[content] = occurrences.get(content, -1) + 1
+        try:
+            jobs.append(Job.create(storage_center_id, str(volume_id), operation, arguments, occurrences[content]))
+        except ValueError as exc:
+            print("Invalid job #%d in jobs file - %s" % (index, exc))
+            return None
+    return jobs
+
+
+def _print_job_progress(job: Job, progress: JobProgress) -> None:
+    """
+    Print progress of job queue after job is finished
+    :param job: Finished job
+    :param progress: Current progress of job queue
+    :return: None
+    """
+    print("[%s] Job %s: %s of volume %s - %s" % (progress, job.job_id, job.operation, job.volume_id, job.state),
+          file=sys.stderr)
+
+
+def _job_error(job: Job) -> str:
+    """
+    Describe failure of a job (HTTP status and DSM error message)
+    :param job: Job
+    :return: Description of the failure or empty string if the job did not fail
+    """
+    if job.state != Job.STATE_FAILED:
+        return ''
+    error = '%s (%s)' % (job.error, job.status_code) if job.status_code else job.error
+    return error + (' [retryable]' if job.retryable else '')
+
+
+def job_status(queue: JobQueue, as_json: bool = False) -> int:
+    """
+    Print table of jobs in job queue together with latency summary of finished operations
+    :param queue: Job queue
+    :param as_json: Print tables in JSON format
+    :return: ReturnCode.SUCCESS if no job failed, otherwise ReturnCode.FAILURE
+    """
+    table = TextTable(max_width=120)
+    table.header(['job', 'storage_center', 'volume', 'operation', 'arguments', 'state', 'latency', 'error'])
+    table.set_cols_dtype(['t', 't', 't', 't', 't', 't', 't', 't'])
+    for job in queue:
+        latency = job.latency
+        table.add_row([job.job_id, job.storage_center_id, job.volume_id, job.operation, json.dumps(job.arguments),
+                       job.state, '%.3fs' % latency if latency is not None else '', _job_error(job)])
+    print_table(table, as_json)
+
+    summary = TextTable(max_width=120)
+    summary.header(['operation', 'count', 'mean', 'p50', 'p95', 'max'])
+    summary.set_cols_dtype(['t', 'i', 'f', 'f', 'f', 'f'])
+    for operation, stats in sorted(queue.latency_summary().items()):
+        summary.add_row([operation, stats['count'], stats['mean'], stats['p50'], stats['p95'], stats['max']])
+    print_table(summary, as_json)
+
+    progress = queue.progress()
+    print(progress)
+    return ReturnCode.FAILURE if progress.failed else ReturnCode.SUCCESS
+
+
+def open_job_queue(session: DsmSession, state_path: str,
+                    max_workers_per_sc: int = JobQueue.DEFAULT_WORKERS_PER_SC) -> Optional[JobQueue]:
+    """
+    Create job queue with state loaded from state file
+    :param session: Session with DSM
+    :param state_path: Path to state file
+    :param max_workers_per_sc: Maximum number of concurrent operations per Storage Center
+    :return: Job queue or None if state file can not be loaded
+    """
+    try:
+        return JobQueue(session, state_path, max_workers_per_sc)
+    except JobStateError as exc:
+        print("Error: %s" % exc)
+        return None
+
+
+def job_run(queue: JobQueue, jobs: List[Job], retry_failed: bool = False, retryable_only: bool = False,
+            as_json: bool = False) -> int:
+    """
+    Add jobs to job queue, execute all pending jobs and print final status of the queue. Jobs that already finished in
+    previous (interrupted) run with the same state file are not executed again, jobs from state file that are not in
+    the list of jobs anymore are discarded. Status messages of individual API calls are not printed, failures are
+    reported in the final status table.
+    :param queue: Job queue
+    :param jobs: Jobs to execute
+    :param retry_failed: Execute again jobs that failed in previous run
+    :param retryable_only: Execute again only jobs whose failure is transient (e.g.: timeout or throttling)
+    :param as_json: Print tables in JSON format
+    :return: ReturnCode.SUCCESS if no job failed, otherwise ReturnCode.FAILURE
+    """
+    discarded = queue.retain(job.job_id for job in jobs)
+    if discarded:
+        print("WARNING: %d jobs from state file are not in jobs file anymore and were discarded" % discarded)
+    for job in jobs:
+        queue.add(job)
+    if retry_failed or retryable_only:
+        queue.retry_failed(retryable_only)
+    with api_result.quiet():
+        queue.run(progress_callback=_print_job_progress)
+    return job_status(queue, as_json)
+
+
+def _print_plan(plan: Plan, latencies: Optional[EndpointLatencies] = None, workers: int = 4,
+                as_json: bool = False) -> None:
+    """
+    Print steps of the plan together with DSM calls they perform and estimated duration of the plan
+    :param plan: Printed plan
+    :param latencies: Recorded latencies of DSM endpoints
+    :param workers: Maximum number of concurrently executed plan steps
+    :param as_json: Print table in JSON format
+    :return: None
+    """
+    table = TextTable(max_width=120)
+    table.header(['step', 'action', 'target', 'arguments', 'depends_on', 'calls'])
+    table.set_cols_dtype(['i', 't', 't', 't', 't', 't'])
+    for step in plan.steps:
+        table.add_row([step.step_id, step.action, step.target, json.dumps(step.arguments),
+                       ','.join(str(step_id) for step_id in step.depends_on),
+                       '\n'.join('%s %s' % call for call in plan.calls(step))])
+    print_table(table, as_json)
+    requests_count, duration = plan.estimate(latencies, workers)
+    print("Plan performs %d requests, estimated duration %.1fs" % (requests_count, duration))
+
+
+def apply(resolver: NameResolver, state_path: str, workers: int, dry_run: bool = False,  # pylint: disable=R0914
+          rollback: bool = True, latencies: Optional[EndpointLatencies] = None, as_json: bool = False) -> int:
+    """
+    Bring Storage Centers to the state described in desired state file. Minimal plan of changes is computed for every
+    Storage Center first and plans are printed and executed only if all of them were computed. If some step of a plan
+    fails, all finished steps of the plan are rolled back, so the command can be safely retried.
+    :param resolver: Resolver of object names
+    :param state_path: Path to JSON file with desired state
+    :param workers: Maximum number of concurrently executed plan steps
+    :param dry_run: Only print plans without executing them
+    :param rollback: Roll back the plan if any step fails
+    :param latencies: Recorded latencies of DSM endpoints used to estimate duration of plans
+    :param as_json: Print tables in JSON format
+    :return: ReturnCode.SUCCESS or ReturnCode.FAILURE based on the outcome of a operation
+    """
+    try:
+        desired_states = load_desired_state(state_path)
+    except (OSError, ValueError) as exc:
+        print("Failed to load desired state file '%s' - %s" % (state_path, exc))
+        return ReturnCode.FAILURE
+    plans = []
+    for desired in desired_states:
+        storage_center = find_storage_center(resolver, desired.get('storage_center', ''))
+        if storage_center is None:
+            return ReturnCode.FAILURE
+        try:
+            plans.append((storage_center, Reconciler(storage_center).plan(desired)))
+        except (KeyError, ReconcileError) as exc:
+            print("Failed to compute plan for storage center '%s' - %s" % (storage_center.name, exc))
+            return ReturnCode.FAILURE
+
+    ret_code = ReturnCode.SUCCESS
+    for storage_center, plan in plans:
+        if not plan:
+            print("OK - Storage center '%s' is already in desired state" % storage_center.name)
+            continue
+        print("Plan for storage center '%s':" % storage_center.name)
+        _print_plan(plan, latencies, workers, as_json)
+        if dry_run:
+            continue
+        success = plan.execute(workers, rollback, quiet=True)
+        table = TextTable(max_width=120)
+        table.header(['step', 'action', 'target', 'state', 'latency', 'error'])
+        table.set_cols_dtype(['i', 't', 't', 't', 't', 't'])
+        for step in plan.steps:
+            result = step.result
+            table.add_row([step.step_id, step.action, step.target, step.state,
+                           '%.3fs' % result.latency if result is not None else '',
+                           result.error_message if result is not None else ''])
+        print_table(table, as_json)
+        if not success:
+            ret_code = ReturnCode.FAILURE
+    return ret_code
+
+
+def resolve_volume_folder_id(resolver: NameResolver, storage: StorageCenter, folder: str) -> Optional[str]:
+    """
+    Translate Volume Folder reference supplied on command line to instance ID. Reference is either instance ID of a
+    folder or its full path (e.g.: '/prod/db/'). Empty reference (meaning default folder) is returned unchanged.
+    :param resolver: Resolver of object names
+    :param storage: Storage Center where the folder is located
+    :param folder: Instance ID or full path of a Volume Folder
+    :return: Instance ID of a Volume Folder or None if the reference can not be resolved
+    """
+    if not folder:
+        return ''
+    return resolver.volume_folder_id(storage, folder)
+
+
+def find_storage_center(resolver: NameResolver, reference: str) -> Optional[StorageCenter]:
+    """
+    Find and return Storage Center with specified Instance ID, name or serial number connected to Dell Storage manager.
+    If no such Storage Center is found, return None.
+    :param resolver: Resolver of object names
+    :param reference: Instance ID, name or serial number of a Storage Center that should be returned
+    :return: Storage Center with Given reference or None if no such Storage Center is found
+    """
+    with profiling.phase(profiling.PHASE_SC_LOOKUP):
+        storage_center = resolver.storage_center(reference)
+    if storage_center is None:
+        print("Failed to find storage center '%s'. Try listing all storage "
+              "centers with command 'storage_center list'" % reference)
+    return storage_center
+
+
+def print_profile(profiler: profiling.Profiler, output_prefix: str = '') -> None:
+    """
+    Print time spent in individual phases of the command to stderr and save cProfile statistics and sampled call
+    stacks, if output prefix is specified
+    :param profiler: Profiler that measured the command
+    :param output_prefix: Prefix of output files ('<prefix>.pstats' and '<prefix>.folded')
+    :return: None
+    """
+    table = TextTable(max_width=120)
+    table.header(['phase', 'calls', 'total [s]', 'self [s]', 'self [%]'])
+    table.set_cols_dtype(['t', 'i', 'f', 'f', 'f'])
+    table.set_cols_align(['l', 'r', 'r', 'r', 'r'])
+    for phase, count, total, self_time in profiler.summary():
+        share = 100 * self_time / profiler.wall_time if profiler.wall_time else 0
+        table.add_row([phase, count, total, self_time, share])
+    print(table.draw(), file=sys.stderr)
+    print("Wall time: %.3fs (phases running in parallel threads can exceed wall time)" % profiler.wall_time,
+          file=sys.stderr)
+    if output_prefix:
+        profiler.dump_stats(output_prefix + '.pstats')
+        profiler.write_folded(output_prefix + '.folded')
+        print("Profile saved to '%s.pstats' (pstats) and '%s.folded' (folded stacks for flamegraph)"
+              % (output_prefix, output_prefix), file=sys.stderr)
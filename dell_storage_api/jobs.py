@@ -0,0 +1,411 @@
+"""
+This module contains job queue for bulk execution of long-running volume operations (e.g.: expansion, mapping or
+removal of volumes). Jobs are executed concurrently with limited number of concurrent operations per Storage Center
+and their state is persisted into local file, so that interrupted run can be resumed later. Jobs created by
+'Job.create' are identified by their content, so jobs in state file match the same operations in next run even if
+the list of jobs was reordered or edited.
+"""
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from dell_storage_api.result import ApiResult, report
+from dell_storage_api.session import DsmSession
+from dell_storage_api.volume import Volume
+
+
+class JobStateError(Exception):
+    """ Exception raised when state file of job queue can not be loaded """
+
+
+class Job:
+    """
+    Class representing single volume operation in job queue. Operation is identified by name of a Volume method
+    (e.g.: 'expand_to_size') and its keyword arguments.
+    """
+    STATE_PENDING = 'pending'
+    STATE_RUNNING = 'running'
+    STATE_DONE = 'done'
+    STATE_FAILED = 'failed'
+
+    # Supported operations and names of their required arguments
+    OPERATIONS = {
+        'expand': ['size'],
+        'expand_to_size': ['size'],
+        'map_to_server': ['server_id'],
+        'unmap': [],
+        'recycle': [],
+        'delete': [],
+    }
+    # Operations that reach the same result when repeated, so they can be safely executed again after interruption
+    IDEMPOTENT_OPERATIONS = {'expand_to_size'}
+    INTERRUPTED_ERROR = 'Interrupted while running, verify the volume before retrying'
+
+    def __init__(self, job_id: str, storage_center_id: str, volume_id: str, operation: str,
+                 arguments: Optional[Dict[str, str]] = None) -> None:
+        if operation not in self.OPERATIONS:
+            raise ValueError("Unsupported volume operation '%s'" % operation)
+        arguments = arguments or {}
+        missing = [name for name in self.OPERATIONS[operation] if name not in arguments]
+        if missing:
+            raise ValueError("Operation '%s' requires arguments: %s" % (operation, ', '.join(missing)))
+        self.job_id = job_id
+        self.storage_center_id = storage_center_id
+        self.volume_id = volume_id
+        self.operation = operation
+        self.arguments = arguments
+        self.state = self.STATE_PENDING
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        # Outcome of the last attempt (HTTP status, DSM error message and whether the failure is transient)
+        self.status_code: Optional[int] = None
+        self.error = ''
+        self.retryable = False
+
+    @classmethod
+    def create(cls, storage_center_id: str, volume_id: str, operation: str,
+               arguments: Optional[Dict[str, str]] = None, occurrence: int = 0) -> 'Job':
+        """
+        Class method that creates Job with ID derived from its content (Storage Center, volume, operation and its
+        arguments), so the ID does not depend on position of the job in a list of jobs
+        :param storage_center_id: Instance ID of a Storage Center
+        :param volume_id: Instance ID of a volume
+        :param operation: Name of a Volume method
+        :param arguments: Keyword arguments of the operation
+        :param occurrence: Number of identical jobs created before this one (e.g.: volume expanded twice by 10GB)
+        :return: instance of a Job class
+        """
+        content = json.dumps([storage_center_id, volume_id, operation, arguments or {}, occurrence], sort_keys=True)
+        job_id = hashlib.sha1(content.encode()).hexdigest()[:12]
+        return Job(job_id, storage_center_id, volume_id, operation, arguments)
+
+    @property
+    def latency(self) -> Optional[float]:
+        """
+        Return duration of the operation in seconds or None if the operation did not finish yet
+        :return: Duration of the operation
+        """
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
+
+    @property
+    def is_finished(self) -> bool:
+        """
+        Did this job finish (successfully or not)?
+        :return: True if job is done or failed, otherwise False
+        """
+        return self.state in (self.STATE_DONE, self.STATE_FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return representation of this job that can be serialized to json
+        :return: Dictionary describing this job
+        """
+        return {'job_id': self.job_id,
+                'storage_center_id': self.storage_center_id,
+                'volume_id': self.volume_id,
+                'operation': self.operation,
+                'arguments': self.arguments,
+                'state': self.state,
+                'started': self.started,
+                'finished': self.finished,
+                'status_code': self.status_code,
+                'error': self.error,
+                'retryable': self.retryable}
+
+    @classmethod
+    def from_dict(cls, source_dict: Dict[str, Any]) -> 'Job':
+        """
+        Class method that creates instance of Job from dictionary created by 'to_dict' method
+        :param source_dict: Dictionary describing the job
+        :return: instance of a Job class
+        """
+        job = Job(job_id=source_dict['job_id'],
+                  storage_center_id=source_dict['storage_center_id'],
+                  volume_id=source_dict['volume_id'],
+                  operation=source_dict['operation'],
+                  arguments=source_dict.get('arguments', {}))
+        job.state = source_dict.get('state', cls.STATE_PENDING)
+        job.started = source_dict.get('started', None)
+        job.finished = source_dict.get('finished', None)
+        job.status_code = source_dict.get('status_code', None)
+        job.error = source_dict.get('error', '')
+        job.retryable = source_dict.get('retryable', False)
+        return job
+
+    def record(self, result: ApiResult) -> None:
+        """
+        Record outcome of the operation and mark the job as done or failed
+        :param result: Result of the API call performed by the job
+        :return: None
+        """
+        self.state = self.STATE_DONE if result else self.STATE_FAILED
+        self.status_code = result.status_code
+        self.error = result.error_message
+        self.retryable = result.retryable
+
+
+class JobProgress:  # pylint: disable=R0903
+    """
+    Snapshot of job queue progress
+    """
+
+    def __init__(self, total: int, done: int, failed: int, running: int, elapsed: float, resumed: int = 0) -> None:
+        self.total = total
+        self.done = done
+        self.failed = failed
+        self.running = running
+        self.elapsed = elapsed
+        self.resumed = resumed
+
+    @property
+    def finished(self) -> int:
+        """
+        Return number of finished jobs (successful or failed)
+        :return: Number of finished jobs
+        """
+        return self.done + self.failed
+
+    @property
+    def eta(self) -> Optional[float]:
+        """
+        Return estimated number of seconds until all jobs are finished, based on throughput observed in current run.
+        Jobs finished in previous (resumed) runs are not counted. Return None if no job finished in current run yet.
+        :return: Estimated remaining time in seconds
+        """
+        finished_now = self.finished - self.resumed
+        if finished_now <= 0:
+            return None
+        return self.elapsed / finished_now * (self.total - self.finished)
+
+    def __str__(self) -> str:
+        eta = self.eta
+        return "%d/%d finished (%d failed, %d running), ETA %s" % (self.finished, self.total, self.failed,
+                                                                  self.running,
+                                                                  '%.0fs' % eta if eta is not None else 'unknown')
+
+
+class JobQueue:
+    """
+    Queue of volume operations. Jobs are executed in thread pool, while number of concurrently running jobs against
+    single Storage Center is limited by 'max_workers_per_sc'. If 'state_path' is specified, state of all jobs is saved
+    to this file after every finished job and loaded back when the queue is created, so that jobs that already
+    finished are not executed again.
+    """
+    DEFAULT_WORKERS_PER_SC = 4
+
+    def __init__(self, session: DsmSession, state_path: str = '',
+                 max_workers_per_sc: int = DEFAULT_WORKERS_PER_SC) -> None:
+        self.session = session
+        self.state_path = state_path
+        self.max_workers_per_sc = max(1, max_workers_per_sc)
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._started: Optional[float] = None
+        self._resumed = 0
+        self._load()
+
+    def __iter__(self) -> Iterator[Job]:
+        return iter(self._jobs.values())
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def _load(self) -> None:
+        """
+        Internal method that loads state of jobs from state file. Jobs that were running when the previous run was
+        interrupted may have already finished on DSM. Idempotent jobs are returned to pending state, other jobs are
+        marked as failed (not retryable), so they are executed again only after explicit retry.
+        :raises JobStateError: if state file is corrupted
+        :return: None
+        """
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as state_file:
+                jobs = [Job.from_dict(job_data) for job_data in json.load(state_file)]
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            raise JobStateError("Failed to load job state file '%s' - %s" % (self.state_path, exc)) from exc
+        for job in jobs:
+            if job.state == Job.STATE_RUNNING and job.operation in Job.IDEMPOTENT_OPERATIONS:
+                job.state = Job.STATE_PENDING
+                job.started = None
+            elif job.state == Job.STATE_RUNNING:
+                job.state = Job.STATE_FAILED
+                job.status_code = None
+                job.error = Job.INTERRUPTED_ERROR
+                job.retryable = False
+            self._jobs[job.job_id] = job
+
+    def _save(self) -> None:
+        """
+        Internal method that atomically replaces state file with current state of all jobs. Caller has to hold the
+        queue lock.
+        :return: None
+        """
+        if not self.state_path:
+            return
+        tmp_path = '%s.%d.tmp' % (self.state_path, os.getpid())
+        with open(tmp_path, 'w', encoding='utf-8') as state_file:
+            json.dump([job.to_dict() for job in self._jobs.values()], state_file)
+        os.replace(tmp_path, self.state_path)
+
+    def add(self, job: Job) -> Job:
+        """
+        Add job to the queue. If job with the same ID is already known (e.g.: loaded from state file), the known job
+        is kept and returned instead.
+        :param job: Job to add
+        :return: Job stored in the queue
+        """
+        with self._lock:
+            return self._jobs.setdefault(job.job_id, job)
+
+    def retain(self, job_ids: Iterable[str]) -> int:
+        """
+        Remove jobs that are not listed in job_ids from the queue (e.g.: jobs from state file that were removed from
+        the list of jobs since previous run), so they are not executed
+        :param job_ids: IDs of jobs that should be kept
+        :return: Number of removed jobs
+        """
+        kept = set(job_ids)
+        with self._lock:
+            removed = [job_id for job_id in self._jobs if job_id not in kept]
+            for job_id in removed:
+                del self._jobs[job_id]
+            if removed:
+                self._save()
+        return len(removed)
+
+    def retry_failed(self, retryable_only: bool = False) -> int:
+        """
+        Return failed jobs to pending state, so they are executed again by next call to 'run'
+        :param retryable_only: Retry only jobs whose failure is transient (e.g.: timeout or throttling by DSM)
+        :return: Number of jobs returned to pending state
+        """
+        count = 0
+        with self._lock:
+            for job in self._jobs.values():
+                if job.state == Job.STATE_FAILED and (job.retryable or not retryable_only):
+                    job.state = Job.STATE_PENDING
+                    job.started = job.finished = None
+                    count += 1
+            self._save()
+        return count
+
+    def progress(self) -> JobProgress:
+        """
+        Return current progress of the queue
+        :return: Snapshot of queue progress
+        """
+        with self._lock:
+            states = [job.state for job in self._jobs.values()]
+        elapsed = time.time() - self._started if self._started is not None else 0.0
+        return JobProgress(total=len(states),
+                           done=states.count(Job.STATE_DONE),
+                           failed=states.count(Job.STATE_FAILED),
+                           running=states.count(Job.STATE_RUNNING),
+                           elapsed=elapsed,
+                           resumed=self._resumed)
+
+    def latency_summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Return latency statistics of finished jobs per operation. Statistics contain number of finished jobs ('count')
+        and mean, median ('p50'), 95th percentile ('p95') and maximum ('max') duration in seconds.
+        :return: Dictionary of latency statistics indexed by operation name
+        """
+        latencies: Dict[str, List[float]] = {}
+        with self._lock:
+            for job in self._jobs.values():
+                latency = job.latency
+                if job.is_finished and latency is not None:
+                    latencies.setdefault(job.operation, []).append(latency)
+        summary = {}
+        for operation, values in latencies.items():
+            values.sort()
+            summary[operation] = {'count': len(values),
+                                  'mean': sum(values) / len(values),
+                                  'p50': values[int(0.50 * (len(values) - 1))],
+                                  'p95': values[int(0.95 * (len(values) - 1))],
+                                  'max': values[-1]}
+        return summary
+
+    def _execute(self, job: Job) -> ApiResult:
+        """
+        Internal method that performs API call represented by the job
+        :param job: Job to execute
+        :return: Result of the API call
+        """
+        volume = Volume(req_session=self.session.session,
+                        base_url=self.session.base_url,
+                        name=job.volume_id,
+                        instance_id=job.volume_id,
+                        parent_folder_id='',
+                        wwid='',
+                        status='')
+        result: ApiResult = getattr(volume, job.operation)(**job.arguments)
+        return result
+
+    def _run_job(self, job: Job, progress_callback: Optional[Callable[[Job, JobProgress], None]]) -> None:
+        """
+        Internal method that runs single job
+        :param job: Job to run
+        :param progress_callback: Optional callable invoked after job is finished
+        :return: None
+        """
+        with self._lock:
+            job.state = Job.STATE_RUNNING
+            job.started = time.time()
+            self._save()
+        try:
+            result = self._execute(job)
+        except Exception as exc:  # pylint: disable=W0703
+            report("Error: Job %s (%s of volume %s) failed - %s" % (job.job_id, job.operation, job.volume_id, exc))
+            result = ApiResult.failure(job.operation, exc)
+        with self._lock:
+            job.finished = time.time()
+            job.record(result)
+            self._save()
+        if progress_callback is not None:
+            progress_callback(job, self.progress())
+
+    def _run_worker(self, jobs: 'queue.Queue[Job]',
+                    progress_callback: Optional[Callable[[Job, JobProgress], None]]) -> None:
+        """
+        Internal method that runs jobs from queue of single Storage Center until the queue is empty
+        :param jobs: Pending jobs of one Storage Center
+        :param progress_callback: Optional callable invoked after every finished job
+        :return: None
+        """
+        while True:
+            try:
+                job = jobs.get_nowait()
+            except queue.Empty:
+                return
+            self._run_job(job, progress_callback)
+
+    def run(self, progress_callback: Optional[Callable[[Job, JobProgress], None]] = None) -> JobProgress:
+        """
+        Execute all pending jobs and wait until they are finished. Every Storage Center has its own queue of pending
+        jobs served by 'max_workers_per_sc' workers, so jobs of busy Storage Center do not delay jobs of other ones.
+        :param progress_callback: Optional callable invoked with finished job and current progress after every job
+        :return: Final progress of the queue
+        """
+        pending = [job for job in self._jobs.values() if job.state == Job.STATE_PENDING]
+        queues: Dict[str, 'queue.Queue[Job]'] = {}
+        for job in pending:
+            queues.setdefault(job.storage_center_id, queue.Queue()).put(job)
+        self._resumed = len(self._jobs) - len(pending)
+        self._started = time.time()
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.max_workers_per_sc * len(queues)) as executor:
+                futures = [executor.submit(self._run_worker, jobs, progress_callback)
+                           for jobs in queues.values() for _ in range(self.max_workers_per_sc)]
+                for future in futures:
+                    future.result()
+        return self.progress()
@@ -0,0 +1,105 @@
+"""
+This module contains bidirectional index of volume mapping and cluster membership in a Storage Center. Index is built
+from bulk listings (all mapping profiles, all servers and optionally all volumes), so questions like "which volumes
+does cluster X expose" or "which physical servers sit behind cluster X" can be answered without per-object requests.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from dell_storage_api.server import Server, ServerCollection
+from dell_storage_api.volume import VolumeCollection
+
+
+class MappingIndex:
+    """
+    Index of volume mapping (volume <-> server) and cluster membership (cluster <-> physical server). Servers in
+    'servers' collection are attached to this index, so their methods 'volumes' and 'members' can be used without
+    arguments. If 'volumes' collection is not supplied, volume lookups return only volumes present in it (none).
+    """
+
+    def __init__(self, profiles: Iterable[Dict[Any, Any]], servers: ServerCollection,
+                 volumes: Optional[VolumeCollection] = None) -> None:
+        self.servers = servers
+        self.volumes = volumes if volumes is not None else VolumeCollection()
+        self._volumes_by_server: Dict[str, List[str]] = {}
+        self._servers_by_volume: Dict[str, List[str]] = {}
+        self._members_by_cluster: Dict[str, List[str]] = {}
+        for profile in profiles:
+            volume_id = profile['volume']['instanceId']
+            server_id = profile['server']['instanceId']
+            volume_ids = self._volumes_by_server.setdefault(server_id, [])
+            if volume_id not in volume_ids:
+                volume_ids.append(volume_id)
+            server_ids = self._servers_by_volume.setdefault(volume_id, [])
+            if server_id not in server_ids:
+                server_ids.append(server_id)
+        for server in servers:
+            if server.parent_id:
+                self._members_by_cluster.setdefault(server.parent_id, []).append(server.instance_id)
+            server.mapping_index = self
+
+    def volume_ids(self, server_id: str, include_cluster: bool = True) -> List[str]:
+        """
+        Return instance IDs of volumes mapped to server. Volumes mapped to cluster are accessible by all its members,
+        so for physical servers, volumes mapped to their cluster are included unless include_cluster is False.
+        :param server_id: Instance ID of a server or cluster
+        :param include_cluster: Include volumes mapped to cluster of the server
+        :return: List of volume instance IDs
+        """
+        result = list(self._volumes_by_server.get(server_id, []))
+        cluster_id = self.cluster_id(server_id)
+        if include_cluster and cluster_id:
+            result.extend(volume_id for volume_id in self._volumes_by_server.get(cluster_id, [])
+                          if volume_id not in result)
+        return result
+
+    def server_ids(self, volume_id: str) -> List[str]:
+        """
+        Return instance IDs of servers and clusters to which volume is directly mapped
+        :param volume_id: Instance ID of a volume
+        :return: List of server instance IDs
+        """
+        return list(self._servers_by_volume.get(volume_id, []))
+
+    def member_ids(self, cluster_id: str) -> List[str]:
+        """
+        Return instance IDs of physical servers that are members of cluster
+        :param cluster_id: Instance ID of a cluster
+        :return: List of server instance IDs (empty for physical servers)
+        """
+        return list(self._members_by_cluster.get(cluster_id, []))
+
+    def cluster_id(self, server_id: str) -> str:
+        """
+        Return instance ID of cluster that the physical server is member of
+        :param server_id: Instance ID of a physical server
+        :return: Instance ID of a cluster or empty string if server is not member of any cluster
+        """
+        server = self.servers.find_by_instance_id(server_id)
+        return server.parent_id if isinstance(server, Server) else ''
+
+    def volumes_of(self, server_id: str, include_cluster: bool = True) -> VolumeCollection:
+        """
+        Return volumes mapped to server (see 'volume_ids')
+        :param server_id: Instance ID of a server or cluster
+        :param include_cluster: Include volumes mapped to cluster of the server
+        :return: Collection of volumes
+        """
+        result = VolumeCollection()
+        for volume_id in self.volume_ids(server_id, include_cluster):
+            volume = self.volumes.find_by_instance_id(volume_id)
+            if volume is not None:
+                result.add(volume)
+        return result
+
+    def members_of(self, cluster_id: str) -> ServerCollection:
+        """
+        Return physical servers that are members of cluster
+        :param cluster_id: Instance ID of a cluster
+        :return: Collection of servers
+        """
+        result = ServerCollection()
+        for server_id in self.member_ids(cluster_id):
+            server = self.servers.find_by_instance_id(server_id)
+            if server is not None:
+                result.add(server)
+        return result
@@ -0,0 +1,53 @@
+""" This module contains helper for building filter payloads accepted by DSM '/GetList' query endpoints """
+from typing import Any, Dict, List
+
+
+class PayloadFilter:
+    """
+    Class representing filter payload for DSM query endpoints (e.g.: '/StorageCenter/ScVolume/GetList'). These
+    endpoints accept POST request with filter in body and return only objects matching this filter, which allows
+    listing of subsets of objects without downloading complete object lists.
+    """
+    FILTER_AND = 'AND'
+    FILTER_OR = 'OR'
+
+    EQUALS = 'Equals'
+    STARTS_WITH = 'StartsWith'
+    INCLUDES_STRING = 'IncludesString'
+
+    def __init__(self, filter_type: str = FILTER_AND) -> None:
+        self.filter_type = filter_type
+        self._filters: List[Dict[str, Any]] = []
+
+    def append(self, attribute_name: str, attribute_value: Any, filter_type: str = EQUALS) -> 'PayloadFilter':
+        """
+        Add new condition to this filter. Conditions with value None are ignored.
+        :param attribute_name: Name of the object attribute (e.g.: 'scSerialNumber' or 'Name')
+        :param attribute_value: Value that attribute is compared to
+        :param filter_type: Type of comparison (e.g.: PayloadFilter.EQUALS or PayloadFilter.STARTS_WITH)
+        :return: This PayloadFilter, so the calls can be chained
+        """
+        if attribute_value is not None:
+            self._filters.append({'attributeName': attribute_name,
+                                  'attributeValue': attribute_value,
+                                  'filterType': filter_type})
+        return self
+
+    def copy(self) -> 'PayloadFilter':
+        """
+        Return independent copy of this filter, so that conditions can be added without modifying this filter
+        :return: New PayloadFilter with the same conditions
+        """
+        result = PayloadFilter(self.filter_type)
+        for condition in self._filters:
+            result.append(condition['attributeName'], condition['attributeValue'], condition['filterType'])
+        return result
+
+    @property
+    def payload(self) -> Dict[str, Any]:
+        """
+        Return filter in form of dictionary that can be sent as a json body of request to DSM query endpoint
+        :return: Filter payload
+        """
+        return {'filter': {'filterType': self.filter_type,
+                           'filters': list(self._filters)}}
@@ -0,0 +1,227 @@
+"""
+This module contains lightweight profiling hooks. Library code marks its phases (login, fetch, decode, build, ...)
+with 'phase' context manager, which does nothing unless a Profiler is active. Active Profiler accumulates wall time
+spent in each phase and optionally runs cProfile and sampling of call stacks, whose output can be saved as pstats file
+and folded stack file compatible with flamegraph tools (e.g.: flamegraph.pl, speedscope).
+"""
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+PHASE_LOGIN = 'login'
+PHASE_SC_LOOKUP = 'sc_lookup'
+PHASE_FETCH = 'fetch'
+PHASE_DECODE = 'decode'
+PHASE_BUILD = 'build'
+PHASE_FILTER = 'filter'
+PHASE_RENDER = 'render'
+PHASES = [PHASE_LOGIN, PHASE_SC_LOOKUP, PHASE_FETCH, PHASE_DECODE, PHASE_BUILD, PHASE_FILTER, PHASE_RENDER]
+
+_active: Optional['Profiler'] = None
+
+
+class StackSampler:
+    """
+    Sampling profiler that periodically records call stacks of all threads (except its own). Stacks are stored in
+    folded format ('frame;frame;frame') together with number of samples in which they were observed.
+    """
+    DEFAULT_INTERVAL = 0.001
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL) -> None:
+        self.interval = interval
+        self.samples: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _fold(frame: Any) -> str:
+        """
+        Internal method that converts frame and its callers to folded stack (outermost frame first)
+        :param frame: Innermost frame of the stack
+        :return: Folded stack
+        """
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append('%s:%s' % (frame.f_globals.get('__name__', '?'), code.co_name))
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self) -> None:
+        """
+        Internal method executed by sampling thread
+        :return: None
+        """
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():  # pylint: disable=W0212
+                if thread_id == own_id:
+                    continue
+                stack = self._fold(frame)
+                self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    def start(self) -> None:
+        """
+        Start sampling in background thread
+        :return: None
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop sampling and wait for sampling thread to finish
+        :return: None
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def write_folded(self, path: str) -> None:
+        """
+        Write collected samples to file in folded stack format, one 'stack count' line per unique stack
+        :param path: Path to output file
+        :return: None
+        """
+        with open(path, 'w', encoding='utf-8') as folded_file:
+            for stack, count in sorted(self.samples.items()):
+                folded_file.write('%s %d\n' % (stack, count))
+
+
+class Profiler:
+    """
+    Profiler that accumulates time spent in phases marked by 'phase' context manager. Both inclusive time and self
+    time (excluding nested phases in the same thread) are recorded. Phases running concurrently in multiple threads
+    are accumulated independently, so their sum can exceed wall time of the profiled code.
+    If 'cprofile' is True, cProfile of the profiling thread is collected. If 'sample' is True, call stacks of all
+    threads are sampled for flamegraph output. Profiler is activated by using it as context manager.
+    """
+
+    def __init__(self, cprofile: bool = False, sample: bool = False,
+                 sample_interval: float = StackSampler.DEFAULT_INTERVAL) -> None:
+        self.phases: Dict[str, List[float]] = {}
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self.sampler = StackSampler(sample_interval) if sample else None
+        self.started = 0.0
+        self.wall_time = 0.0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._previous: Optional[Profiler] = None
+
+    def __enter__(self) -> 'Profiler':
+        global _active  # pylint: disable=W0603
+        self._previous, _active = _active, self
+        self.started = time.perf_counter()
+        if self.sampler is not None:
+            self.sampler.start()
+        if self.cprofile is not None:
+            self.cprofile.enable()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        global _active  # pylint: disable=W0603
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        if self.sampler is not None:
+            self.sampler.stop()
+        self.wall_time = time.perf_counter() - self.started
+        _active = self._previous
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Measure time spent in phase
+        :param name: Name of the phase (e.g.: PHASE_FETCH)
+        :return: Context manager
+        """
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        # Every stack entry accumulates time of phases nested in it, so that self time can be computed
+        entry = [0.0]
+        stack.append(entry)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            stack.pop()
+            if stack:
+                stack[-1][0] += elapsed
+            with self._lock:
+                record = self.phases.setdefault(name, [0, 0.0, 0.0])
+                record[0] += 1
+                record[1] += elapsed
+                record[2] += elapsed - entry[0]
+
+    def summary(self) -> List[Tuple[str, int, float, float]]:
+        """
+        Return accumulated phases ordered by PHASES (unknown phases at the end)
+        :return: List of tuples (phase, count, inclusive seconds, self seconds)
+        """
+        order = {name: index for index, name in enumerate(PHASES)}
+        with self._lock:
+            return [(name, int(record[0]), record[1], record[2])
+                    for name, record in sorted(self.phases.items(), key=lambda item: (order.get(item[0], len(order)),
+                                                                                       item[0]))]
+
+    def dump_stats(self, path: str) -> None:
+        """
+        Save collected cProfile statistics to file readable by pstats module (e.g.: snakeviz, pstats.Stats)
+        :param path: Path to output file
+        :return: None
+        """
+        if self.cprofile is not None:
+            self.cprofile.dump_stats(path)
+
+    def top_functions(self, limit: int = 20, sort_by: str = 'cumulative') -> str:
+        """
+        Return text report of functions with the highest cost according to cProfile
+        :param limit: Number of reported functions
+        :param sort_by: pstats sort key (e.g.: 'cumulative', 'tottime')
+        :return: Text report (empty if cProfile was not collected)
+        """
+        if self.cprofile is None:
+            return ''
+        output = io.StringIO()
+        pstats.Stats(self.cprofile, stream=output).sort_stats(sort_by).print_stats(limit)
+        return output.getvalue()
+
+    def write_folded(self, path: str) -> None:
+        """
+        Save sampled call stacks in folded stack format
+        :param path: Path to output file
+        :return: None
+        """
+        if self.sampler is not None:
+            self.sampler.write_folded(path)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Measure time spent in phase by active Profiler. If no Profiler is active, this context manager does nothing.
+    :param name: Name of the phase (e.g.: PHASE_FETCH)
+    :return: Context manager
+    """
+    profiler = _active
+    if profiler is None:
+        yield
+    else:
+        with profiler.phase(name):
+            yield
+
+
+def active_profiler() -> Optional[Profiler]:
+    """
+    Return currently active Profiler
+    :return: Active Profiler or None
+    """
+    return _active
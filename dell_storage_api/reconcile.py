@@ -0,0 +1,507 @@
+"""
+This module contains declarative provisioning of volume folders, volumes and their mapping to servers. Desired state
+of Storage Center is compared with its current inventory (fetched once) and minimal plan of changes is computed.
+Plan steps are executed with dependency-aware parallelism: folders are created before volumes placed in them,
+volumes are created before they are mapped and all changes of single volume are performed one after another.
+Plans can be inspected (DSM calls and estimated duration) before execution and rolled back by compensating actions
+when some step fails.
+
+Desired state is a dictionary (usually loaded from JSON file) with following structure:
+    {
+        "storage_center": "sc1",
+        "folders": ["/prod/", "/prod/db/"],
+        "volumes": [
+            {"name": "db01", "folder": "/prod/db/", "size": "500GB", "servers": ["cluster-a"]}
+        ]
+    }
+Ancestors of every folder are created automatically. Volume key 'folder' defaults to root folder ('/'). If volume key
+'servers' is missing, mapping of this volume is not managed. Volumes are identified by name, so names of managed
+volumes have to be unique within Storage Center.
+"""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from dell_storage_api import result as api_result
+from dell_storage_api.capacity import parse_size
+from dell_storage_api.result import ApiResult
+from dell_storage_api.storage_center import StorageCenter
+from dell_storage_api.storage_object import StorageObjectFolderTree
+from dell_storage_api.throttle import EndpointLatencies
+from dell_storage_api.volume import Volume, VolumeFolder
+
+ROOT_PATH = StorageObjectFolderTree.PATH_SEPARATOR
+
+
+class ReconcileError(Exception):
+    """ Exception raised when desired state is invalid or can not be reconciled with current state """
+
+
+def normalize_path(path: str) -> str:
+    """
+    Normalize folder path to form with leading and trailing separator (e.g.: 'prod/db' -> '/prod/db/')
+    :param path: Folder path
+    :return: Normalized folder path
+    """
+    parts = [part for part in (path or '').split(ROOT_PATH) if part]
+    return ROOT_PATH + ''.join(part + ROOT_PATH for part in parts)
+
+
+def parent_path(path: str) -> str:
+    """
+    Return path of parent folder (e.g.: '/prod/db/' -> '/prod/'). Parent of root folder is root folder.
+    :param path: Normalized folder path
+    :return: Normalized path of parent folder
+    """
+    parts = [part for part in path.split(ROOT_PATH) if part]
+    return normalize_path(ROOT_PATH.join(parts[:-1]))
+
+
+def load_desired_state(path: str) -> List[Dict[str, Any]]:
+    """
+    Load desired state from JSON file. File can contain single desired state or list of desired states (one per
+    Storage Center).
+    :param path: Path to JSON file
+    :return: List of desired states
+    """
+    with open(path, 'r', encoding='utf-8') as state_file:
+        content = json.load(state_file)
+    return content if isinstance(content, list) else [content]
+
+
+class PlanStep:
+    """
+    Class representing single change in reconciliation plan. Folders and servers are referenced in arguments either by
+    folder path ('folder', 'parent') or server name ('server') known to the plan, or directly by instance ID
+    ('folder_id', 'server_id'). Empty 'folder_id' means root folder.
+    """
+    CREATE_FOLDER = 'create_folder'
+    CREATE_VOLUME = 'create_volume'
+    EXPAND = 'expand'
+    MOVE = 'move'
+    UNMAP = 'unmap'
+    MAP = 'map'
+
+    # DSM calls performed by every action, as (HTTP method, endpoint)
+    CALLS = {
+        CREATE_FOLDER: [('POST', VolumeFolder.ENDPOINT)],
+        CREATE_VOLUME: [('POST', Volume.ENDPOINT)],
+        EXPAND: [('POST', Volume.EXPAND_TO_SIZE_ENDPOINT)],
+        MOVE: [('PUT', Volume.VOLUME_ENDPOINT)],
+        UNMAP: [('POST', Volume.UNMAPPING_ENDPOINT)],
+        MAP: [('POST', Volume.MAPPING_ENDPOINT)],
+    }
+    # Additional call performed when volume is created in root folder referenced by empty 'folder_id'
+    ROOT_FOLDER_LOOKUP = ('GET', StorageCenter.VOLUME_FOLDER_LIST_ENDPOINT)
+
+    STATE_PENDING = 'pending'
+    STATE_DONE = 'done'
+    STATE_FAILED = 'failed'
+    STATE_SKIPPED = 'skipped'
+    STATE_ROLLED_BACK = 'rolled_back'
+
+    def __init__(self, step_id: int, action: str, target: str, arguments: Dict[str, str],
+                 depends_on: Optional[List[int]] = None) -> None:
+        self.step_id = step_id
+        self.action = action
+        self.target = target
+        self.arguments = arguments
+        self.depends_on = depends_on or []
+        self.state = self.STATE_PENDING
+        self.undo: Optional[Callable[[], Any]] = None
+        # Result of DSM call performed by this step (status, latency and error of failed call)
+        self.result: Optional[ApiResult] = None
+
+    def __str__(self) -> str:
+        arguments = ', '.join('%s=%s' % item for item in sorted(self.arguments.items()))
+        return "#%d %s %s%s" % (self.step_id, self.action, self.target, ' (%s)' % arguments if arguments else '')
+
+
+class Plan:
+    """
+    Reconciliation plan for single Storage Center. Steps are executed in dependency levels, all steps in single level
+    are independent of each other and run concurrently. Steps that depend on failed (or skipped) step are skipped.
+    Every successful step records its compensating action (e.g.: created volume is moved to recycle bin, mapped
+    volume is unmapped), so that partially executed plan can be rolled back. Expansion of a volume can not be undone.
+    """
+    DEFAULT_LATENCY = 0.5
+
+    def __init__(self, storage_center: StorageCenter) -> None:
+        self.storage_center = storage_center
+        self.steps: List[PlanStep] = []
+        self.folder_ids: Dict[str, str] = {}
+        self.volumes: Dict[str, Volume] = {}
+        self.server_ids: Dict[str, str] = {}
+        # Names of servers to which volumes were mapped before execution, indexed by volume instance ID
+        self.mapping: Dict[str, List[str]] = {}
+        self._unmapped: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def add(self, action: str, target: str, arguments: Dict[str, str],
+            depends_on: Optional[List[Optional[int]]] = None) -> int:
+        """
+        Add new step to the plan
+        :param action: Action of the step (e.g.: PlanStep.CREATE_VOLUME)
+        :param target: Path of a folder or name of a volume affected by the step
+        :param arguments: Arguments of the action
+        :param depends_on: IDs of steps that have to finish before this step (None values are ignored)
+        :return: ID of the new step
+        """
+        step = PlanStep(len(self.steps), action, target, arguments,
+                        [step_id for step_id in depends_on or [] if step_id is not None])
+        self.steps.append(step)
+        return step.step_id
+
+    def levels(self) -> List[List[PlanStep]]:
+        """
+        Split steps into dependency levels. Steps in the same level do not depend on each other. Steps are always added
+        after their dependencies, so single pass is sufficient.
+        :return: List of levels, each containing list of steps
+        """
+        depth: Dict[int, int] = {}
+        levels: List[List[PlanStep]] = []
+        for step in self.steps:
+            depth[step.step_id] = 1 + max([depth[step_id] for step_id in step.depends_on], default=-1)
+            if depth[step.step_id] == len(levels):
+                levels.append([])
+            levels[depth[step.step_id]].append(step)
+        return levels
+
+    @staticmethod
+    def _call_templates(step: PlanStep) -> List[Tuple[str, str]]:
+        """
+        Internal method that returns DSM calls performed by the step, with endpoint templates
+        :param step: Step of this plan
+        :return: List of tuples (HTTP method, endpoint template)
+        """
+        if step.action == PlanStep.CREATE_VOLUME and step.arguments.get('folder_id', None) == '':
+            return [PlanStep.ROOT_FOLDER_LOOKUP] + PlanStep.CALLS[step.action]
+        return PlanStep.CALLS[step.action]
+
+    def calls(self, step: PlanStep) -> List[Tuple[str, str]]:
+        """
+        Return DSM calls that will be performed by the step. Instance IDs of objects that do not exist yet are
+        replaced by their names in angle brackets.
+        :param step: Step of this plan
+        :return: List of tuples (HTTP method, endpoint)
+        """
+        volume = self.volumes.get(step.target, None)
+        instance_id = volume.instance_id if volume is not None else '<%s>' % step.target
+        return [(method, endpoint % (self.storage_center.instance_id if endpoint == PlanStep.ROOT_FOLDER_LOOKUP[1]
+                                     else instance_id) if '%s' in endpoint else endpoint)
+                for method, endpoint in self._call_templates(step)]
+
+    def estimate(self, latencies: Optional[EndpointLatencies] = None,
+                 max_workers: int = 4) -> Tuple[int, float]:
+        """
+        Estimate number of DSM requests and duration of the plan. Duration of every step is estimated from recorded
+        latencies of its endpoints (DEFAULT_LATENCY is used for endpoints without recorded latency). Steps in single
+        level are expected to run concurrently on 'max_workers' workers.
+        :param latencies: Recorded latencies of DSM endpoints
+        :param max_workers: Maximum number of concurrently executed steps
+        :return: Tuple (number of requests, estimated duration in seconds)
+        """
+        requests_count = 0
+        duration = 0.0
+        for level in self.levels():
+            step_durations = []
+            for step in level:
+                step_duration = 0.0
+                for method, endpoint in self._call_templates(step):
+                    latency = latencies.latency(method, endpoint) if latencies is not None else None
+                    step_duration += latency if latency is not None else self.DEFAULT_LATENCY
+                    requests_count += 1
+                step_durations.append(step_duration)
+            duration += max(max(step_durations), sum(step_durations) / max(1, max_workers))
+        return requests_count, duration
+
+    def _execute_step(self, step: PlanStep) -> ApiResult:
+        """
+        Internal method that performs API calls of single step and records its compensating action. Instance IDs of
+        folders and volumes created by previous steps are looked up at execution time.
+        :param step: Step to execute
+        :return: Result of the DSM call performed by the step
+        """
+        arguments = step.arguments
+        if step.action == PlanStep.CREATE_FOLDER:
+            result = self.storage_center.new_volume_folder(arguments['name'], self.folder_ids[arguments['parent']])
+            if result:
+                folder = result.value
+                with self._lock:
+                    self.folder_ids[step.target] = folder.instance_id
+                step.undo = folder.delete
+            return result
+        if step.action == PlanStep.CREATE_VOLUME:
+            result = self.storage_center.new_volume(step.target, arguments['size'], self._folder_id(arguments))
+            if result:
+                volume = result.value
+                with self._lock:
+                    self.volumes[step.target] = volume
+                step.undo = volume.recycle
+            return result
+        volume = self.volumes[step.target]
+        if step.action == PlanStep.EXPAND:
+            return volume.expand_to_size(arguments['size'])
+        if step.action == PlanStep.MOVE:
+            previous_folder_id = volume.parent_folder_id
+            result = volume.move_to_folder(self._folder_id(arguments))
+            if result:
+                step.undo = lambda: volume.move_to_folder(previous_folder_id)
+            return result
+        if step.action == PlanStep.UNMAP:
+            result = volume.unmap()
+            if result:
+                with self._lock:
+                    self._unmapped.add(step.target)
+                step.undo = lambda: self._map_all(volume, self.mapping.get(volume.instance_id, []))
+            return result
+        if step.action == PlanStep.MAP:
+            result = volume.map_to_server(self._server_id(arguments))
+            if result:
+                # Volume can only be unmapped from all servers at once, servers that were mapped before are mapped again
+                kept = [] if step.target in self._unmapped else self.mapping.get(volume.instance_id, [])
+                step.undo = lambda: volume.unmap() and self._map_all(volume, kept)
+            return result
+        raise ReconcileError("Unknown plan action '%s'" % step.action)
+
+    def _folder_id(self, arguments: Dict[str, str]) -> str:
+        """
+        Internal method that returns instance ID of a folder referenced by step arguments
+        :param arguments: Arguments of a step with key 'folder_id' or 'folder'
+        :return: Instance ID of a folder
+        """
+        if 'folder_id' in arguments:
+            return arguments['folder_id']
+        return self.folder_ids[arguments['folder']]
+
+    def _server_id(self, arguments: Dict[str, str]) -> str:
+        """
+        Internal method that returns instance ID of a server referenced by step arguments
+        :param arguments: Arguments of a step with key 'server_id' or 'server'
+        :return: Instance ID of a server
+        """
+        if 'server_id' in arguments:
+            return arguments['server_id']
+        return self.server_ids[arguments['server']]
+
+    def _map_all(self, volume: Volume, servers: List[str]) -> bool:
+        """
+        Internal method that maps volume to every server in the list. Servers unknown to this plan are not mapped
+        and make the result False.
+        :param volume: Mapped volume
+        :param servers: Names of servers
+        :return: True if all mappings are successful, otherwise False
+        """
+        success = True
+        for server in servers:
+            server_id = self.server_ids.get(server, None)
+            if server_id is None:
+                api_result.report("Error: Volume '%s' can not be mapped to unknown server '%s'" % (volume.name, server))
+                success = False
+            elif not volume.map_to_server(server_id):
+                success = False
+        return success
+
+    def _run_step(self, step: PlanStep, states: Dict[int, str]) -> None:
+        """
+        Internal method that executes single step unless some of its dependencies did not finish successfully
+        :param step: Step to execute
+        :param states: States of already finished steps
+        :return: None
+        """
+        if any(states[step_id] != PlanStep.STATE_DONE for step_id in step.depends_on):
+            step.state = PlanStep.STATE_SKIPPED
+            return
+        try:
+            step.result = self._execute_step(step)
+        except Exception as exc:  # pylint: disable=W0703
+            # Any error fails only this step, so that execution continues and finished steps can be rolled back
+            api_result.report("Error: Step %s failed - %s" % (step, exc))
+            step.result = ApiResult.failure(step.action, exc)
+        step.state = PlanStep.STATE_DONE if step.result else PlanStep.STATE_FAILED
+
+    def execute(self, max_workers: int = 4, rollback: bool = False, quiet: bool = False) -> bool:
+        """
+        Execute all steps of the plan level by level. If rollback is requested, execution stops after the first level
+        with failed step and all successful steps are rolled back, otherwise only steps that depend on failed steps are
+        skipped. Result of every executed step is recorded in its 'result' attribute.
+        :param max_workers: Maximum number of concurrently executed steps
+        :param rollback: Roll back the plan if any step fails
+        :param quiet: Do not print status messages of API calls (failures are available in results of steps)
+        :return: True if all steps finished successfully, otherwise False
+        """
+        states: Dict[int, str] = {}
+        with ExitStack() as stack, ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            if quiet:
+                stack.enter_context(api_result.quiet())
+            for level in self.levels():
+                if rollback and any(state == PlanStep.STATE_FAILED for state in states.values()):
+                    for step in level:
+                        step.state = states[step.step_id] = PlanStep.STATE_SKIPPED
+                    continue
+                list(executor.map(lambda step: self._run_step(step, states), level))
+                for step in level:
+                    states[step.step_id] = step.state
+        success = all(step.state == PlanStep.STATE_DONE for step in self.steps)
+        if rollback and not success:
+            self.rollback()
+        return success
+
+    def rollback(self) -> bool:
+        """
+        Run compensating actions of all successful steps in reverse order
+        :return: True if all successful steps were rolled back, otherwise False
+        """
+        success = True
+        for step in reversed(self.steps):
+            if step.state != PlanStep.STATE_DONE:
+                continue
+            if step.undo is None:
+                print("WARNING: Step %s can not be rolled back" % step)
+                success = False
+                continue
+            try:
+                undone = bool(step.undo())
+            except Exception as exc:  # pylint: disable=W0703
+                print("Error: Rollback of step %s failed - %s" % (step, exc))
+                undone = False
+            if undone:
+                step.state = PlanStep.STATE_ROLLED_BACK
+            else:
+                print("Error: Failed to roll back step %s" % step)
+                success = False
+        return success
+
+
+class Reconciler:
+    """
+    Class that computes reconciliation plan from desired state and current inventory of Storage Center. Current
+    inventory (volume folders, volumes, servers and volume mapping) is fetched once, concurrently and always directly
+    from DSM, and indexed by folder path, volume name and server name, so the plan is computed in linear time.
+    """
+
+    def __init__(self, storage_center: StorageCenter) -> None:
+        self.storage_center = storage_center
+
+    def plan(self, desired: Dict[str, Any]) -> Plan:  # pylint: disable=R0914
+        """
+        Compute minimal plan of changes that brings Storage Center to desired state
+        :param desired: Desired state (see module documentation)
+        :return: Reconciliation plan
+        """
+        storage = self.storage_center
+        # Planning from partial inventory would create duplicates of existing volumes, so any failed fetch is fatal
+        inventory = storage.fetch_inventory()
+        if inventory is None or inventory.mapping is None:
+            raise ReconcileError("Failed to fetch current inventory of storage center '%s'" % storage.name)
+        folder_tree = inventory.volume_folders.tree()
+        mapping = inventory.mapping
+
+        plan = Plan(storage)
+        for folder in folder_tree.walk():
+            plan.folder_ids.setdefault(folder_tree.path(folder.instance_id) or '', folder.instance_id)
+        if ROOT_PATH not in plan.folder_ids:
+            raise ReconcileError("Failed to find root volume folder")
+        plan.server_ids = {server.name: server.instance_id for server in inventory.servers}
+        existing: Dict[str, List[Volume]] = {}
+        for volume in inventory.volumes:
+            existing.setdefault(volume.name, []).append(volume)
+        folder_paths = {folder_id: path for path, folder_id in plan.folder_ids.items()}
+        plan.mapping = mapping
+
+        # Folders (including ancestors of all folders and volume folders)
+        wanted_paths = {normalize_path(path) for path in desired.get('folders', [])}
+        wanted_paths.update(normalize_path(volume.get('folder', ROOT_PATH)) for volume in desired.get('volumes', []))
+        for path in list(wanted_paths):
+            while path != ROOT_PATH:
+                path = parent_path(path)
+                wanted_paths.add(path)
+        folder_steps: Dict[str, Optional[int]] = {}
+        for path in sorted(wanted_paths, key=lambda path: (path.count(ROOT_PATH), path)):
+            if path in plan.folder_ids:
+                folder_steps[path] = None
+                continue
+            parent = parent_path(path)
+            folder_steps[path] = plan.add(PlanStep.CREATE_FOLDER, path,
+                                          {'name': path.rstrip(ROOT_PATH).rsplit(ROOT_PATH, 1)[-1], 'parent': parent},
+                                          [folder_steps[parent]])
+
+        # Volumes and their mapping
+        for volume_spec in desired.get('volumes', []):
+            self._plan_volume(plan, volume_spec, existing, folder_steps, folder_paths, mapping)
+        return plan
+
+    @staticmethod
+    def _plan_volume(plan: Plan, volume_spec: Dict[str, Any], existing: Dict[str, List[Volume]],
+                     folder_steps: Dict[str, Optional[int]], folder_paths: Dict[str, str],
+                     mapping: Dict[str, List[str]]) -> None:
+        """
+        Internal method that adds steps needed to reconcile single volume to the plan. Steps changing the same volume
+        are chained, every step depends on the previous step of the volume.
+        :param plan: Reconciliation plan
+        :param volume_spec: Desired state of the volume
+        :param existing: Existing volumes indexed by name
+        :param folder_steps: IDs of steps that create folders, indexed by folder path (None for existing folders)
+        :param folder_paths: Paths of existing folders indexed by instance ID
+        :param mapping: Names of servers to which existing volumes are mapped, indexed by volume instance ID
+        :return: None
+        """
+        if 'name' not in volume_spec:
+            raise ReconcileError("Desired volume %s has no 'name'" % json.dumps(volume_spec, sort_keys=True))
+        name = volume_spec['name']
+        folder = normalize_path(volume_spec.get('folder', ROOT_PATH))
+        servers = volume_spec.get('servers', None)
+        for server in servers or []:
+            if server not in plan.server_ids:
+                raise ReconcileError("Volume '%s' should be mapped to unknown server '%s'" % (name, server))
+        matches = existing.get(name, [])
+        if len(matches) > 1:
+            raise ReconcileError("Volume name '%s' is not unique in storage center" % name)
+
+        if not matches:
+            if 'size' not in volume_spec:
+                raise ReconcileError("Volume '%s' does not exist and can not be created without 'size'" % name)
+            volume_step: Optional[int] = plan.add(PlanStep.CREATE_VOLUME, name,
+                                                  {'size': volume_spec['size'], 'folder': folder},
+                                                  [folder_steps[folder]])
+            Reconciler._plan_mapping(plan, name, sorted(set(servers or [])), volume_step)
+            return
+
+        volume = matches[0]
+        plan.volumes[name] = volume
+        volume_step = None
+        if 'size' in volume_spec and parse_size(volume_spec['size']) > parse_size(volume.configured_size):
+            volume_step = plan.add(PlanStep.EXPAND, name, {'size': volume_spec['size']})
+        elif 'size' in volume_spec and parse_size(volume_spec['size']) < parse_size(volume.configured_size):
+            print("WARNING: Volume '%s' is larger than desired size %s, volumes can not be shrunk"
+                  % (name, volume_spec['size']))
+        if folder_paths.get(volume.parent_folder_id, None) != folder:
+            volume_step = plan.add(PlanStep.MOVE, name, {'folder': folder}, [folder_steps[folder], volume_step])
+        if servers is None:
+            return
+        current = set(mapping.get(volume.instance_id, []))
+        wanted = set(servers)
+        if current - wanted:
+            # DSM can only unmap volume from all servers at once
+            volume_step = plan.add(PlanStep.UNMAP, name, {}, [volume_step])
+            current = set()
+        Reconciler._plan_mapping(plan, name, sorted(wanted - current), volume_step)
+
+    @staticmethod
+    def _plan_mapping(plan: Plan, name: str, servers: List[str], depends_on: Optional[int]) -> None:
+        """
+        Internal method that adds steps mapping volume to servers. Mapping calls of single volume are not safe to run
+        concurrently, so every MAP step depends on the previous one.
+        :param plan: Reconciliation plan
+        :param name: Name of the mapped volume
+        :param servers: Names of servers to map the volume to
+        :param depends_on: ID of a step that has to finish before the first mapping (e.g.: creation of the volume)
+        :return: None
+        """
+        for server in servers:
+            depends_on = plan.add(PlanStep.MAP, name, {'server': server}, [depends_on])
@@ -0,0 +1,287 @@
+"""
+This module contains resolver that translates human readable references (names, serial numbers, folder paths) of
+objects in Dell Storage Manager (DSM) to their instance IDs. Resolved mappings are kept in persistent local cache, so
+that repeated lookups do not require download of complete object lists from DSM.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from dell_storage_api.session import DsmSession
+from dell_storage_api.storage_center import StorageCenter
+
+
+class NameResolver:
+    """
+    Resolver that maps Storage Center names and serial numbers, server names, volume names and volume folder paths to
+    instance IDs. Every kind of object is cached separately for each Storage Center together with the time of its
+    last refresh. Cached mappings older than 'ttl' seconds are refreshed from DSM before use and so is every
+    mapping, in which the reference can not be found (cache miss).
+    Instance IDs are always accepted as references and resolve to themselves if they are known.
+    References used by mutating operations (map, unmap, jobs) should be resolved with 'verify', which checks instance
+    IDs found in cache against DSM, so that object deleted and recreated under the same name is not resolved to stale
+    instance ID.
+    If 'cache_path' is empty, mappings are cached only in memory for the lifetime of the resolver.
+    Resolver can be used from multiple threads. Mappings are refreshed by one thread at a time, threads that miss the
+    same mapping meanwhile use the refreshed one instead of fetching it again.
+    """
+    DEFAULT_TTL = 3600
+    DEFAULT_CACHE_DIR = os.path.join('~', '.cache', 'dell-storage-client')
+
+    SCOPE_DSM = 'dsm'
+    KIND_STORAGE_CENTER = 'storage_centers'
+    KIND_SERVER = 'servers'
+    KIND_VOLUME = 'volumes'
+    KIND_VOLUME_FOLDER = 'volume_folders'
+
+    def __init__(self, session: DsmSession, cache_path: Optional[str] = None, ttl: int = DEFAULT_TTL) -> None:
+        self.session = session
+        self.ttl = ttl
+        if cache_path is None:
+            cache_path = self.default_cache_path(session)
+        self.cache_path = cache_path
+        self._cache: Dict[str, Dict[str, Dict[str, Any]]] = self._load()
+        self._lock = threading.RLock()
+
+    @classmethod
+    def default_cache_path(cls, session: DsmSession) -> str:
+        """
+        Return default location of cache file for given DSM session. Each DSM host and user has separate cache file.
+        :param session: Session with DSM
+        :return: Path to cache file
+        """
+        file_name = '%s_%s_%s.json' % (session.host, session.port, session.username)
+        return os.path.join(os.path.expanduser(cls.DEFAULT_CACHE_DIR), file_name)
+
+    def _load(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Internal method that loads cache content from cache file. Missing or corrupted cache file results in empty
+        cache.
+        :return: Cache content
+        """
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as cache_file:
+                content = json.load(cache_file)
+        except (OSError, ValueError):
+            print("WARNING: Failed to load name cache from '%s'" % self.cache_path)
+            return {}
+        return content if isinstance(content, dict) else {}
+
+    def _save(self) -> None:
+        """
+        Internal method that atomically replaces cache file with current cache content
+        :return: None
+        """
+        if not self.cache_path:
+            return
+        tmp_path = '%s.%d.tmp' % (self.cache_path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+                json.dump(self._cache, cache_file)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as exc:
+            print("WARNING: Failed to save name cache to '%s' - %s" % (self.cache_path, exc))
+
+    def invalidate(self, scope: str = '') -> None:
+        """
+        Drop cached mappings. If scope (instance ID of a Storage Center) is specified, only mappings for this Storage
+        Center are dropped, otherwise whole cache is cleared.
+        :param scope: Instance ID of a Storage Center
+        :return: None
+        """
+        if scope:
+            self._cache.pop(scope, None)
+        else:
+            self._cache = {}
+        self._save()
+
+    def _lookup(self, scope: str, kind: str, reference: str,
+                fetch: Callable[[], Dict[str, Any]], match: Callable[[Dict[str, Any], str], List[str]],
+                verify: Optional[Callable[[str, Any], bool]] = None) -> List[str]:
+        """
+        Internal generic method that looks up reference in cached mapping and refreshes this mapping if it's stale,
+        if the reference can not be found in it or if any matching instance ID fails verification.
+        :param scope: Cache scope (instance ID of a Storage Center or SCOPE_DSM)
+        :param kind: Kind of cached objects (e.g.: KIND_VOLUME)
+        :param reference: Reference to resolve
+        :param fetch: Callable that returns fresh mapping of instance IDs to cached values
+        :param match: Callable that returns instance IDs from mapping that match the reference
+        :param verify: Callable that checks whether cached instance ID and value still match the object in DSM
+        :return: List of matching instance IDs
+        """
+        entry = self._cache.get(scope, {}).get(kind, None)
+        objects = self._fresh_objects(entry)
+        if objects is not None:
+            result = match(objects, reference)
+            if result and (verify is None or all(verify(instance_id, objects[instance_id]) for instance_id in result)):
+                return result
+        with self._lock:
+            current = self._cache.get(scope, {}).get(kind, None)
+            objects = self._fresh_objects(current) if current is not entry else None
+            if objects is not None:
+                # Mapping was refreshed from DSM by another thread meanwhile, so it does not need verification
+                result = match(objects, reference)
+                if result:
+                    return result
+            objects = fetch()
+            if objects:
+                self._cache.setdefault(scope, {})[kind] = {'timestamp': time.time(), 'objects': objects}
+                self._save()
+        return match(objects, reference)
+
+    def _fresh_objects(self, entry: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Internal method that returns objects of cached mapping, unless the mapping is missing or older than TTL
+        :param entry: Cached mapping (with 'timestamp' of its last refresh)
+        :return: Mapping of instance IDs to cached values or None if the mapping has to be refreshed
+        """
+        if entry is None or time.time() - entry.get('timestamp', 0) >= self.ttl:
+            return None
+        objects: Dict[str, Any] = entry.get('objects', {})
+        return objects
+
+    @staticmethod
+    def _match_name(objects: Dict[str, Any], reference: str) -> List[str]:
+        """
+        Internal method that matches reference against instance IDs or names in mapping of instance IDs to names
+        :param objects: Mapping of instance IDs to names
+        :param reference: Instance ID or name
+        :return: List of matching instance IDs
+        """
+        if reference in objects:
+            return [reference]
+        return [instance_id for instance_id, name in objects.items() if name == reference]
+
+    @staticmethod
+    def _match_path(objects: Dict[str, Any], reference: str) -> List[str]:
+        """
+        Internal method that matches reference against instance IDs or paths in mapping of instance IDs to folder
+        paths. Leading and trailing separators of the path are optional.
+        :param objects: Mapping of instance IDs to folder paths
+        :param reference: Instance ID or folder path
+        :return: List of matching instance IDs
+        """
+        if reference in objects:
+            return [reference]
+        path = '/' + ''.join(part + '/' for part in reference.split('/') if part)
+        return [instance_id for instance_id, folder_path in objects.items() if folder_path == path]
+
+    @staticmethod
+    def _match_storage_center(objects: Dict[str, Any], reference: str) -> List[str]:
+        """
+        Internal method that matches reference against instance IDs, names or serial numbers of Storage Centers
+        :param objects: Mapping of instance IDs to Storage Center records
+        :param reference: Instance ID, name or serial number of a Storage Center
+        :return: List of matching instance IDs
+        """
+        if reference in objects:
+            return [reference]
+        return [instance_id for instance_id, record in objects.items()
+                if reference in (record['name'], str(record['serial_num']))]
+
+    @staticmethod
+    def _single(result: List[str], description: str, reference: str) -> Optional[str]:
+        """
+        Internal method that reduces list of matching instance IDs to single instance ID. Missing or ambiguous
+        references result in None.
+        :param result: Matching instance IDs
+        :param description: Description of the object kind used in error messages
+        :param reference: Resolved reference
+        :return: Instance ID or None
+        """
+        if not result:
+            print("Error: No %s matches '%s'" % (description, reference))
+            return None
+        if len(result) > 1:
+            print("Error: Reference '%s' is ambiguous, it matches %d %ss (%s). Use instance ID instead"
+                  % (reference, len(result), description, ', '.join(sorted(result))))
+            return None
+        return result[0]
+
+    def storage_center(self, reference: str) -> Optional[StorageCenter]:
+        """
+        Resolve Storage Center by its instance ID, name or serial number. Storage Center object is built from cached
+        data, without contacting DSM, if the reference is found in fresh cache.
+        :param reference: Instance ID, name or serial number of a Storage Center
+        :return: StorageCenter object or None if the reference can not be resolved
+        """
+        def fetch() -> Dict[str, Any]:
+            return {storage_center.instance_id: {'name': storage_center.name,
+                                                 'serial_num': storage_center.serial_num,
+                                                 'ip_addr': storage_center.ip_addr}
+                    for storage_center in self.session.storage_centers()}
+
+        result = self._lookup(self.SCOPE_DSM, self.KIND_STORAGE_CENTER, reference, fetch, self._match_storage_center)
+        instance_id = self._single(result, 'storage center', reference)
+        if instance_id is None:
+            return None
+        # Storage Centers discovered by warm up carry prefetched metadata
+        warm_storage_center = self.session.storage_center(instance_id)
+        if warm_storage_center is not None:
+            return warm_storage_center
+        record = self._cache[self.SCOPE_DSM][self.KIND_STORAGE_CENTER]['objects'][instance_id]
+        return StorageCenter(req_session=self.session.session,
+                             base_url=self.session.base_url,
+                             name=record['name'],
+                             instance_id=instance_id,
+                             serial_num=record['serial_num'],
+                             ip_addr=record['ip_addr'],
+                             snapshot_store=self.session.snapshot_store)
+
+    def server_id(self, storage: StorageCenter, reference: str, verify: bool = False) -> Optional[str]:
+        """
+        Resolve instance ID of a server (or a cluster) by its instance ID or name
+        :param storage: Storage Center where the server is defined
+        :param reference: Instance ID or name of a server
+        :param verify: Check instance ID found in cache against DSM (Use for mutating operations)
+        :return: Instance ID of a server or None if the reference can not be resolved
+        """
+        def fetch() -> Dict[str, Any]:
+            return {server.instance_id: server.name for server in storage.server_list()}
+
+        def exists(instance_id: str, name: str) -> bool:
+            server = storage.server(instance_id)
+            return server is not None and server.name == name
+
+        result = self._lookup(storage.instance_id, self.KIND_SERVER, reference, fetch, self._match_name,
+                              exists if verify else None)
+        return self._single(result, 'server', reference)
+
+    def volume_id(self, storage: StorageCenter, reference: str, verify: bool = False) -> Optional[str]:
+        """
+        Resolve instance ID of a volume by its instance ID or name. Volume names do not have to be unique, ambiguous
+        names can not be resolved.
+        :param storage: Storage Center where the volume is located
+        :param reference: Instance ID or name of a volume
+        :param verify: Check instance ID found in cache against DSM (Use for mutating operations)
+        :return: Instance ID of a volume or None if the reference can not be resolved
+        """
+        def fetch() -> Dict[str, Any]:
+            return {volume.instance_id: volume.name for volume in storage.volume_list()}
+
+        def exists(instance_id: str, name: str) -> bool:
+            volume = storage.volume(instance_id)
+            return volume is not None and volume.name == name
+
+        result = self._lookup(storage.instance_id, self.KIND_VOLUME, reference, fetch, self._match_name,
+                              exists if verify else None)
+        return self._single(result, 'volume', reference)
+
+    def volume_folder_id(self, storage: StorageCenter, reference: str) -> Optional[str]:
+        """
+        Resolve instance ID of a volume folder by its instance ID or full path (e.g.: '/prod/db/')
+        :param storage: Storage Center where the volume folder is located
+        :param reference: Instance ID or path of a volume folder
+        :return: Instance ID of a volume folder or None if the reference can not be resolved
+        """
+        def fetch() -> Dict[str, Any]:
+            folder_tree = storage.volume_folder_list().tree()
+            return {folder.instance_id: folder_tree.path(folder.instance_id) for folder in folder_tree.walk()}
+
+        result = self._lookup(storage.instance_id, self.KIND_VOLUME_FOLDER, reference, fetch, self._match_path)
+        return self._single(result, 'volume folder', reference)
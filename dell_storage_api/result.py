@@ -0,0 +1,169 @@
+"""
+This module contains structured results of API calls to Dell Storage Manager (DSM). Every result carries HTTP status
+of the call, its latency, DSM error payload in case of failure and classification of the failure as retryable or not.
+Calls that do not get any response (see dell_storage_api.transport.TransportError) produce failed results as well, so
+callers do not have to handle network errors separately. Results evaluate to True only if the call was successful, so
+they can be used in place of boolean return values.
+Status messages of API calls are printed through 'report', which can be silenced by 'quiet' (e.g.: in parallel runs,
+where printed messages would interleave and callers aggregate failures from returned results instead).
+"""
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Union
+
+from dell_storage_api.codec import decode_response
+from dell_storage_api.transport import Transport, TransportError
+
+# Status codes of failures that are expected to be transient (timeouts, throttling, overloaded or restarting DSM)
+RETRYABLE_STATUS_CODES = frozenset([408, 429, 500, 502, 503, 504])
+# Status code of calls that did not receive any response (e.g.: connection error or timeout)
+STATUS_NO_RESPONSE = 0
+# Status code of calls that were not performed at all (e.g.: missing prerequisite or error in the caller)
+STATUS_NOT_SENT = -1
+
+_quiet_depth = 0
+_quiet_lock = threading.Lock()
+
+
+class ApiResult:
+    """
+    Result of single API call. 'value' holds object produced by successful call (e.g.: newly created Volume), 'error'
+    holds DSM error payload (decoded json body or plain text) of failed call.
+    """
+
+    def __init__(self, operation: str, ok: bool, status_code: int = STATUS_NO_RESPONSE, latency: float = 0.0,
+                 value: Any = None, error: Any = None) -> None:
+        self.operation = operation
+        self.ok = ok
+        self.status_code = status_code
+        self.latency = latency
+        self.value = value
+        self.error = error
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+    def __repr__(self) -> str:
+        if self.ok:
+            return '<ApiResult %s OK (%d) %.3fs>' % (self.operation, self.status_code, self.latency)
+        return '<ApiResult %s FAILED (%d) %.3fs - %s>' % (self.operation, self.status_code, self.latency,
+                                                          self.error_message)
+
+    @property
+    def retryable(self) -> bool:
+        """
+        Is the failure of this call transient, so that the call can be retried?
+        :return: True if the call failed and can be retried, otherwise False
+        """
+        return not self.ok and (self.status_code == STATUS_NO_RESPONSE or self.status_code in RETRYABLE_STATUS_CODES)
+
+    @property
+    def error_message(self) -> str:
+        """
+        Return human readable error message extracted from DSM error payload
+        :return: Error message (empty if the call was successful)
+        """
+        if self.ok or self.error is None:
+            return ''
+        if isinstance(self.error, dict):
+            return str(self.error.get('result') or self.error)
+        return str(self.error)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return representation of this result that can be serialized to json (value is omitted)
+        :return: Dictionary describing this result
+        """
+        return {'operation': self.operation,
+                'ok': self.ok,
+                'status_code': self.status_code,
+                'latency': self.latency,
+                'retryable': self.retryable,
+                'error': self.error}
+
+    @classmethod
+    def from_response(cls, operation: str, resp: Any, expected_status: Union[int, Iterable[int]] = 200,
+                      value: Any = None, decode: bool = False) -> 'ApiResult':
+        """
+        Create result from HTTP response. Latency recorded by transport is taken from the response.
+        :param operation: Name of the operation (e.g.: 'map_to_server')
+        :param resp: Response object returned by transport
+        :param expected_status: Status code (or codes) of successful call
+        :param value: Value of successful result
+        :param decode: Use decoded json body of successful response as value
+        :return: Result of the call (failed, if body of successful response can not be decoded)
+        """
+        expected = {expected_status} if isinstance(expected_status, int) else set(expected_status)
+        ok = resp.status_code in expected
+        error = None
+        if ok and decode:
+            try:
+                value = decode_response(resp)
+            except ValueError as exc:
+                ok = False
+                error = "Failed to decode response (%s) - %s" % (exc, resp.text)
+        elif not ok:
+            try:
+                error = decode_response(resp)
+            except ValueError:
+                error = resp.text
+        return ApiResult(operation, ok, resp.status_code, getattr(resp, 'latency', 0.0), value if ok else None, error)
+
+    @classmethod
+    def call(cls, operation: str, transport: Transport, method: str, url: str,
+             expected_status: Union[int, Iterable[int]] = 200, decode: bool = False, **kwargs: Any) -> 'ApiResult':
+        """
+        Perform HTTP request and create result from its response. Request that does not get any response (see
+        TransportError) produces failed result with status STATUS_NO_RESPONSE, which is retryable.
+        :param operation: Name of the operation (e.g.: 'map_to_server')
+        :param transport: Transport used to perform the request
+        :param method: HTTP method
+        :param url: Complete URL of the request
+        :param expected_status: Status code (or codes) of successful call
+        :param decode: Use decoded json body of successful response as value
+        :param kwargs: requests-compatible keyword arguments of the request (e.g.: 'json')
+        :return: Result of the call
+        """
+        try:
+            resp = transport.request(method, url, **kwargs)
+        except TransportError as exc:
+            return ApiResult(operation, False, STATUS_NO_RESPONSE, error=str(exc))
+        return cls.from_response(operation, resp, expected_status, decode=decode)
+
+    @classmethod
+    def failure(cls, operation: str, error: Any, status_code: int = STATUS_NOT_SENT) -> 'ApiResult':
+        """
+        Create failed result of a call that could not be performed at all. Such failures are not retryable, unless
+        status_code says otherwise.
+        :param operation: Name of the operation
+        :param error: Description of the failure (e.g.: exception or message)
+        :param status_code: Status code of the failure
+        :return: Failed result
+        """
+        return ApiResult(operation, False, status_code, error=str(error))
+
+
+def report(message: str) -> None:
+    """
+    Print status message of API call unless messages are silenced by 'quiet'
+    :param message: Message to print
+    :return: None
+    """
+    if _quiet_depth == 0:
+        print(message)
+
+
+@contextmanager
+def quiet() -> Iterator[None]:
+    """
+    Silence status messages of API calls (in all threads) while the context is active
+    :return: Context manager
+    """
+    global _quiet_depth  # pylint: disable=W0603
+    with _quiet_lock:
+        _quiet_depth += 1
+    try:
+        yield
+    finally:
+        with _quiet_lock:
+            _quiet_depth -= 1
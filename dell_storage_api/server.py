@@ -1,9 +1,13 @@
 """ This module contains classes representing servers connected to the Storage Center """
-from typing import Dict, Any
-
-from requests import Session
+from typing import Dict, Any, Optional, TYPE_CHECKING
 
+from dell_storage_api import profiling
 from dell_storage_api.storage_object import StorageObject, StorageObjectCollection
+from dell_storage_api.transport import Transport
+from dell_storage_api.volume import VolumeCollection
+
+if TYPE_CHECKING:  # pragma: no cover
+    from dell_storage_api.mapping import MappingIndex  # pylint: disable=R0401
 
 
 class Server(StorageObject):
@@ -13,22 +17,27 @@ class Server(StorageObject):
     Instance ID of a server can be used to map Volume to this particular server. This action makes volume accessible
     as a block device in this server. Mapping volume to 'Cluster' makes volume accessible to all physical servers in
     this cluster.
+    Volumes mapped to server and members of cluster are resolved from MappingIndex (see
+    dell_storage_api.storage_center.StorageCenter.mapping_index), which attaches itself to all indexed servers.
     """
 
     TYPE_PHYSICAL_SERVER = 'ScPhysicalServer'
     TYPE_SERVER_CLUSTER = 'ScServerCluster'
 
-    def __init__(self, req_session: Session, base_url: str, name: str,
-                 instance_id: str, object_type: str) -> None:
+    def __init__(self, req_session: Transport, base_url: str, name: str,
+                 instance_id: str, object_type: str, parent_id: str = '') -> None:
         super(Server, self).__init__(req_session=req_session, base_url=base_url, name=name, instance_id=instance_id)
         self.type = object_type
+        self.parent_id = parent_id
+        self.mapping_index: Optional['MappingIndex'] = None
 
     @classmethod
-    def from_json(cls, req_session: Session, base_url: str, source_dict: Dict[Any, Any]) -> 'Server':
+    def from_json(cls, req_session: Transport, base_url: str, source_dict: Dict[Any, Any]) -> 'Server':
         """
         Class method that creates instance of Server class from supplied dictionary. Source dictionary is expected
-        to contain at least 'instanceId', 'name' and 'objectType' keys.
-        :param req_session: requests.Session object with stored login cookies. (passed down
+        to contain at least 'instanceId', 'name' and 'objectType' keys. Physical servers that are members of cluster
+        contain also 'parent' key referencing the cluster.
+        :param req_session: Transport with stored login cookies. (passed down
         from dell_storage_api.session.DsmSession)
         :param base_url: base URL of DSM
         :param source_dict: Dictionary containing data about Server object
@@ -38,7 +47,8 @@ class Server(StorageObject):
                       base_url=base_url,
                       name=source_dict['name'],
                       instance_id=source_dict['instanceId'],
-                      object_type=source_dict['objectType'])
+                      object_type=source_dict['objectType'],
+                      parent_id=(source_dict.get('parent') or {}).get('instanceId', ''))
 
     def is_cluster(self) -> bool:
         """
@@ -67,6 +77,41 @@ class Server(StorageObject):
             result = "Unknown Type"
         return result
 
+    def _index(self, index: Optional['MappingIndex']) -> Optional['MappingIndex']:
+        """
+        Internal method that returns supplied mapping index or index to which this server is attached
+        :param index: Explicitly supplied MappingIndex or None
+        :return: MappingIndex or None if there is no index available
+        """
+        index = index or self.mapping_index
+        if index is None:
+            print("Error: Server '%s' is not indexed. Use StorageCenter.mapping_index() first." % self.name)
+        return index
+
+    def volumes(self, index: Optional['MappingIndex'] = None, include_cluster: bool = True) -> VolumeCollection:
+        """
+        Return volumes mapped to this server. Volumes mapped to cluster of this server are included as well, unless
+        include_cluster is False.
+        :param index: MappingIndex used for lookup (Defaults to index to which this server is attached)
+        :param include_cluster: Include volumes mapped to cluster of this server
+        :return: Collection of volumes (empty if there is no index available)
+        """
+        index = self._index(index)
+        if index is None:
+            return VolumeCollection()
+        return index.volumes_of(self.instance_id, include_cluster)
+
+    def members(self, index: Optional['MappingIndex'] = None) -> 'ServerCollection':
+        """
+        Return physical servers that are members of this cluster. Physical servers have no members.
+        :param index: MappingIndex used for lookup (Defaults to index to which this server is attached)
+        :return: Collection of servers (empty if there is no index available)
+        """
+        index = self._index(index)
+        if index is None or not self.is_cluster():
+            return ServerCollection()
+        return index.members_of(self.instance_id)
+
 
 class ServerCollection(StorageObjectCollection):
     """
@@ -78,19 +123,24 @@ class ServerCollection(StorageObjectCollection):
         Return subset collection containing only servers of type 'Physical Server'
         :return: Subset containing only physical servers
         """
-        physical_servers = ServerCollection()
-        for server in self:
-            if server.is_physical_server():
-                physical_servers.add(server)
-        return physical_servers
+        return self.filter_by_type(Server.TYPE_PHYSICAL_SERVER)
+
+    def filter_by_type(self, object_type: str) -> 'ServerCollection':
+        """
+        Return subset collection containing only servers of specified type
+        :param object_type: Type of server (e.g.: Server.TYPE_PHYSICAL_SERVER or Server.TYPE_SERVER_CLUSTER)
+        :return: Subset containing only servers of given type
+        """
+        result = ServerCollection()
+        with profiling.phase(profiling.PHASE_FILTER):
+            for server in self:
+                if server.type == object_type:
+                    result.add(server)
+        return result
 
     def filter_clusters(self) -> 'ServerCollection':
         """
         Return subset collection containing only servers of type 'Cluster'
         :return: Subset containing only clusters
         """
-        clusters = ServerCollection()
-        for server in self:
-            if server.is_cluster():
-                clusters.add(server)
-        return clusters
+        return self.filter_by_type(Server.TYPE_SERVER_CLUSTER)
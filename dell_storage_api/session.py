@@ -1,22 +1,33 @@
 """ This module contains Session for communication with Dell Storage Manager (DSM) API. """
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 import urllib3
-import requests
 from requests.auth import HTTPBasicAuth
-from requests.structures import CaseInsensitiveDict
 
+from dell_storage_api import profiling
+from dell_storage_api.codec import decode_response
+from dell_storage_api.snapshot import SnapshotStore
 from dell_storage_api.storage_center import StorageCenter, StorageCenterCollection
+from dell_storage_api.throttle import ThrottleRegistry
+from dell_storage_api.transport import Transport, TransportError, create_transport
 
 
 class DsmSession:
     """
-    This class represents HTTP Session with Dell Storage Manager (DSM). After successful login, underlying
-    requests.Session object holds login cookie used to authorize all further requests to DSM API until its expiration.
-    DsmSession object holds two important properties, 'base_url' and 'session' which are passed down to child objects
-    like Storage Centers, Servers or Volumes. These child elements can then perform their own specific API calls to DSM
-    by combining base_url, specific API endpoint and their unique Instance ID to create complete API endpoint URL and
-    send requests to this complete endpoint using authenticated session.
+    This class represents HTTP Session with Dell Storage Manager (DSM). After successful login, underlying transport
+    (by default RequestsTransport) holds login cookie used to authorize all further requests to DSM API until its
+    expiration. DsmSession object holds two important properties, 'base_url' and 'session' (the transport) which are
+    passed down to child objects like Storage Centers, Servers or Volumes. These child elements can then perform their
+    own specific API calls to DSM by combining base_url, specific API endpoint and their unique Instance ID to create
+    complete API endpoint URL and send requests to this complete endpoint using authenticated session.
+    All requests pass through rate and concurrency limits of targeted Storage Center. Limits are shared by all sessions
+    using the same ThrottleRegistry (by default, process-wide registry is used). If 'transport' is specified,
+    'throttle_registry' is ignored and throttle registry of the transport is used.
+    If 'snapshot_store' is specified, Storage Centers returned by this session use it to list volumes, servers and
+    volume folders from fresh inventory snapshots (see dell_storage_api.snapshot).
+    Optional 'warm_up' after login discovers Storage Centers and prefetches their metadata in parallel, so that
+    following commands run on already opened pooled connections and metadata cached in Storage Center objects.
     """
     API_VERSION_HEADER = 'x-dell-api-verions'
     LOGIN_ENDPOINT = '/ApiConnection/Login'
@@ -24,22 +35,26 @@ class DsmSession:
     STORAGE_CENTER_LIST_ENDPOINT = '/ApiConnection/ApiConnection/%s/StorageCenterList'
 
     def __init__(self, username: str, password: str, host: str, port: int = 3033,
-                 api_version: str = '3.0', verify_cert: bool = True) -> None:
+                 api_version: str = '3.0', verify_cert: bool = True,
+                 throttle_registry: Optional[ThrottleRegistry] = None, transport: Optional[Transport] = None,
+                 snapshot_store: Optional[SnapshotStore] = None) -> None:
         self._host = host
         self._port = port
         self._username = username
         self._auth = HTTPBasicAuth(username, password)
         self._api_version = api_version
         self.base_url = 'https://%s:%s/api/rest' % (host, port)
-        self.session = requests.Session()
-        self.session.headers = CaseInsensitiveDict({'Content-Type': 'application/json',
-                                                    'Accept': 'application/json',
-                                                    self.API_VERSION_HEADER: self._api_version})
+        self.session = transport or create_transport(registry=throttle_registry)
+        self.session.headers.update({'Content-Type': 'application/json',
+                                     'Accept': 'application/json',
+                                     self.API_VERSION_HEADER: self._api_version})
         self.session.verify = verify_cert
         if not verify_cert:
             # Silence Warning about untrusted certificates if 'verify_cert' is None
             urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
         self.conn_instance_id = None
+        self.snapshot_store = snapshot_store
+        self._warm_storage_centers: Optional[StorageCenterCollection] = None
 
     @property
     def api_version(self) -> str:
@@ -59,6 +74,22 @@ class DsmSession:
         self._api_version = value
         self.session.headers[self.API_VERSION_HEADER] = value
 
+    @property
+    def host(self) -> str:
+        """
+        Return hostname or IP address of DSM
+        :return: DSM host
+        """
+        return self._host
+
+    @property
+    def port(self) -> int:
+        """
+        Return management port of DSM
+        :return: DSM port
+        """
+        return self._port
+
     @property
     def username(self) -> str:
         """
@@ -117,13 +148,18 @@ class DsmSession:
         :return: True if authentication completed successfully, otherwise False
         """
         success = False
-        resp = self.session.post(url=self.login_url, auth=self._auth)
+        with profiling.phase(profiling.PHASE_LOGIN):
+            try:
+                resp = self.session.post(url=self.login_url, auth=self._auth)
+            except TransportError as exc:
+                print("ERROR: Login failed - %s" % exc)
+                return False
         if resp.status_code == 200:
-            reported_api_version = resp.json().get('apiVersion', None)
+            reported_api_version = decode_response(resp).get('apiVersion', None)
             if reported_api_version:
                 self.api_version = reported_api_version
             try:
-                self.conn_instance_id = resp.json()['instanceId']
+                self.conn_instance_id = decode_response(resp)['instanceId']
             except KeyError:
                 print("ERROR: SCM API did not report connection instance ID")
             else:
@@ -139,7 +175,12 @@ class DsmSession:
         :param silent: Whether this method should print result of the logout operation
         :return: None
         """
-        resp = self.session.post(url=self.logout_url)
+        try:
+            resp = self.session.post(url=self.logout_url)
+        except TransportError as exc:
+            if not silent:
+                print("WARNING: Logout failed - %s" % exc)
+            return
         if resp.status_code == 204:
             if not silent:
                 print("Logout - OK")
@@ -147,25 +188,63 @@ class DsmSession:
             if not silent:
                 print("WARNING: Logout failed (%d) - %s" % (resp.status_code, resp.text))
 
+    def warm_up(self, prefetch: bool = True, max_workers: int = 8) -> StorageCenterCollection:
+        """
+        Discover Storage Centers managed by this DSM and, if prefetch is True, prefetch their servers and volume
+        folders in parallel. Concurrent requests also open pooled connections to DSM (TLS handshakes are paid here,
+        instead of by the first real command). Discovered Storage Centers are kept by this session and returned by
+        'storage_centers' and 'storage_center' until next warm up.
+        :param prefetch: Prefetch servers and volume folders of every Storage Center
+        :param max_workers: Maximum number of Storage Centers prefetched concurrently
+        :return: Collection of discovered Storage Centers
+        """
+        self._warm_storage_centers = None
+        storage_centers = self.storage_centers()
+        if prefetch and storage_centers:
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                list(executor.map(StorageCenter.prefetch, storage_centers))
+        if storage_centers:
+            self._warm_storage_centers = storage_centers
+        return storage_centers
+
+    def storage_center(self, instance_id: str) -> Optional[StorageCenter]:
+        """
+        Return Storage Center discovered by 'warm_up'
+        :param instance_id: Instance ID of a Storage Center
+        :return: StorageCenter object or None if the session was not warmed up or there is no such Storage Center
+        """
+        if self._warm_storage_centers is None:
+            return None
+        storage_center = self._warm_storage_centers.find_by_instance_id(instance_id)
+        return storage_center if isinstance(storage_center, StorageCenter) else None
+
     def storage_centers(self) -> StorageCenterCollection:
         """
-        Return collection of storage centers managed by this DSM
+        Return collection of storage centers managed by this DSM. If this session was warmed up, Storage Centers
+        discovered by 'warm_up' are returned without contacting DSM.
         :return:
         """
+        if self._warm_storage_centers is not None:
+            return self._warm_storage_centers
         url = self.sc_list_url
         storage_centers = StorageCenterCollection()
         if url is None:
             print("ERROR: Missing Connection ID, try logging in first")
         else:
-            resp = self.session.get(url=url)
+            try:
+                resp = self.session.get(url=url)
+            except TransportError as exc:
+                print("ERROR: Failed to load Storage Center list - %s" % exc)
+                return storage_centers
             if resp.status_code == 200:
-                for storage_center in resp.json():
+                for storage_center in decode_response(resp):
                     storage_centers.add(StorageCenter(req_session=self.session,
                                                       base_url=self.base_url,
                                                       name=storage_center['name'],
                                                       instance_id=storage_center['instanceId'],
                                                       serial_num=storage_center['scSerialNumber'],
-                                                      ip_addr=storage_center['hostOrIpAddress']))
+                                                      ip_addr=storage_center['hostOrIpAddress'],
+                                                      snapshot_store=self.snapshot_store))
 
             else:
                 print("ERROR: Failed to load Storage Center list (%d) - %s" % (resp.status_code, resp.text))
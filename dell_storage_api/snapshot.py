@@ -0,0 +1,215 @@
+"""
+This module contains inventory snapshots shared by multiple processes on the same host. Refresher process (e.g.: cron
+job running 'dell-storage-client snapshot refresh') fetches volumes, servers and volume folders of a Storage Center
+and writes them to snapshot file. Any other process can then open the snapshot read-only via mmap and rebuild
+collections from it without sending requests to DSM.
+Snapshot file starts with header (magic bytes, format version, creation time, instance ID of the Storage Center and
+table of sections) followed by sections, each of them being a complete columnar file (see dell_storage_api.columnar).
+Snapshot is written to temporary file which atomically replaces previous snapshot, so readers never see partially
+written file and readers that still have previous snapshot mapped are not affected by the swap.
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+from dell_storage_api import columnar
+from dell_storage_api.columnar import _pack_string, _unpack_string
+from dell_storage_api.server import ServerCollection
+from dell_storage_api.storage_object import StorageObjectFolderCollection
+from dell_storage_api.transport import Transport
+from dell_storage_api.volume import VolumeCollection
+
+MAGIC = b'DSSN'
+FORMAT_VERSION = 1
+
+
+class SnapshotFormatError(Exception):
+    """ Exception raised when snapshot file is corrupted or has unsupported format """
+
+
+class InventorySnapshot:
+    """
+    Read-only view of a snapshot file. File is memory mapped, sections are passed to columnar loaders as memoryview
+    slices of the mapping, so they are not copied.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, 'rb') as snapshot_file:
+            stat = os.fstat(snapshot_file.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            try:
+                self._mmap = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as exc:
+                raise SnapshotFormatError("Snapshot file '%s' is empty" % path) from exc
+        buffer = memoryview(self._mmap)
+        if bytes(buffer[0:4]) != MAGIC:
+            raise SnapshotFormatError("Not an inventory snapshot file")
+        version, self.created = struct.unpack_from('<Hd', buffer, 4)
+        if version != FORMAT_VERSION:
+            raise SnapshotFormatError("Unsupported snapshot version %d" % version)
+        self.storage_center_id, offset = _unpack_string(buffer, 14)
+        (section_count,) = struct.unpack_from('<H', buffer, offset)
+        offset += 2
+        self.sections: Dict[str, Tuple[int, int]] = {}
+        for _ in range(section_count):
+            kind, offset = _unpack_string(buffer, offset)
+            self.sections[kind] = struct.unpack_from('<QQ', buffer, offset)
+            offset += 16
+        self._buffer = buffer
+
+    def age(self) -> float:
+        """
+        Return age of this snapshot
+        :return: Seconds since the snapshot was created
+        """
+        return time.time() - self.created
+
+    def section(self, kind: str) -> memoryview:
+        """
+        Return content of a section (columnar file) without copying it
+        :param kind: Kind of objects in section (e.g.: columnar.KIND_VOLUME)
+        :return: Content of the section
+        """
+        if kind not in self.sections:
+            raise SnapshotFormatError("Snapshot does not contain '%s' objects" % kind)
+        offset, length = self.sections[kind]
+        return self._buffer[offset:offset + length]
+
+    def volumes(self, req_session: Transport, base_url: str) -> VolumeCollection:
+        """
+        Build collection of volumes stored in this snapshot
+        :param req_session: Transport used by built volumes
+        :param base_url: base URL of DSM
+        :return: Collection of volumes
+        """
+        return columnar.load_volumes(self.section(columnar.KIND_VOLUME), req_session, base_url)
+
+    def servers(self, req_session: Transport, base_url: str) -> ServerCollection:
+        """
+        Build collection of servers stored in this snapshot
+        :param req_session: Transport used by built servers
+        :param base_url: base URL of DSM
+        :return: Collection of servers
+        """
+        return columnar.load_servers(self.section(columnar.KIND_SERVER), req_session, base_url)
+
+    def volume_folders(self, req_session: Transport, base_url: str) -> StorageObjectFolderCollection:
+        """
+        Build collection of volume folders stored in this snapshot
+        :param req_session: Transport used by built volume folders
+        :param base_url: base URL of DSM
+        :return: Collection of volume folders
+        """
+        return columnar.load_volume_folders(self.section(columnar.KIND_VOLUME_FOLDER), req_session, base_url)
+
+    @classmethod
+    def write(cls, path: str, storage_center_id: str, volumes: VolumeCollection,  # pylint: disable=R0914
+              servers: ServerCollection, volume_folders: StorageObjectFolderCollection) -> None:
+        """
+        Write new snapshot and atomically replace the previous one
+        :param path: Path to snapshot file
+        :param storage_center_id: Instance ID of a Storage Center
+        :param volumes: Volumes of the Storage Center
+        :param servers: Servers of the Storage Center
+        :param volume_folders: Volume folders of the Storage Center
+        :return: None
+        """
+        kinds = [columnar.KIND_VOLUME, columnar.KIND_SERVER, columnar.KIND_VOLUME_FOLDER]
+        streams = {kind: BytesIO() for kind in kinds}
+        columnar.export_volumes(streams[columnar.KIND_VOLUME], volumes)
+        columnar.export_servers(streams[columnar.KIND_SERVER], servers)
+        columnar.export_volume_folders(streams[columnar.KIND_VOLUME_FOLDER], volume_folders)
+        sections = [(kind, stream.getvalue()) for kind, stream in streams.items()]
+
+        header = MAGIC + struct.pack('<Hd', FORMAT_VERSION, time.time()) + \
+            _pack_string(storage_center_id) + struct.pack('<H', len(sections))
+        # Offsets of sections depend on the size of section table, which is fixed for given kinds
+        offset = len(header) + sum(len(_pack_string(kind)) + 16 for kind, _ in sections)
+        table = b''
+        for kind, content in sections:
+            table += _pack_string(kind) + struct.pack('<QQ', offset, len(content))
+            offset += len(content)
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        try:
+            with open(tmp_path, 'wb') as snapshot_file:
+                snapshot_file.write(header + table)
+                for _, content in sections:
+                    snapshot_file.write(content)
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class SnapshotStore:
+    """
+    Directory of inventory snapshots, one file per Storage Center. Snapshots older than 'max_age' seconds are
+    considered stale and are not returned. Opened snapshots are kept mapped and reopened only when the file is
+    replaced by refresher.
+    """
+    DEFAULT_MAX_AGE = 300
+    DEFAULT_DIR = os.path.join('~', '.cache', 'dell-storage-client', 'snapshots')
+    FILE_SUFFIX = '.snapshot'
+
+    def __init__(self, directory: str, max_age: float = DEFAULT_MAX_AGE) -> None:
+        self.directory = os.path.expanduser(directory)
+        self.max_age = max_age
+        self._snapshots: Dict[str, InventorySnapshot] = {}
+        self._lock = threading.Lock()
+
+    def path(self, storage_center_id: str) -> str:
+        """
+        Return path to snapshot file of a Storage Center
+        :param storage_center_id: Instance ID of a Storage Center
+        :return: Path to snapshot file
+        """
+        return os.path.join(self.directory, storage_center_id + self.FILE_SUFFIX)
+
+    def write(self, storage_center_id: str, volumes: VolumeCollection, servers: ServerCollection,
+              volume_folders: StorageObjectFolderCollection) -> str:
+        """
+        Write new snapshot of a Storage Center
+        :param storage_center_id: Instance ID of a Storage Center
+        :param volumes: Volumes of the Storage Center
+        :param servers: Servers of the Storage Center
+        :param volume_folders: Volume folders of the Storage Center
+        :return: Path to written snapshot file
+        """
+        path = self.path(storage_center_id)
+        InventorySnapshot.write(path, storage_center_id, volumes, servers, volume_folders)
+        return path
+
+    def get(self, storage_center_id: str) -> Optional[InventorySnapshot]:
+        """
+        Return fresh snapshot of a Storage Center. Snapshot file is reopened if it was replaced since last call.
+        :param storage_center_id: Instance ID of a Storage Center
+        :return: Snapshot or None if there is no fresh snapshot
+        """
+        path = self.path(storage_center_id)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            snapshot = self._snapshots.get(storage_center_id)
+            if snapshot is None or snapshot.identity != (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+                try:
+                    snapshot = InventorySnapshot(path)
+                except (OSError, SnapshotFormatError, struct.error) as exc:
+                    print("WARNING: Failed to open inventory snapshot '%s' - %s" % (path, exc))
+                    return None
+                # Previous snapshot is not closed explicitly, it may still be used by other threads
+                self._snapshots[storage_center_id] = snapshot
+        if snapshot.age() > self.max_age:
+            return None
+        return snapshot
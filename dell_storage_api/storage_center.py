@@ -1,30 +1,79 @@
 """ This module contains classes that represent Storage Centers managed by Dell Storage manager (DSM) """
-from typing import Any, Dict, Optional
-
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 
+from dell_storage_api import profiling
+from dell_storage_api.capacity import CapacityReport
+from dell_storage_api.mapping import MappingIndex
+from dell_storage_api.payload_filter import PayloadFilter
+from dell_storage_api.result import ApiResult, report
 from dell_storage_api.storage_object import StorageObject, StorageObjectFolder, StorageObjectCollection, \
     StorageObjectFolderCollection
 from dell_storage_api.volume import Volume, VolumeCollection, VolumeFolder
+from dell_storage_api.watch import ChangeEvent, Watcher
 from dell_storage_api.server import Server, ServerCollection
+from dell_storage_api.snapshot import InventorySnapshot, SnapshotStore
+from dell_storage_api.transport import Transport
+
+
+class InventoryError(Exception):
+    """ Exception raised when listing of Storage Center objects can not be fetched completely """
+
+
+class Inventory:  # pylint: disable=R0903
+    """
+    Complete inventory of a Storage Center fetched directly from DSM (see 'StorageCenter.fetch_inventory'). Attribute
+    'mapping' contains sorted lists of server names indexed by volume instance ID, or None if mapping was not fetched.
+    """
+
+    def __init__(self, volumes: VolumeCollection, servers: ServerCollection,
+                 volume_folders: StorageObjectFolderCollection,
+                 mapping: Optional[Dict[str, List[str]]] = None) -> None:
+        self.volumes = volumes
+        self.servers = servers
+        self.volume_folders = volume_folders
+        self.mapping = mapping
 
 
 class StorageCenter(StorageObject):
     """
-    Class representing physical Storage Center managed by DSM
+    Class representing physical Storage Center managed by DSM. If 'snapshot_store' is specified and contains fresh
+    snapshot of this Storage Center, unfiltered listings of volumes, servers and volume folders are built from the
+    snapshot instead of being fetched from DSM. Snapshot is not used anymore once some object is created through this
+    Storage Center, since the snapshot would not contain it. Unfiltered listings of servers and volume folders can be
+    also prefetched in advance (see 'prefetch'), in which case they are served from memory for PREFETCH_TTL seconds.
     """
     SERVER_FOLDER_LIST_ENDPOINT = '/StorageCenter/StorageCenter/%s/ServerFolderList'
     SERVER_LIST_ENDPOINT = '/StorageCenter/StorageCenter/%s/ServerList'
     SERVER_FOLDER_ENDPOINT = '/StorageCenter/ScServerFolder/%s'
+    SERVER_ENDPOINT = '/StorageCenter/ScServer/%s'
 
     VOLUME_FOLDER_LIST_ENDPOINT = '/StorageCenter/StorageCenter/%s/VolumeFolderList'
     VOLUME_LIST_ENDPOINT = '/StorageCenter/StorageCenter/%s/VolumeList'
 
-    def __init__(self, req_session: requests.Session, base_url: str, name: str,
-                 instance_id: str, serial_num: str, ip_addr: str) -> None:
+    SERVER_QUERY_ENDPOINT = '/StorageCenter/ScServer/GetList'
+    VOLUME_QUERY_ENDPOINT = '/StorageCenter/ScVolume/GetList'
+    VOLUME_FOLDER_QUERY_ENDPOINT = '/StorageCenter/ScVolumeFolder/GetList'
+    VOLUME_USAGE_QUERY_ENDPOINT = '/StorageCenter/ScVolumeStorageUsage/GetList'
+    MAPPING_PROFILE_QUERY_ENDPOINT = '/StorageCenter/ScMappingProfile/GetList'
+
+    CHUNK_FETCH_WORKERS = 4
+    PREFETCH_TTL = 60
+
+    def __init__(self, req_session: Transport, base_url: str, name: str,
+                 instance_id: str, serial_num: str, ip_addr: str,
+                 snapshot_store: Optional[SnapshotStore] = None) -> None:
         super(StorageCenter, self).__init__(req_session, base_url, name, instance_id)
         self.serial_num = serial_num
         self.ip_addr = ip_addr
+        self.snapshot_store = snapshot_store
+        # Set when this Storage Center is changed, so that the snapshot no longer reflects its state
+        self._snapshot_stale = False
+        # Prefetched raw listings indexed by listing URL, together with the time they were fetched
+        self._prefetched: Dict[str, Any] = {}
+        self._prefetch_lock = threading.Lock()
 
     @property
     def server_folder_list_url(self) -> str:
@@ -65,42 +114,424 @@ class StorageCenter(StorageObject):
         """
         return self._fetch_object_list(self.server_folder_list_url)
 
-    def server_list(self) -> ServerCollection:
+    def server_list(self, object_type: str = '') -> ServerCollection:
         """
-        Return collection of all servers defined in this Storage Center
-        :return: Collection of all Servers
+        Return collection of servers defined in this Storage Center. If object_type is specified, only servers of this
+        type are fetched from DSM. In case DSM rejects filtered query, servers are filtered on client side.
+        :param object_type: Limit result to servers of specific type (e.g.: Server.TYPE_SERVER_CLUSTER)
+        :return: Collection of Servers
+        """
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            result = snapshot.servers(self.session, self.base_url)
+            return result.filter_by_type(object_type) if object_type else result
+        server_data = self._take_prefetched(self.server_list_url)
+        if server_data is not None:
+            result = self._build_server_collection(server_data)
+            return result.filter_by_type(object_type) if object_type else result
+        if object_type:
+            server_data = self._fetch_filtered_object_list(self.base_url + self.SERVER_QUERY_ENDPOINT,
+                                                           PayloadFilter().append('objectType', object_type),
+                                                           report_errors=False)
+            if server_data is not None:
+                return self._build_server_collection(server_data)
+        result = self._build_server_collection(self._fetch_object_list(self.server_list_url))
+        if object_type:
+            result = result.filter_by_type(object_type)
+        return result
+
+    def volume_folder_list(self, parent_id: str = '') -> StorageObjectFolderCollection:
+        """
+        Return collection of Volume Folders in this Storage Center. If parent_id is specified, only direct children
+        of this folder are fetched from DSM. In case DSM rejects filtered query, folders are filtered on client side.
+        :param parent_id: Limit result to child folders of Volume Folder with this instance ID
+        :return: Collection of Volume Folders
+        """
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            result = snapshot.volume_folders(self.session, self.base_url)
+            return result.find_by_parent_id(parent_id) if parent_id else result
+        folder_data = self._take_prefetched(self.volume_folder_list_url)
+        if folder_data is not None:
+            result = self._build_volume_folder_collection(folder_data)
+            return result.find_by_parent_id(parent_id) if parent_id else result
+        if parent_id:
+            folder_data = self._fetch_filtered_object_list(self.base_url + self.VOLUME_FOLDER_QUERY_ENDPOINT,
+                                                           PayloadFilter().append('parent', parent_id),
+                                                           report_errors=False)
+            if folder_data is not None:
+                return self._build_volume_folder_collection(folder_data)
+        result = self._build_volume_folder_collection(self._fetch_object_list(url=self.volume_folder_list_url))
+        if parent_id:
+            result = result.find_by_parent_id(parent_id)
+        return result
+
+    def volume_list(self, folder_id: str = '') -> VolumeCollection:
+        """
+        Return collection of volumes present in this Storage Center. If folder_id is specified, only volumes from this
+        Volume Folder are fetched from DSM. In case DSM rejects filtered query, volumes are filtered on client side.
+        :param folder_id: Limit result to volumes in Volume Folder with this instance ID
+        :return: Collection of volumes
+        """
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            result = snapshot.volumes(self.session, self.base_url)
+            return result.find_by_parent_folder(folder_id) if folder_id else result
+        if folder_id:
+            volume_data = self._fetch_filtered_object_list(self.base_url + self.VOLUME_QUERY_ENDPOINT,
+                                                           PayloadFilter().append('volumeFolder', folder_id),
+                                                           report_errors=False)
+            if volume_data is not None:
+                return self._build_volume_collection(volume_data)
+        result = self._build_volume_collection(self._fetch_object_list(url=self.volume_list_url))
+        if folder_id:
+            result = result.find_by_parent_folder(folder_id)
+        return result
+
+    def _snapshot(self) -> Optional[InventorySnapshot]:
+        """
+        Internal method that returns fresh inventory snapshot of this Storage Center
+        :return: Snapshot or None if there is no snapshot store or no fresh snapshot
+        """
+        if self.snapshot_store is None or self._snapshot_stale:
+            return None
+        return self.snapshot_store.get(self.instance_id)
+
+    def _invalidate_listings(self, url: str) -> None:
+        """
+        Internal method that drops cached listings after change of this Storage Center. Prefetched listing is
+        discarded and inventory snapshot is not used anymore.
+        :param url: URL of the prefetched listing affected by the change
+        :return: None
+        """
+        self._snapshot_stale = True
+        with self._prefetch_lock:
+            self._prefetched.pop(url, None)
+
+    def prefetch(self) -> bool:
+        """
+        Fetch unfiltered listings of servers and volume folders concurrently and keep them in memory, so that
+        following calls of 'server_list' and 'volume_folder_list' do not have to contact DSM
+        :return: True if both listings were fetched, otherwise False
+        """
+        urls = [self.server_list_url, self.volume_folder_list_url]
+        with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+            results = list(executor.map(self._try_fetch_object_list, urls))
+        fetched = time.monotonic()
+        with self._prefetch_lock:
+            for url, object_list in zip(urls, results):
+                if object_list is not None:
+                    self._prefetched[url] = (fetched, object_list)
+        return None not in results
+
+    def _take_prefetched(self, url: str) -> Optional[List[Dict[Any, Any]]]:
+        """
+        Internal method that returns prefetched raw listing, if it is not older than PREFETCH_TTL
+        :param url: URL of the listing
+        :return: raw list of objects or None if the listing was not prefetched or is expired
+        """
+        with self._prefetch_lock:
+            if url not in self._prefetched:
+                return None
+            fetched, object_list = self._prefetched[url]
+            if time.monotonic() - fetched > self.PREFETCH_TTL:
+                del self._prefetched[url]
+                return None
+            return object_list
+
+    def refresh_snapshot(self, snapshot_store: Optional[SnapshotStore] = None) -> Optional[str]:
+        """
+        Fetch volumes, servers and volume folders of this Storage Center from DSM (concurrently, bypassing any existing
+        snapshot) and write them as new inventory snapshot.
+        :param snapshot_store: Store where the snapshot is written (Defaults to store of this Storage Center)
+        :return: Path to written snapshot or None if listings could not be fetched
+        """
+        snapshot_store = snapshot_store or self.snapshot_store
+        if snapshot_store is None:
+            raise ValueError("Storage Center '%s' has no snapshot store" % self.name)
+        inventory = self.fetch_inventory(include_mapping=False)
+        if inventory is None:
+            return None
+        return snapshot_store.write(self.instance_id, inventory.volumes, inventory.servers, inventory.volume_folders)
+
+    def fetch_inventory(self, include_mapping: bool = True) -> Optional[Inventory]:
+        """
+        Fetch volumes, servers, volume folders and (if include_mapping is True) volume mapping of this Storage Center
+        concurrently. Listings are always fetched from DSM, bypassing inventory snapshot and prefetched listings, so
+        the inventory reflects current state and can be used to plan changes. Unlike 'volume_list' and others, this
+        method does not return empty collections when some listing can not be fetched.
+        :param include_mapping: Fetch also mapping of volumes to servers
+        :return: Inventory or None if any of the listings could not be fetched
+        """
+        urls = [self.volume_list_url, self.server_list_url, self.volume_folder_list_url]
+        with ThreadPoolExecutor(max_workers=len(urls) + 1) as executor:
+            mapping_future = executor.submit(self._fetch_volume_server_mapping) if include_mapping else None
+            volume_data, server_data, folder_data = executor.map(self._try_fetch_object_list, urls)
+            mapping = mapping_future.result() if mapping_future is not None else None
+        if volume_data is None or server_data is None or folder_data is None:
+            return None
+        if include_mapping and mapping is None:
+            return None
+        return Inventory(self._build_volume_collection(volume_data), self._build_server_collection(server_data),
+                         self._build_volume_folder_collection(folder_data), mapping)
+
+    def server(self, instance_id: str) -> Optional[Server]:
+        """
+        Fetch single server (or cluster) with given instance ID from DSM. Return None if there is no such server.
+        :param instance_id: Instance ID of a server
+        :return: Server object or None
+        """
+        server_data = self._fetch_object(self.base_url + self.SERVER_ENDPOINT % instance_id)
+        if server_data is None:
+            return None
+        return Server.from_json(req_session=self.session, base_url=self.base_url, source_dict=server_data)
+
+    def volume(self, instance_id: str) -> Optional[Volume]:
+        """
+        Fetch single volume with given instance ID from DSM. Return None if there is no such volume.
+        :param instance_id: Instance ID of a volume
+        :return: Volume object or None
+        """
+        volume_data = self._fetch_object(self.base_url + Volume.VOLUME_ENDPOINT % instance_id)
+        if volume_data is None:
+            return None
+        return Volume.from_json(req_session=self.session, base_url=self.base_url, source_dict=volume_data)
+
+    def _build_server_collection(self, object_list: Iterable[Dict[Any, Any]]) -> ServerCollection:
+        """
+        Internal method that creates ServerCollection from raw list of servers returned by DSM
+        :param object_list: raw list of servers
+        :return: Collection of Servers
         """
         result = ServerCollection()
-        for server_data in self._fetch_object_list(self.server_list_url):
-            result.add(Server.from_json(req_session=self.session,
-                                        base_url=self.base_url,
-                                        source_dict=server_data))
+        add, from_json, session, base_url = result.add, Server.from_json, self.session, self.base_url
+        with profiling.phase(profiling.PHASE_BUILD):
+            for server_data in object_list:
+                add(from_json(session, base_url, server_data))
         return result
 
-    def volume_folder_list(self) -> StorageObjectFolderCollection:
+    def _build_volume_folder_collection(self, object_list: Iterable[Dict[Any, Any]]) -> StorageObjectFolderCollection:
         """
-        Return collection of all Volume Folders in this Storage Center
-        :return: Collection of all Volume Folders
+        Internal method that creates StorageObjectFolderCollection from raw list of volume folders returned by DSM
+        :param object_list: raw list of volume folders
+        :return: Collection of Volume Folders
         """
         result = StorageObjectFolderCollection()
-        for volume_folder_data in self._fetch_object_list(url=self.volume_folder_list_url):
-            result.add(VolumeFolder.from_json(req_session=self.session,
-                                              base_url=self.base_url,
-                                              source_dict=volume_folder_data))
+        add, from_json, session, base_url = result.add, VolumeFolder.from_json, self.session, self.base_url
+        with profiling.phase(profiling.PHASE_BUILD):
+            for volume_folder_data in object_list:
+                add(from_json(session, base_url, volume_folder_data))
+        return result
+
+    def _build_volume_collection(self, object_list: Iterable[Dict[Any, Any]]) -> VolumeCollection:
+        """
+        Internal method that creates VolumeCollection from raw list of volumes returned by DSM
+        :param object_list: raw list of volumes
+        :return: Collection of volumes
+        """
+        result = VolumeCollection()
+        # Bound locals avoid repeated attribute lookups when building collections of thousands of objects
+        add, from_json, session, base_url = result.add, Volume.from_json, self.session, self.base_url
+        with profiling.phase(profiling.PHASE_BUILD):
+            for volume_data in object_list:
+                add(from_json(session, base_url, volume_data))
         return result
 
-    def volume_list(self) -> VolumeCollection:
+    def iter_volume_chunks(self, max_workers: int = CHUNK_FETCH_WORKERS) -> Iterator[VolumeCollection]:
+        """
+        Fetch volumes present in this Storage Center in multiple smaller slices, one slice per Volume Folder. Slices
+        are fetched concurrently via DSM query endpoint and yielded as soon as they are available, so that no single
+        response has to contain whole volume inventory. If volume folders can not be listed, whole volume list is
+        fetched at once and yielded as a single slice. Volumes from slices whose query fails are taken from whole
+        volume list as well.
+        :param max_workers: Maximum number of slices that are fetched concurrently
+        :raises InventoryError: if some volumes can not be fetched at all
+        :return: Iterator of VolumeCollections, each containing volumes from single Volume Folder
+        """
+        folder_ids = [folder.instance_id for folder in self.volume_folder_list()]
+        for chunk in self._iter_object_chunks(self.base_url + self.VOLUME_QUERY_ENDPOINT, 'volumeFolder',
+                                              folder_ids, max_workers, self.volume_list_url):
+            yield self._build_volume_collection(chunk)
+
+    def volume_list_chunked(self, max_workers: int = CHUNK_FETCH_WORKERS) -> VolumeCollection:
         """
-        Return collection of all volumes present in this Storage Center
+        Return collection of all volumes present in this Storage Center. Unlike 'volume_list', volumes are fetched
+        in slices (one per Volume Folder) which keeps size of every single response from DSM small.
+        :param max_workers: Maximum number of slices that are fetched concurrently
+        :raises InventoryError: if some volumes can not be fetched at all
         :return: Collection of all volumes
         """
         result = VolumeCollection()
-        for volume_data in self._fetch_object_list(url=self.volume_list_url):
-            result.add(Volume.from_json(req_session=self.session,
-                                        base_url=self.base_url,
-                                        source_dict=volume_data))
+        for chunk in self.iter_volume_chunks(max_workers):
+            for volume in chunk:
+                result.add(volume)
         return result
 
+    def iter_server_chunks(self, max_workers: int = CHUNK_FETCH_WORKERS) -> Iterator[ServerCollection]:
+        """
+        Fetch servers defined in this Storage Center in multiple smaller slices, one slice per Server Folder. If server
+        folders can not be listed, whole server list is fetched at once and yielded as a single slice. Servers from
+        slices whose query fails are taken from whole server list as well.
+        :param max_workers: Maximum number of slices that are fetched concurrently
+        :raises InventoryError: if some servers can not be fetched at all
+        :return: Iterator of ServerCollections, each containing servers from single Server Folder
+        """
+        folder_ids = [folder['instanceId'] for folder in self._fetch_object_list(self.server_folder_list_url)]
+        for chunk in self._iter_object_chunks(self.base_url + self.SERVER_QUERY_ENDPOINT, 'serverFolder',
+                                              folder_ids, max_workers, self.server_list_url):
+            yield self._build_server_collection(chunk)
+
+    def server_list_chunked(self, max_workers: int = CHUNK_FETCH_WORKERS) -> ServerCollection:
+        """
+        Return collection of all servers defined in this Storage Center, fetched in slices (one per Server Folder).
+        :param max_workers: Maximum number of slices that are fetched concurrently
+        :raises InventoryError: if some servers can not be fetched at all
+        :return: Collection of all Servers
+        """
+        result = ServerCollection()
+        for chunk in self.iter_server_chunks(max_workers):
+            for server in chunk:
+                result.add(server)
+        return result
+
+    def volume_server_mapping(self) -> Dict[str, List[str]]:
+        """
+        Return names of servers (or clusters) to which volumes in this Storage Center are mapped. All mapping profiles
+        are fetched by single query.
+        :return: Sorted lists of server names indexed by volume instance ID
+        """
+        return self._fetch_volume_server_mapping() or {}
+
+    def _fetch_volume_server_mapping(self) -> Optional[Dict[str, List[str]]]:
+        """
+        Internal method that fetches all mapping profiles in this Storage Center by single query and returns names of
+        servers to which volumes are mapped. Return None if mapping profiles can not be fetched.
+        :return: Sorted lists of server names indexed by volume instance ID or None
+        """
+        profiles = self._fetch_mapping_profiles()
+        if profiles is None:
+            return None
+        result: Dict[str, List[str]] = {}
+        for profile in profiles:
+            servers = result.setdefault(profile['volume']['instanceId'], [])
+            if profile['server']['instanceName'] not in servers:
+                servers.append(profile['server']['instanceName'])
+        for servers in result.values():
+            servers.sort()
+        return result
+
+    def _fetch_mapping_profiles(self) -> Optional[List[Dict[Any, Any]]]:
+        """
+        Internal method that fetches all mapping profiles in this Storage Center by single query
+        :return: raw list of mapping profiles or None in case of failure
+        """
+        return self._fetch_filtered_object_list(self.base_url + self.MAPPING_PROFILE_QUERY_ENDPOINT, PayloadFilter())
+
+    def mapping_index(self, include_volumes: bool = True) -> Optional[MappingIndex]:
+        """
+        Build index of volume mapping and cluster membership in this Storage Center. Mapping profiles, servers and
+        (if include_volumes is True) volumes are fetched concurrently, one request each, regardless of number of
+        mapped volumes. Fetched servers are attached to the index, so 'Server.volumes' and 'Server.members' can be
+        used without further requests.
+        :param include_volumes: Fetch volumes, so the index can return Volume objects (not only their instance IDs)
+        :return: MappingIndex or None if mapping profiles can not be fetched
+        """
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            profiles = executor.submit(self._fetch_mapping_profiles)
+            servers = executor.submit(self.server_list)
+            volumes = executor.submit(self.volume_list) if include_volumes else None
+            profile_data = profiles.result()
+            if profile_data is None:
+                return None
+            return MappingIndex(profile_data, servers.result(), volumes.result() if volumes is not None else None)
+
+    def state_snapshot(self, include_servers: bool = True,
+                       include_mapping: bool = False) -> Dict[str, Optional[Dict[str, Dict[str, Any]]]]:
+        """
+        Return lightweight snapshot of volumes (and optionally servers) in this Storage Center. Snapshot is built
+        directly from raw lists returned by DSM, without creating Volume or Server objects, and contains only
+        attributes relevant for change detection. If include_mapping is True, every volume contains also comma
+        separated names of servers it is mapped to.
+        :param include_servers: Include snapshot of servers
+        :param include_mapping: Include mapping of volumes to servers
+        :return: Snapshots indexed by kind ('volume', 'server'), snapshot is None if it could not be fetched
+        """
+        result: Dict[str, Optional[Dict[str, Dict[str, Any]]]] = {}
+        volumes = self._try_fetch_object_list(self.volume_list_url)
+        if volumes is None:
+            result['volume'] = None
+        else:
+            volume_snapshot = {volume['instanceId']: {'name': volume.get('name'),
+                                                      'status': volume.get('status'),
+                                                      'folder': (volume.get('volumeFolder') or {}).get('instanceId')}
+                               for volume in volumes}
+            mapping = self._fetch_volume_server_mapping() if include_mapping else None
+            if mapping is not None:
+                for instance_id, state in volume_snapshot.items():
+                    state['mapping'] = ','.join(mapping.get(instance_id, []))
+            result['volume'] = volume_snapshot
+        if include_servers:
+            servers = self._try_fetch_object_list(self.server_list_url)
+            result['server'] = None if servers is None else \
+                {server['instanceId']: {'name': server.get('name'), 'type': server.get('objectType')}
+                 for server in servers}
+        return result
+
+    def watch(self, interval: float = Watcher.DEFAULT_INTERVAL, jitter: float = Watcher.DEFAULT_JITTER,
+              include_servers: bool = True, include_mapping: bool = False, max_polls: Optional[int] = None,
+              callback: Optional[Callable[[ChangeEvent], None]] = None) -> Iterator[ChangeEvent]:
+        """
+        Poll volumes (and optionally servers) in this Storage Center in a loop and yield events describing their
+        changes (added, removed, status or mapping changed). First poll only records initial state.
+        :param interval: Number of seconds between polls
+        :param jitter: Random deviation of the interval (fraction of the interval)
+        :param include_servers: Watch also changes of servers
+        :param include_mapping: Watch also changes of volume mapping (costs one additional request per poll)
+        :param max_polls: Stop after this number of polls (Defaults to infinite loop)
+        :param callback: Optional callable invoked with every event
+        :return: Iterator of change events
+        """
+        watcher = Watcher([self], interval, jitter, include_servers, include_mapping)
+        return watcher.watch(max_polls, callback)
+
+    def storage_usage(self, include_mapping: bool = True, max_workers: int = CHUNK_FETCH_WORKERS) -> CapacityReport:
+        """
+        Return capacity report of all volumes in this Storage Center. Storage usage of all volumes is fetched by single
+        query, usage of volumes missing in the query result (or of all volumes, if the query fails) is fetched
+        concurrently volume by volume.
+        :param include_mapping: Include servers to which volumes are mapped, so the report can be aggregated by server
+        :param max_workers: Maximum number of concurrent per-volume requests
+        :raises InventoryError: if volumes (or mapping of volumes) can not be fetched
+        :return: Capacity report
+        """
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            volumes = snapshot.volumes(self.session, self.base_url)
+        else:
+            volume_data = self._try_fetch_object_list(self.volume_list_url)
+            if volume_data is None:
+                raise InventoryError("Failed to fetch volumes of Storage Center '%s'" % self.instance_id)
+            volumes = self._build_volume_collection(volume_data)
+        usage: Dict[str, Dict[str, Any]] = {}
+        for record in self._fetch_filtered_object_list(self.base_url + self.VOLUME_USAGE_QUERY_ENDPOINT,
+                                                       PayloadFilter()) or []:
+            # Usage record references its volume (Explicit null included), otherwise it shares instance ID of the volume
+            usage[(record.get('volume') or record)['instanceId']] = record
+        missing = [volume for volume in volumes if volume.instance_id not in usage]
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                for volume, record in zip(missing, executor.map(lambda volume: volume.storage_usage(), missing)):
+                    usage[volume.instance_id] = record
+        mapping: Dict[str, Dict[str, str]] = {}
+        if include_mapping:
+            profiles = self._fetch_mapping_profiles()
+            if profiles is None:
+                raise InventoryError("Failed to fetch volume mapping of Storage Center '%s'" % self.instance_id)
+            for profile in profiles:
+                servers = mapping.setdefault(profile['volume']['instanceId'], {})
+                servers[profile['server']['instanceId']] = profile['server']['instanceName']
+        return CapacityReport.from_usage(self.instance_id, volumes, usage, mapping)
+
     def _find_volume_folder_root(self) -> Optional[StorageObjectFolder]:
         """
         Internal method to find root Volume Folder that contains all other Volumes and Volume Folders. Method returns
@@ -109,76 +540,92 @@ class StorageCenter(StorageObject):
         """
         all_folders = self.volume_folder_list()
         if not all_folders:
-            print("Error: Failed to fetch volume folder list")
+            report("Error: Failed to fetch volume folder list")
             return None
         else:
-            root_folder = self.volume_folder_list().root_folder()
+            root_folder = all_folders.root_folder()
             if root_folder is None:
-                print("Error: Failed to lookup root volume folder in list of all folders. "
-                      "This really should not happen")
+                report("Error: Failed to lookup root volume folder in list of all folders. "
+                       "This really should not happen")
                 return None
             else:
                 return root_folder
 
-    def new_volume_folder(self, name: str, parent_folder_id: str = '') -> Optional[VolumeFolder]:
+    def new_volume_folder(self, name: str, parent_folder_id: str = '') -> ApiResult:
         """
-        Create new Volume Folder in Storage Center and return object representing this new folder. This method
-        returns None in case there is a problem with folder creation.
+        Create new Volume Folder in Storage Center. Value of successful result is object representing this new folder.
         :param name: Name for the new Volume Folder
         :param parent_folder_id: Instance ID of parent folder. Defaults to root folder
-        :return: new VolumeFolder object or None in case of failure
+        :return: Result of the operation with new VolumeFolder object as its value
         """
         if not parent_folder_id:
             parent_folder = self._find_volume_folder_root()
-            if parent_folder is not None:
-                parent_folder_id = parent_folder.instance_id
-            else:
-                print("Error: Failed to create new volume folder")
-                return None
-        if parent_folder_id is None:
-            print("Error: Failed to create new volume folder")
-            return None
+            if parent_folder is None:
+                report("Error: Failed to create new volume folder")
+                return ApiResult.failure('new_volume_folder', 'Root volume folder not found')
+            parent_folder_id = parent_folder.instance_id
         url = self.base_url + VolumeFolder.ENDPOINT
         payload = {"Name": name,
                    "Parent": parent_folder_id,
                    "StorageCenter": self.instance_id}
-        resp = self.session.post(url, json=payload)
-        if resp.status_code == 201:
-            return VolumeFolder.from_json(self.session, self.base_url, resp.json())
+        result = ApiResult.call('new_volume_folder', self.session, 'POST', url, 201, decode=True, json=payload)
+        if result:
+            self._invalidate_listings(self.volume_folder_list_url)
+            result.value = VolumeFolder.from_json(self.session, self.base_url, result.value)
         else:
-            print("Error: Failed to create new volume folder.")
-            return None
+            report("Error: Failed to create new volume folder. (%d) - %s" % (result.status_code,
+                                                                             result.error_message))
+        return result
 
-    def new_volume(self, name: str, size: str, volume_folder_id: str = '') -> Optional[Volume]:
+    def new_volume(self, name: str, size: str, volume_folder_id: str = '') -> ApiResult:
         """
-        Create new Volume in Storage Center and return object representing this new volume. This method returns None
-        in case there is a problem with volume creation.
+        Create new Volume in Storage Center. Value of successful result is object representing this new volume.
         :param name: Name of the new volume
         :param size: Size of the new volume (e.g: '100GB' or '1.5TB')
         :param volume_folder_id: Instance ID of folder in which this volume will be created. Defaults to root folder
-        :return: new Volume object or None in case of failure
+        :return: Result of the operation with new Volume object as its value
         """
         if not volume_folder_id:
             volume_folder = self._find_volume_folder_root()
-            if volume_folder is not None:
-                volume_folder_id = volume_folder.instance_id
-            else:
-                print("Error: Failed to create new volume")
-                return None
-        if volume_folder_id is None:
-            print("Error: Failed to create new volume")
-            return None
+            if volume_folder is None:
+                report("Error: Failed to create new volume")
+                return ApiResult.failure('new_volume', 'Root volume folder not found')
+            volume_folder_id = volume_folder.instance_id
         url = self.base_url + Volume.ENDPOINT
         payload = {"Name": name,
                    "Size": size,
                    "StorageCenter": self.instance_id,
                    "VolumeFolder": volume_folder_id}
-        resp = self.session.post(url, json=payload)
-        if resp.status_code == 201:
-            return Volume.from_json(self.session, self.base_url, resp.json())
+        result = ApiResult.call('new_volume', self.session, 'POST', url, 201, decode=True, json=payload)
+        if result:
+            self._invalidate_listings(self.volume_list_url)
+            result.value = Volume.from_json(self.session, self.base_url, result.value)
         else:
-            print("Error: Failed to create new volume. (%d) - %s" % (resp.status_code, resp.text))
-            return None
+            report("Error: Failed to create new volume. (%d) - %s" % (result.status_code, result.error_message))
+        return result
+
+    def _get_result(self, operation: str, url: str) -> ApiResult:
+        """
+        Internal generic method that performs GET request and returns its result with decoded response body as value
+        :param operation: Name of the operation reported in result
+        :param url: URL of API endpoint
+        :return: Result of the API call
+        """
+        return ApiResult.call(operation, self.session, 'GET', url, 200, decode=True)
+
+    def _query_result(self, url: str, payload_filter: PayloadFilter) -> ApiResult:
+        """
+        Internal generic method that queries list of objects matching supplied filter from DSM query endpoint and
+        returns result with decoded list of objects as value. Filter is always restricted to objects from this Storage
+        Center (supplied filter is not modified).
+        :param url: URL of API query endpoint (e.g.: '/StorageCenter/ScVolume/GetList')
+        :param payload_filter: Filter that returned objects have to match
+        :return: Result of the API call
+        """
+        payload = payload_filter.copy().append('scSerialNumber', self.serial_num).payload
+        # Query does not reference this Storage Center by instance ID, so it is passed to throttle explicitly
+        return ApiResult.call('query_object_list', self.session, 'POST', url, 200, decode=True,
+                              storage_center_id=self.instance_id, json=payload)
 
     def _fetch_object_list(self, url: str) -> Dict[Any, Any]:
         """
@@ -187,13 +634,91 @@ class StorageCenter(StorageObject):
         :param url: URL of API endpoint that returns (json) list of objects
         :return: raw dictionary of objects returned by API endpoint
         """
-        result: Dict[Any, Any] = {}
-        resp = self.session.get(url)
-        if resp.status_code == 200:
-            result = resp.json()
-        else:
-            print("Error: Failed to fetch object list (%d) - %s" % (resp.status_code, resp.text))
-        return result
+        result = self._get_result('fetch_object_list', url)
+        if not result:
+            report("Error: Failed to fetch object list (%d) - %s" % (result.status_code, result.error_message))
+            return {}
+        return result.value
+
+    def _try_fetch_object_list(self, url: str) -> Optional[List[Dict[Any, Any]]]:
+        """
+        Internal generic method to fetch list of objects from supplied URL. Unlike '_fetch_object_list', this method
+        returns None if there is problem with data fetching, so the caller can tell failure from empty list.
+        :param url: URL of API endpoint that returns (json) list of objects
+        :return: raw list of objects returned by API endpoint or None in case of failure
+        """
+        result = self._get_result('fetch_object_list', url)
+        if not result:
+            report("Error: Failed to fetch object list (%d) - %s" % (result.status_code, result.error_message))
+        return result.value
+
+    def _fetch_object(self, url: str) -> Optional[Dict[Any, Any]]:
+        """
+        Internal generic method to fetch single object from supplied URL. This method returns raw dictionary created
+        from json in response body or None if there is problem with data fetching.
+        :param url: URL of API endpoint that returns single object
+        :return: raw dictionary describing the object or None
+        """
+        result = self._get_result('fetch_object', url)
+        if not result:
+            report("Error: Failed to fetch object (%d) - %s" % (result.status_code, result.error_message))
+        return result.value
+
+    def _fetch_filtered_object_list(self, url: str, payload_filter: PayloadFilter,
+                                    report_errors: bool = True) -> Optional[List[Dict[Any, Any]]]:
+        """
+        Internal generic method to fetch list of objects matching supplied filter from DSM query endpoint. This method
+        returns None if there is problem with data fetching, so the caller can tell failed query from query with no
+        results.
+        :param url: URL of API query endpoint (e.g.: '/StorageCenter/ScVolume/GetList')
+        :param payload_filter: Filter that returned objects have to match
+        :param report_errors: Report failed query (Disable if the caller falls back to unfiltered listing)
+        :return: raw list of objects returned by API endpoint or None in case of failure
+        """
+        result = self._query_result(url, payload_filter)
+        if not result and report_errors:
+            report("Error: Failed to query object list (%d) - %s" % (result.status_code, result.error_message))
+        return result.value
+
+    def _iter_object_chunks(self, url: str, attribute_name: str, attribute_values: List[str],
+                            max_workers: int, fallback_url: str) -> Iterator[List[Dict[Any, Any]]]:
+        """
+        Internal generic method that splits object listing into multiple queries, one for every value in
+        attribute_values, runs these queries concurrently and yields raw results in order of completion.
+        Objects from slices whose query failed (or all objects, if there are no attribute values) are fetched from
+        unfiltered listing at 'fallback_url' and yielded as the last slice, so the listing is never silently incomplete.
+        :param url: URL of API query endpoint
+        :param attribute_name: Name of the attribute used to split listing into slices (reference to other object)
+        :param attribute_values: Values of the attribute, one for every slice
+        :param max_workers: Maximum number of queries that are running concurrently
+        :param fallback_url: URL of API endpoint that returns unfiltered listing
+        :raises InventoryError: if some slice failed and unfiltered listing can not be fetched either
+        :return: Iterator of raw object lists
+        """
+        def fetch(value: str) -> Optional[List[Dict[Any, Any]]]:
+            return self._fetch_filtered_object_list(url, PayloadFilter().append(attribute_name, value),
+                                                    report_errors=False)
+
+        failed = set()
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {executor.submit(fetch, value): value for value in attribute_values}
+            for future in as_completed(futures):
+                chunk = future.result()
+                if chunk is None:
+                    failed.add(futures[future])
+                elif chunk:
+                    yield chunk
+        if attribute_values and not failed:
+            return
+        object_list = self._try_fetch_object_list(fallback_url)
+        if object_list is None:
+            raise InventoryError("Failed to fetch %d of %d slices of object listing" % (len(failed),
+                                                                                      len(attribute_values)))
+        if attribute_values:
+            object_list = [object_data for object_data in object_list
+                           if (object_data.get(attribute_name) or {}).get('instanceId') in failed]
+        if object_list:
+            yield object_list
 
 
 class StorageCenterCollection(StorageObjectCollection):
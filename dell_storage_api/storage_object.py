@@ -7,12 +7,14 @@ Base classes:
                            represents such folders
     - StorageObjectCollection: Collection of StorageObject instances
     - StorageObjectFolderCollection: Collection of StorageObjectFolder instances
+    - StorageObjectFolderTree: Precomputed hierarchy of StorageObjectFolder instances
 """
-from collections import Iterable
+from collections.abc import Iterable
 from typing import Any
 from typing import Optional, Iterator, List, Dict
 
-from requests import Session
+from dell_storage_api import profiling
+from dell_storage_api.transport import Transport
 
 
 class StorageObject:
@@ -21,7 +23,7 @@ class StorageObject:
     'Volume' or 'Server'.
     """
 
-    def __init__(self, req_session: Session, base_url: str, name: str, instance_id: str) -> None:
+    def __init__(self, req_session: Transport, base_url: str, name: str, instance_id: str) -> None:
         self.session = req_session
         self.base_url = base_url
         self.name = name
@@ -40,11 +42,11 @@ class StorageObject:
         return self.base_url + endpoint_url % self.instance_id
 
     @classmethod
-    def from_json(cls, req_session: Session, base_url: str, source_dict: Dict[Any, Any]) -> 'StorageObject':
+    def from_json(cls, req_session: Transport, base_url: str, source_dict: Dict[Any, Any]) -> 'StorageObject':
         """
         Class method that creates instance of StorageObject from supplied dictionary. Source dictionary is expected
         to contain at least 'instanceId' and 'name' keys.
-        :param req_session: requests.Session object with stored login cookies. (passed down
+        :param req_session: Transport with stored login cookies. (passed down
         from dell_storage_api.session.DsmSession)
         :param base_url: base URL of DSM
         :param source_dict: Dictionary containing data about storage object
@@ -62,7 +64,7 @@ class StorageObjectFolder(StorageObject):
     'VolumeFolder' or 'ServerFolder'.
     """
 
-    def __init__(self, req_session: Session, base_url: str, name: str,
+    def __init__(self, req_session: Transport, base_url: str, name: str,
                  instance_id: str, parent_id: Optional[str]) -> None:
         super().__init__(req_session, base_url, name, instance_id)
         self.parent_id = parent_id
@@ -76,13 +78,13 @@ class StorageObjectFolder(StorageObject):
         return self.parent_id is None
 
     @classmethod
-    def from_json(cls, req_session: Session, base_url: str, source_dict: Dict[Any, Any]) -> 'StorageObjectFolder':
+    def from_json(cls, req_session: Transport, base_url: str, source_dict: Dict[Any, Any]) -> 'StorageObjectFolder':
         """
         Class method that creates instance of StorageObjectFolder from supplied dictionary. Source dictionary is
         expected to contain at least 'instanceId', 'name' and 'parent' keys. 'parent' key is optional (it can be
         missing in case the folder is root) but if it's present, it should be dictionary containing at least
         'instanceId' key.
-        :param req_session: requests.Session object with stored login cookies. (passed down
+        :param req_session: Transport with stored login cookies. (passed down
         from dell_storage_api.session.DsmSession)
         :param base_url: base URL of DSM
         :param source_dict: Dictionary containing data about storage object folder
@@ -141,9 +143,10 @@ class StorageObjectCollection(Iterable):
         :return: StorageObjectCollection containing all the objects with given name
         """
         result = StorageObjectCollection()
-        for storage_object in self:
-            if storage_object.name == name:
-                result.add(storage_object)
+        with profiling.phase(profiling.PHASE_FILTER):
+            for storage_object in self:
+                if storage_object.name == name:
+                    result.add(storage_object)
         return result
 
     def all_objects(self) -> List[StorageObject]:
@@ -184,7 +187,150 @@ class StorageObjectFolderCollection(StorageObjectCollection):
         :return: Folder collection containing folders with specific parent folder
         """
         result = StorageObjectFolderCollection()
-        for server_folder in self:
-            if server_folder.parent_id == parent_id:
-                result.add(server_folder)
+        with profiling.phase(profiling.PHASE_FILTER):
+            for server_folder in self:
+                if server_folder.parent_id == parent_id:
+                    result.add(server_folder)
         return result
+
+    def tree(self) -> 'StorageObjectFolderTree':
+        """
+        Build precomputed folder hierarchy from folders in this collection
+        :return: Folder hierarchy
+        """
+        return StorageObjectFolderTree(self)
+
+
+class StorageObjectFolderTree:
+    """
+    Precomputed hierarchy of StorageObjectFolder-s. Tree is built once, in linear time, from collection of folders
+    that only know instance ID of their direct parent. Every folder gets its full path (e.g.: '/prod/db/'), depth and
+    position in pre-order (Euler tour) traversal of the tree. Folders from the subtree of any folder occupy continuous
+    interval of this traversal, so the subtree membership can be answered in constant time and whole subtree can be
+    listed without repeated scans of folder collection.
+    Folders whose parent is not present in the collection are treated as roots. Path of the root folder is '/'.
+    """
+    PATH_SEPARATOR = '/'
+
+    def __init__(self, folders: StorageObjectFolderCollection) -> None:
+        self._folders: Dict[str, StorageObjectFolder] = {folder.instance_id: folder for folder in folders}
+        self._children: Dict[str, List[str]] = {folder_id: [] for folder_id in self._folders}
+        self._roots: List[str] = []
+        for folder in self._folders.values():
+            if folder.parent_id in self._children:
+                self._children[folder.parent_id].append(folder.instance_id)
+            else:
+                self._roots.append(folder.instance_id)
+        for children in self._children.values():
+            children.sort(key=lambda child_id: self._folders[child_id].name)
+
+        self._order: List[str] = []
+        self._enter: Dict[str, int] = {}
+        self._exit: Dict[str, int] = {}
+        self._depth: Dict[str, int] = {}
+        self._path: Dict[str, str] = {}
+        self._by_path: Dict[str, str] = {}
+        self._traverse()
+
+    def _traverse(self) -> None:
+        """
+        Internal method that performs iterative depth-first traversal of the folder tree and computes path, depth
+        and Euler tour interval of every folder
+        :return: None
+        """
+        stack = [(root_id, 0, self.PATH_SEPARATOR, False) for root_id in reversed(self._roots)]
+        while stack:
+            folder_id, depth, path, leaving = stack.pop()
+            if leaving:
+                self._exit[folder_id] = len(self._order)
+                continue
+            self._enter[folder_id] = len(self._order)
+            self._order.append(folder_id)
+            self._depth[folder_id] = depth
+            self._path[folder_id] = path
+            self._by_path.setdefault(path, folder_id)
+            stack.append((folder_id, depth, path, True))
+            for child_id in reversed(self._children[folder_id]):
+                child_path = path + self._folders[child_id].name + self.PATH_SEPARATOR
+                stack.append((child_id, depth + 1, child_path, False))
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, folder_id: object) -> bool:
+        return folder_id in self._enter
+
+    def roots(self) -> List[StorageObjectFolder]:
+        """
+        Return root folders of this hierarchy
+        :return: List of root folders
+        """
+        return [self._folders[root_id] for root_id in self._roots]
+
+    def children(self, folder_id: str) -> List[StorageObjectFolder]:
+        """
+        Return direct children of folder with given instance ID, ordered by name
+        :param folder_id: Instance ID of parent folder
+        :return: List of child folders
+        """
+        return [self._folders[child_id] for child_id in self._children.get(folder_id, [])]
+
+    def path(self, folder_id: str) -> Optional[str]:
+        """
+        Return full path of folder with given instance ID (e.g.: '/prod/db/'). Return None if folder is unknown.
+        :param folder_id: Instance ID of a folder
+        :return: Full path of the folder or None
+        """
+        return self._path.get(folder_id, None)
+
+    def depth(self, folder_id: str) -> Optional[int]:
+        """
+        Return depth of folder with given instance ID. Root folders have depth 0. Return None if folder is unknown.
+        :param folder_id: Instance ID of a folder
+        :return: Depth of the folder or None
+        """
+        return self._depth.get(folder_id, None)
+
+    def find_by_path(self, path: str) -> Optional[StorageObjectFolder]:
+        """
+        Find folder by its full path. Leading and trailing separators are optional (e.g.: 'prod/db', '/prod/db/').
+        If multiple folders share the same path, the first one in traversal order is returned.
+        :param path: Full path of the folder
+        :return: Folder with given path or None if no such folder exists
+        """
+        parts = [part for part in path.split(self.PATH_SEPARATOR) if part]
+        normalized = self.PATH_SEPARATOR + ''.join(part + self.PATH_SEPARATOR for part in parts)
+        folder_id = self._by_path.get(normalized, None)
+        return self._folders[folder_id] if folder_id is not None else None
+
+    def is_in_subtree(self, folder_id: str, ancestor_id: str) -> bool:
+        """
+        Is folder with instance ID folder_id located in subtree of folder with instance ID ancestor_id? Every folder is
+        part of its own subtree.
+        :param folder_id: Instance ID of a tested folder
+        :param ancestor_id: Instance ID of a folder whose subtree is tested
+        :return: True if folder_id is in subtree of ancestor_id, otherwise False
+        """
+        if folder_id not in self._enter or ancestor_id not in self._enter:
+            return False
+        return self._enter[ancestor_id] <= self._enter[folder_id] < self._exit[ancestor_id]
+
+    def subtree_ids(self, folder_id: str) -> List[str]:
+        """
+        Return instance IDs of all folders in subtree of given folder (including the folder itself) in pre-order
+        :param folder_id: Instance ID of a subtree root
+        :return: List of folder instance IDs
+        """
+        if folder_id not in self._enter:
+            return []
+        return self._order[self._enter[folder_id]:self._exit[folder_id]]
+
+    def walk(self, folder_id: str = '') -> Iterator[StorageObjectFolder]:
+        """
+        Iterate over folders in pre-order. If folder_id is specified, only folders from its subtree are returned.
+        :param folder_id: Instance ID of a subtree root (Defaults to whole tree)
+        :return: Iterator of folders
+        """
+        folder_ids = self.subtree_ids(folder_id) if folder_id else self._order
+        for subtree_folder_id in folder_ids:
+            yield self._folders[subtree_folder_id]
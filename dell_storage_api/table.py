@@ -0,0 +1,263 @@
+"""
+This module contains lightweight renderer of text tables intended for large listings (thousands of volumes). It
+implements subset of Texttable interface ('header', 'set_cols_dtype', 'set_cols_width', 'add_row', 'add_rows' and
+'draw'), but column widths are computed in single pass over rows, rows are not separated by horizontal lines and cells
+are wrapped only if the output is a terminal. Rows can be also streamed to the output as they are produced, in which
+case column widths are estimated from a sample of first rows (or fixed by 'set_cols_width').
+Module contains also TextTable, Texttable with the same public 'header_names', 'rows' and 'max_width' attributes as
+FastTable, so that both kinds of tables can be printed in other formats (e.g.: json).
+"""
+import itertools
+import sys
+from typing import Any, Iterable, Iterator, List, Optional, TextIO
+
+from texttable import Texttable
+
+
+class TextTable(Texttable):
+    """
+    Texttable that exposes its header, rows (with cells formatted according to column data types) and maximum width
+    """
+
+    def __init__(self, max_width: int = 80) -> None:
+        self.max_width = max_width
+        self.header_names: List[str] = []
+        self.rows: List[List[str]] = []
+        super().__init__(max_width=max_width)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def set_max_width(self, max_width: int) -> 'TextTable':
+        """
+        Set maximum width of the table
+        :param max_width: Maximum width of the table (0 means unlimited)
+        :return: This table
+        """
+        super().set_max_width(max_width)
+        self.max_width = max_width
+        return self
+
+    def reset(self) -> 'TextTable':
+        """
+        Remove header and all rows from the table
+        :return: This table
+        """
+        super().reset()
+        self.header_names = []
+        self.rows = []
+        return self
+
+    def header(self, array: List[Any]) -> 'TextTable':
+        """
+        Set header of the table
+        :param array: Column names
+        :return: This table
+        """
+        super().header(array)
+        self.header_names = list(self._header)
+        return self
+
+    def add_row(self, array: Iterable[Any]) -> 'TextTable':
+        """
+        Append row to the table
+        :param array: Cells of the row
+        :return: This table
+        """
+        super().add_row(array)
+        self.rows.append(self._rows[-1])
+        return self
+
+
+class FastTable:
+    """
+    Text table renderer with Texttable-compatible subset of interface. If 'wrap' is None, cells are wrapped (so the
+    table fits into 'max_width' characters) only if the output is a terminal. Otherwise, columns are as wide as their
+    widest cell.
+    """
+    SAMPLE_SIZE = 1000
+    MIN_COLUMN_WIDTH = 3
+
+    def __init__(self, max_width: int = 120, wrap: Optional[bool] = None, sample_size: int = SAMPLE_SIZE) -> None:
+        self.max_width = max_width
+        self.wrap = wrap
+        self.sample_size = sample_size
+        self.header_names: List[str] = []
+        self.rows: List[List[str]] = []
+        self._widths: Optional[List[int]] = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def header(self, names: List[Any]) -> None:
+        """
+        Set header of the table
+        :param names: Column names
+        :return: None
+        """
+        self.header_names = [str(name) for name in names]
+
+    def set_cols_dtype(self, dtypes: List[str]) -> None:  # pylint: disable=W0613
+        """
+        Accepted for compatibility with Texttable. All cells are rendered as text.
+        :param dtypes: Texttable data types of columns
+        :return: None
+        """
+
+    def set_cols_width(self, widths: List[int]) -> None:
+        """
+        Fix widths of columns (fixed-width mode), so that rows are rendered without measuring them
+        :param widths: Widths of columns
+        :return: None
+        """
+        self._widths = list(widths)
+
+    def add_row(self, row: Iterable[Any]) -> None:
+        """
+        Append row to the table
+        :param row: Cells of the row
+        :return: None
+        """
+        self.rows.append([str(cell) for cell in row])
+
+    def add_rows(self, rows: Iterable[Iterable[Any]], header: bool = True) -> None:
+        """
+        Append multiple rows to the table. Same as in Texttable, first row is used as header unless header is False.
+        :param rows: Rows of the table
+        :param header: Use first row as header
+        :return: None
+        """
+        iterator = iter(rows)
+        if header:
+            self.header(list(next(iterator, [])))
+        for row in iterator:
+            self.add_row(row)
+
+    def _measure(self, rows: List[List[str]]) -> List[int]:
+        """
+        Internal method that computes widths of columns from header and rows in single pass
+        :param rows: Rows (with cells converted to str) used for measurement
+        :return: Widths of columns
+        """
+        if self._widths is not None:
+            return list(self._widths)
+        widths = [len(name) for name in self.header_names]
+        for column, cells in enumerate(zip(*rows)):
+            width = max(map(len, cells))
+            if column >= len(widths):
+                widths.append(width)
+            elif width > widths[column]:
+                widths[column] = width
+        return widths
+
+    def _fit(self, widths: List[int]) -> List[int]:
+        """
+        Internal method that shrinks the widest columns until the table fits into 'max_width'
+        :param widths: Natural widths of columns
+        :return: Shrunk widths of columns
+        """
+        # Every column is surrounded by '| ' and ' ', the table is closed by '|'
+        available = self.max_width - 3 * len(widths) - 1
+        widths = list(widths)
+        while sum(widths) > available:
+            widest = max(range(len(widths)), key=widths.__getitem__)
+            if widths[widest] <= self.MIN_COLUMN_WIDTH:
+                break
+            widths[widest] -= 1
+        return widths
+
+    @staticmethod
+    def _border(widths: List[int], fill: str) -> str:
+        """
+        Internal method that creates horizontal border line
+        :param widths: Widths of columns
+        :param fill: Character used to draw the line
+        :return: Border line
+        """
+        return '+' + '+'.join(fill * (width + 2) for width in widths) + '+'
+
+    @staticmethod
+    def _lines(row: List[str], widths: List[int], row_format: str, wrap: bool) -> Iterator[str]:
+        """
+        Internal method that renders single row. Cells wider than their column are split to multiple lines if wrap
+        is True, otherwise they overflow their column.
+        :param row: Cells of the row
+        :param widths: Widths of columns
+        :param row_format: Format string of a line with all cells padded to widths of columns
+        :param wrap: Wrap cells wider than their column
+        :return: Iterator of lines
+        """
+        if len(row) != len(widths):
+            row = (row + [''] * len(widths))[:len(widths)]
+        if not wrap or all(len(cell) <= width for cell, width in zip(row, widths)):
+            yield row_format % tuple(row)
+            return
+        chunks = [[cell[start:start + width] for start in range(0, len(cell), width)] or ['']
+                  for cell, width in zip(row, widths)]
+        for line in range(max(len(cell_chunks) for cell_chunks in chunks)):
+            yield row_format % tuple(cell_chunks[line] if line < len(cell_chunks) else '' for cell_chunks in chunks)
+
+    def _render(self, rows: Iterable[List[str]], widths: List[int], wrap: bool) -> Iterator[str]:
+        """
+        Internal method that renders whole table line by line
+        :param rows: Rows (with cells converted to str)
+        :param widths: Widths of columns
+        :param wrap: Wrap cells wider than their column
+        :return: Iterator of lines
+        """
+        if wrap:
+            widths = self._fit(widths)
+        row_format = '| ' + ' | '.join('%%-%ds' % width for width in widths) + ' |'
+        border = self._border(widths, '-')
+        yield border
+        if self.header_names:
+            yield from self._lines(self.header_names, widths, row_format, wrap)
+            yield self._border(widths, '=')
+        for row in rows:
+            yield from self._lines(row, widths, row_format, wrap)
+        yield border
+
+    def _wrap_output(self, out: TextIO) -> bool:
+        """
+        Internal method that decides whether cells should be wrapped when writing to 'out'
+        :param out: Output stream
+        :return: True if cells should be wrapped
+        """
+        if self.wrap is not None:
+            return self.wrap
+        isatty = getattr(out, 'isatty', None)
+        return bool(isatty and isatty())
+
+    def draw(self, out: Optional[TextIO] = None) -> str:
+        """
+        Render table with all rows added so far. Column widths are measured over all rows.
+        :param out: Output stream the table is rendered for (Defaults to sys.stdout), used to decide about wrapping
+        :return: Rendered table
+        """
+        wrap = self._wrap_output(out or sys.stdout)
+        return '\n'.join(self._render(self.rows, self._measure(self.rows), wrap))
+
+    def stream(self, rows: Iterable[Iterable[Any]], out: Optional[TextIO] = None) -> int:
+        """
+        Write rows to output as they are produced. Column widths are estimated from first 'sample_size' rows
+        (unless fixed by 'set_cols_width'), which are buffered before the table is started. Rows added by 'add_row'
+        are written before streamed rows.
+        :param rows: Rows of the table (e.g.: generator producing rows while data are being fetched)
+        :param out: Output stream (Defaults to sys.stdout)
+        :return: Number of written rows
+        """
+        out = out or sys.stdout
+        iterator = ([str(cell) for cell in row] for row in rows)
+        sample = list(self.rows)
+        if self._widths is None:
+            for row in iterator:
+                sample.append(row)
+                if len(sample) >= self.sample_size:
+                    break
+        counter = itertools.count()
+        counted = (row for row, _ in zip(itertools.chain(sample, iterator), counter))
+        write = out.write
+        for line in self._render(counted, self._measure(sample), self._wrap_output(out)):
+            write(line + '\n')
+        out.flush()
+        return next(counter)
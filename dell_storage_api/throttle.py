@@ -0,0 +1,298 @@
+"""
+This module contains client side rate limiting and adaptive concurrency control for requests to Dell Storage Manager
+(DSM). Every combination of DSM host and Storage Center has its own throttle that limits request rate (token bucket)
+and number of requests in flight (adaptive concurrency limit). Concurrency limit shrinks when DSM responds slowly or
+with server errors and grows back when DSM recovers. Latencies of all requests are recorded per endpoint, so that
+duration of planned changes can be estimated before they are executed.
+"""
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter. Bucket holds up to 'burst' tokens and is refilled by 'rate' tokens per second.
+    Every request consumes one token. Rate of 0 disables the rate limit.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Take one token from the bucket, wait until the token is available if the bucket is empty
+        :return: None
+        """
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Concurrency limiter with additive increase / multiplicative decrease (AIMD) of the limit. Limit is decreased when
+    request fails with server error (5xx or 429) or when its latency exceeds 'latency_tolerance' times the long-term
+    average latency of the same endpoint. Limit is increased by one after 'limit' consecutive successful requests.
+    """
+    DECREASE_FACTOR = 0.75
+    LATENCY_SMOOTHING = 0.1
+
+    def __init__(self, initial: int, minimum: int, maximum: int, latency_tolerance: float = 2.0) -> None:
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.latency_tolerance = latency_tolerance
+        self._limit = float(min(self.maximum, max(self.minimum, initial)))
+        self._in_flight = 0
+        self._successes = 0
+        self._average_latency: Dict[str, float] = {}
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """
+        Return current concurrency limit
+        :return: Maximum number of requests in flight
+        """
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Return number of requests currently in flight
+        :return: Number of requests in flight
+        """
+        return self._in_flight
+
+    def acquire(self) -> None:
+        """
+        Wait until number of requests in flight drops below current limit and register new request
+        :return: None
+        """
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, latency: float, overloaded: bool, endpoint: str = '') -> None:
+        """
+        Unregister finished request and adjust concurrency limit based on its outcome
+        :param latency: Duration of the request in seconds
+        :param overloaded: Did DSM signal overload (server error or throttling response)?
+        :param endpoint: Key of requested endpoint (see EndpointLatencies.endpoint_key)
+        :return: None
+        """
+        with self._condition:
+            self._in_flight -= 1
+            average = self._average_latency.get(endpoint, None)
+            slow = average is not None and latency > average * self.latency_tolerance
+            if overloaded or slow:
+                self._limit = max(float(self.minimum), self._limit * self.DECREASE_FACTOR)
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self._successes >= self.limit:
+                    self._limit = min(float(self.maximum), self._limit + 1)
+                    self._successes = 0
+            if not overloaded:
+                self._average_latency[endpoint] = latency if average is None else \
+                    average + self.LATENCY_SMOOTHING * (latency - average)
+            self._condition.notify_all()
+
+
+class Throttle:
+    """
+    Combination of token bucket rate limiter and adaptive concurrency limiter that guards requests to single
+    Storage Center
+    """
+
+    def __init__(self, rate: float, burst: int, initial_concurrency: int, min_concurrency: int,
+                 max_concurrency: int) -> None:
+        self.bucket = TokenBucket(rate, burst)
+        self.limiter = AdaptiveConcurrencyLimiter(initial_concurrency, min_concurrency, max_concurrency)
+
+    def acquire(self) -> None:
+        """
+        Wait until new request to the Storage Center is allowed by both rate and concurrency limits
+        :return: None
+        """
+        self.bucket.acquire()
+        self.limiter.acquire()
+
+    def release(self, latency: float, overloaded: bool, endpoint: str = '') -> None:
+        """
+        Report finished request to the Storage Center
+        :param latency: Duration of the request in seconds
+        :param overloaded: Did DSM signal overload (server error or throttling response)?
+        :param endpoint: Key of requested endpoint (see EndpointLatencies.endpoint_key)
+        :return: None
+        """
+        self.limiter.release(latency, overloaded, endpoint)
+
+
+class EndpointLatencies:
+    """
+    Moving average of request latency for every combination of HTTP method and DSM endpoint. Instance IDs in request
+    URLs are replaced by '%s', so that latencies of requests to the same endpoint with different objects are recorded
+    together and keys match endpoint constants of storage object classes
+    (e.g.: 'POST /StorageCenter/ScVolume/%s/Unmap'). Recorded latencies can be saved to file and loaded by later runs.
+    """
+    SMOOTHING = 0.2
+    API_PREFIX = '/api/rest'
+    INSTANCE_ID_PATTERN = re.compile(r'^\d+(\.\d+)*$')
+
+    def __init__(self) -> None:
+        self._latencies: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._latencies)
+
+    @classmethod
+    def endpoint_key(cls, method: str, url: str) -> str:
+        """
+        Return key under which latency of request is recorded
+        :param method: HTTP method of the request
+        :param url: Complete URL of the request or endpoint template (e.g.: '/StorageCenter/ScVolume/%s/Unmap')
+        :return: Key of the endpoint (e.g.: 'POST /StorageCenter/ScVolume/%s/Unmap')
+        """
+        path = urlsplit(url).path
+        if cls.API_PREFIX in path:
+            path = path.split(cls.API_PREFIX, 1)[1]
+        segments = ['%s' if cls.INSTANCE_ID_PATTERN.match(segment) else segment for segment in path.split('/')]
+        return '%s %s' % (method.upper(), '/'.join(segments))
+
+    def record(self, method: str, url: str, latency: float) -> None:
+        """
+        Record latency of finished request
+        :param method: HTTP method of the request
+        :param url: Complete URL of the request
+        :param latency: Duration of the request in seconds
+        :return: None
+        """
+        key = self.endpoint_key(method, url)
+        with self._lock:
+            count, average = self._latencies.get(key, (0, latency))
+            self._latencies[key] = (count + 1, average + self.SMOOTHING * (latency - average))
+
+    def latency(self, method: str, endpoint: str, default: Optional[float] = None) -> Optional[float]:
+        """
+        Return average latency of requests to the endpoint
+        :param method: HTTP method of the request
+        :param endpoint: Endpoint template (e.g.: Volume.UNMAPPING_ENDPOINT) or complete URL
+        :param default: Value returned if no latency was recorded for this endpoint
+        :return: Average latency in seconds or default
+        """
+        with self._lock:
+            record = self._latencies.get(self.endpoint_key(method, endpoint), None)
+        return record[1] if record is not None else default
+
+    def to_dict(self) -> Dict[str, List[float]]:
+        """
+        Return recorded latencies in form that can be serialized to json
+        :return: Lists [count, average latency] indexed by endpoint key
+        """
+        with self._lock:
+            return {key: [count, average] for key, (count, average) in self._latencies.items()}
+
+    def load(self, path: str) -> None:
+        """
+        Merge latencies saved in file into this object. Missing or corrupted file is ignored.
+        :param path: Path to file with saved latencies
+        :return: None
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as latency_file:
+                content = json.load(latency_file)
+            with self._lock:
+                for key, (count, average) in content.items():
+                    self._latencies.setdefault(key, (int(count), float(average)))
+        except (OSError, ValueError, TypeError, AttributeError):
+            pass
+
+    def save(self, path: str) -> None:
+        """
+        Atomically replace file with recorded latencies
+        :param path: Path to file with saved latencies
+        :return: None
+        """
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as latency_file:
+                json.dump(self.to_dict(), latency_file)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            print("WARNING: Failed to save endpoint latencies to '%s' - %s" % (path, exc))
+
+
+class ThrottleRegistry:
+    """
+    Registry of throttles indexed by DSM host and Storage Center instance ID. Requests that can not be attributed to
+    any Storage Center (e.g.: login) share throttle with empty Storage Center ID. Registry returned by 'default' is
+    shared by all sessions in the process, so that multiple sessions to the same DSM respect common limits. Registry
+    also holds latencies of all requests that passed through its throttles.
+    """
+    DEFAULT_RATE = 50.0
+    DEFAULT_BURST = 50
+    DEFAULT_INITIAL_CONCURRENCY = 4
+    DEFAULT_MIN_CONCURRENCY = 1
+    DEFAULT_MAX_CONCURRENCY = 16
+
+    _default: Optional['ThrottleRegistry'] = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST,
+                 initial_concurrency: int = DEFAULT_INITIAL_CONCURRENCY,
+                 min_concurrency: int = DEFAULT_MIN_CONCURRENCY,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latencies = EndpointLatencies()
+        self._throttles: Dict[Tuple[str, str], Throttle] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> 'ThrottleRegistry':
+        """
+        Return process-wide registry with default limits
+        :return: Shared ThrottleRegistry
+        """
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = ThrottleRegistry()
+            return cls._default
+
+    def get(self, host: str, storage_center_id: str) -> Throttle:
+        """
+        Return throttle for given DSM host and Storage Center, create it if it does not exist yet
+        :param host: DSM host (including port)
+        :param storage_center_id: Instance ID of a Storage Center
+        :return: Throttle guarding requests to this Storage Center
+        """
+        key = (host, storage_center_id)
+        with self._lock:
+            if key not in self._throttles:
+                self._throttles[key] = Throttle(self.rate, self.burst, self.initial_concurrency,
+                                                self.min_concurrency, self.max_concurrency)
+            return self._throttles[key]
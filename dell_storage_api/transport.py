@@ -0,0 +1,311 @@
+"""
+This module contains HTTP transports used for communication with Dell Storage Manager (DSM). All storage objects send
+requests through transport passed down from DsmSession ('get', 'post', 'put' and 'delete' methods with
+requests-compatible arguments and responses). Every transport passes requests through throttle of targeted Storage
+Center and records their latencies. Available transports are:
+    * RequestsTransport - Default transport based on requests library with pool of HTTP/1.1 connections
+    * Http2Transport - Transport based on optional httpx library that multiplexes concurrent requests over single
+                       HTTP/2 connection (falls back to HTTP/1.1 if 'h2' package is not installed)
+    * MemoryTransport - Transport that does not perform any network communication and answers requests by registered
+                        routes. Useful for tests and offline development.
+"""
+import json
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, MutableMapping, Optional, Pattern, Tuple, Type, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from requests.structures import CaseInsensitiveDict
+
+from dell_storage_api import profiling
+from dell_storage_api.throttle import EndpointLatencies, ThrottleRegistry
+
+
+class TransportError(Exception):
+    """
+    Exception raised when HTTP request does not get any response from DSM (e.g.: connection error or timeout). Errors
+    of specific HTTP libraries are translated to this exception by transports.
+    """
+
+
+class Transport:
+    """
+    Base class of HTTP transports. Subclasses implement method 'send' that performs single HTTP request and returns
+    response object providing at least 'status_code', 'content', 'text' and 'json()'. Returned responses carry also
+    'latency' of the request in seconds. Errors listed in 'transient_errors' (raised by underlying HTTP library when
+    request does not get any response) are translated to TransportError. Request is passed through
+    throttle of Storage Center targeted by the request. Storage Center is identified from instance IDs in request URL
+    (Instance IDs of objects in DSM are prefixed by instance ID of their Storage Center, e.g.: '64702.15') or from
+    'StorageCenter' attribute of json payload. Requests that carry Storage Center only in filter (e.g.: queries to
+    '/GetList' endpoints) have to pass the Storage Center explicitly.
+    """
+    NAME = ''
+    INSTANCE_ID_PATTERN = re.compile(r'^(\d+)(\.\d+)*$')
+
+    def __init__(self, registry: Optional[ThrottleRegistry] = None) -> None:
+        self.registry = registry or ThrottleRegistry.default()
+        self.headers: MutableMapping[str, str] = CaseInsensitiveDict()
+        self.verify = True
+        self.transient_errors: Tuple[Type[BaseException], ...] = ()
+
+    @classmethod
+    def storage_center_id(cls, url: str, payload: Any = None) -> str:
+        """
+        Find instance ID of a Storage Center targeted by request
+        :param url: URL of the request
+        :param payload: json payload of the request
+        :return: Instance ID of a Storage Center or empty string if it can not be determined
+        """
+        for segment in urlsplit(url).path.split('/'):
+            match = cls.INSTANCE_ID_PATTERN.match(segment)
+            if match:
+                return match.group(1)
+        if isinstance(payload, dict) and payload.get('StorageCenter'):
+            return str(payload['StorageCenter'])
+        return ''
+
+    def send(self, method: str, url: str, **kwargs: Any) -> Any:
+        """
+        Perform single HTTP request without throttling. Must be implemented by subclasses.
+        :param method: HTTP method
+        :param url: Complete URL of the request
+        :param kwargs: requests-compatible keyword arguments (e.g.: 'json', 'auth', 'params')
+        :return: Response object
+        """
+        raise NotImplementedError
+
+    def request(self, method: str, url: str, storage_center_id: str = '', **kwargs: Any) -> Any:
+        """
+        Perform HTTP request guarded by throttle of targeted Storage Center and record its latency
+        :param method: HTTP method
+        :param url: Complete URL of the request
+        :param storage_center_id: Instance ID of targeted Storage Center (Identified from the request if empty)
+        :param kwargs: requests-compatible keyword arguments (e.g.: 'json', 'auth', 'params')
+        :raises TransportError: if the request does not get any response
+        :return: Response object
+        """
+        throttle = self.registry.get(urlsplit(url).netloc,
+                                     storage_center_id or self.storage_center_id(url, kwargs.get('json')))
+        with profiling.phase(profiling.PHASE_FETCH):
+            throttle.acquire()
+            started = time.monotonic()
+            overloaded = True
+            try:
+                resp = self.send(method, url, **kwargs)
+                overloaded = resp.status_code >= 500 or resp.status_code == 429
+            except self.transient_errors as exc:
+                raise TransportError("%s %s - %s" % (method, url, exc)) from exc
+            finally:
+                latency = time.monotonic() - started
+                throttle.release(latency, overloaded, EndpointLatencies.endpoint_key(method, url))
+        self.registry.latencies.record(method, url, latency)
+        # Latency is exposed on response, so it can be reported in results of API calls (see dell_storage_api.result)
+        resp.latency = latency
+        return resp
+
+    def get(self, url: str, **kwargs: Any) -> Any:
+        """
+        Perform HTTP GET request
+        :param url: Complete URL of the request
+        :param kwargs: requests-compatible keyword arguments
+        :return: Response object
+        """
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> Any:
+        """
+        Perform HTTP POST request
+        :param url: Complete URL of the request
+        :param kwargs: requests-compatible keyword arguments
+        :return: Response object
+        """
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs: Any) -> Any:
+        """
+        Perform HTTP PUT request
+        :param url: Complete URL of the request
+        :param kwargs: requests-compatible keyword arguments
+        :return: Response object
+        """
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url: str, **kwargs: Any) -> Any:
+        """
+        Perform HTTP DELETE request
+        :param url: Complete URL of the request
+        :param kwargs: requests-compatible keyword arguments
+        :return: Response object
+        """
+        return self.request('DELETE', url, **kwargs)
+
+    def close(self) -> None:
+        """
+        Release network resources held by this transport
+        :return: None
+        """
+
+
+class RequestsTransport(Transport):
+    """
+    Transport based on requests.Session. Connection pool is sized by maximum concurrency of throttle registry, so that
+    concurrent requests do not wait for free connection.
+    """
+    NAME = 'requests'
+
+    def __init__(self, registry: Optional[ThrottleRegistry] = None) -> None:
+        super().__init__(registry)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=self.registry.max_concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.headers = self.session.headers
+        self.transient_errors = (requests.ConnectionError, requests.Timeout)
+
+    def send(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        kwargs.setdefault('verify', self.verify)
+        return self.session.request(method, url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class Http2Transport(Transport):
+    """
+    Transport based on httpx.Client. If 'h2' package is installed, all concurrent requests to DSM are multiplexed
+    over single HTTP/2 connection, otherwise pool of HTTP/1.1 connections is used. httpx is optional dependency and
+    ImportError is raised if it's not installed. Client is created lazily on first request, so that 'verify' and
+    'headers' can be configured after transport construction.
+    """
+    NAME = 'http2'
+
+    def __init__(self, registry: Optional[ThrottleRegistry] = None) -> None:
+        super().__init__(registry)
+        try:
+            import httpx  # type: ignore  # pylint: disable=C0415
+        except ImportError as exc:
+            raise ImportError("Transport '%s' requires 'httpx' package (pip install httpx[http2])" % self.NAME) \
+                from exc
+        try:
+            import h2  # type: ignore  # pylint: disable=C0415,W0611
+            self.http2 = True
+        except ImportError:
+            self.http2 = False
+        self._httpx = httpx
+        self.transient_errors = (httpx.TransportError,)
+        self._client: Any = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> Any:
+        """
+        Return httpx.Client used by this transport, create it if it does not exist yet
+        :return: httpx.Client
+        """
+        with self._lock:
+            if self._client is None:
+                limits = self._httpx.Limits(max_connections=self.registry.max_concurrency)
+                self._client = self._httpx.Client(http2=self.http2, verify=self.verify, limits=limits)
+            return self._client
+
+    def send(self, method: str, url: str, **kwargs: Any) -> Any:
+        auth = kwargs.pop('auth', None)
+        if isinstance(auth, HTTPBasicAuth):
+            auth = (auth.username, auth.password)
+        if auth is not None:
+            kwargs['auth'] = auth
+        kwargs.pop('verify', None)
+        return self.client.request(method, url, headers=dict(self.headers), **kwargs)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+class MemoryResponse:
+    """
+    Minimal requests-compatible response returned by MemoryTransport
+    """
+
+    def __init__(self, status_code: int, body: Any = None) -> None:
+        self.status_code = status_code
+        self.content = body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else b''
+        self.text = self.content.decode()
+        self.headers: Dict[str, str] = {'Content-Type': 'application/json'}
+
+    def json(self) -> Any:
+        """
+        Decode json body of the response
+        :return: Decoded body
+        """
+        return json.loads(self.text)
+
+
+Handler = Callable[[str, str, Dict[str, Any]], MemoryResponse]
+
+
+class MemoryTransport(Transport):
+    """
+    Transport that answers requests by registered routes without any network communication. Route is matched by HTTP
+    method and regular expression searched in URL path. Routes registered later take precedence. Requests without
+    matching route are answered with status 404. All requests are recorded in 'calls' as tuples
+    (method, url, json payload).
+    """
+    NAME = 'memory'
+
+    def __init__(self, registry: Optional[ThrottleRegistry] = None) -> None:
+        super().__init__(registry or ThrottleRegistry(rate=0, max_concurrency=64))
+        self.calls: List[Tuple[str, str, Any]] = []
+        self._routes: List[Tuple[str, Pattern, Handler]] = []
+        self._lock = threading.Lock()
+
+    def add_route(self, method: str, path_pattern: str, response: Union[Handler, int],
+                  body: Any = None) -> 'MemoryTransport':
+        """
+        Register route. Response is either status code (answered with 'body' as json) or callable that receives
+        method, url and keyword arguments of the request and returns MemoryResponse.
+        :param method: HTTP method
+        :param path_pattern: Regular expression searched in URL path (e.g.: r'/StorageCenter/ScVolume/[0-9.]+$')
+        :param response: Status code or callable producing response
+        :param body: Body of the response, if response is status code
+        :return: This transport (to allow chaining)
+        """
+        def static_response(method: str, url: str, kwargs: Dict[str, Any]) -> MemoryResponse:  # pylint: disable=W0613
+            return MemoryResponse(int(response), body)  # type: ignore
+
+        handler = response if callable(response) else static_response
+        with self._lock:
+            self._routes.insert(0, (method.upper(), re.compile(path_pattern), handler))
+        return self
+
+    def send(self, method: str, url: str, **kwargs: Any) -> MemoryResponse:
+        path = urlsplit(url).path
+        with self._lock:
+            self.calls.append((method.upper(), url, kwargs.get('json')))
+            routes = list(self._routes)
+        for route_method, pattern, handler in routes:
+            if route_method == method.upper() and pattern.search(path):
+                return handler(method, url, kwargs)
+        return MemoryResponse(404, {'result': 'No route for %s %s' % (method.upper(), path)})
+
+
+TRANSPORTS = {transport.NAME: transport for transport in [RequestsTransport, Http2Transport, MemoryTransport]}
+DEFAULT_TRANSPORT = RequestsTransport.NAME
+
+
+def create_transport(name: str = DEFAULT_TRANSPORT, registry: Optional[ThrottleRegistry] = None) -> Transport:
+    """
+    Create transport by its name
+    :param name: Name of the transport (One of TRANSPORTS keys)
+    :param registry: Throttle registry used by the transport (Defaults to process-wide registry)
+    :return: New transport
+    """
+    if name not in TRANSPORTS:
+        raise ValueError("Unknown transport '%s'. Available transports: %s" % (name, ', '.join(sorted(TRANSPORTS))))
+    return TRANSPORTS[name](registry)
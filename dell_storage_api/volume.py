@@ -1,9 +1,11 @@
 """ This module contains classes for management of volumes in Storage Center managed by Dell Storage Manager"""
 from typing import Dict, Any
 
-from requests import Session
-
-from dell_storage_api.storage_object import StorageObject, StorageObjectCollection, StorageObjectFolder
+from dell_storage_api import profiling
+from dell_storage_api.result import ApiResult, report
+from dell_storage_api.storage_object import StorageObject, StorageObjectCollection, StorageObjectFolder, \
+    StorageObjectFolderTree
+from dell_storage_api.transport import Transport
 
 
 class Volume(StorageObject):
@@ -18,21 +20,24 @@ class Volume(StorageObject):
     RECYCLE_ENDPOINT = '/StorageCenter/ScVolume/%s/Recycle'
     EXPAND_TO_SIZE_ENDPOINT = '/StorageCenter/ScVolume/%s/ExpandToSize'
     EXPAND_ENDPOINT = '/StorageCenter/ScVolume/%s/Expand'
+    STORAGE_USAGE_ENDPOINT = '/StorageCenter/ScVolume/%s/StorageUsage'
 
-    def __init__(self, req_session: Session, base_url: str, name: str, instance_id: str,
-              parent_folder_id: str, wwid: str, status: str) -> None:
+    def __init__(self, req_session: Transport, base_url: str, name: str, instance_id: str,
+              parent_folder_id: str, wwid: str, status: str, configured_size: str = '') -> None:
         super().__init__(req_session, base_url, name, instance_id)
         self.parent_folder_id = parent_folder_id
         self.wwid = wwid
         self.status = status
+        self.configured_size = configured_size
 
     @classmethod
-    def from_json(cls, req_session: Session, base_url: str, source_dict: Dict[Any, Any]) -> 'Volume':
+    def from_json(cls, req_session: Transport, base_url: str, source_dict: Dict[Any, Any]) -> 'Volume':
         """
         Class method that creates instance of Volume class from supplied dictionary. Source dictionary is expected
         to contain at least 'instanceId', 'name', 'deviceId' and 'volumeFolder' keys. Value of 'volumeFolder' is
-        expected to be of type dict, containing at least key 'instanceId'
-        :param req_session: requests.Session object with stored login cookies. (passed down
+        expected to be of type dict, containing at least key 'instanceId'. Optional key 'configuredSize' contains
+        size of the volume (e.g.: '536870912000 Bytes')
+        :param req_session: Transport with stored login cookies. (passed down
         from dell_storage_api.session.DsmSession)
         :param base_url: base URL of DSM
         :param source_dict: Dictionary containing data about Volume object
@@ -44,7 +49,8 @@ class Volume(StorageObject):
                       instance_id=source_dict['instanceId'],
                       parent_folder_id=source_dict['volumeFolder']['instanceId'],
                       wwid=source_dict['deviceId'],
-                      status=source_dict['status']
+                      status=source_dict['status'],
+                      configured_size=source_dict.get('configuredSize', '')
                       )
 
     @property
@@ -120,158 +126,148 @@ class Volume(StorageObject):
         """
         return self.build_url(self.VOLUME_ENDPOINT)
 
-    def map_to_server(self, server_id: str) -> bool:
+    @property
+    def storage_usage_url(self) -> str:
+        """
+        Return complete URL for getting storage usage of this volume
+        :return: URL for storage usage of this volume
+        """
+        return self.build_url(self.STORAGE_USAGE_ENDPOINT)
+
+    def map_to_server(self, server_id: str) -> ApiResult:
         """
         Perform API call to DSM that maps this volume to server with instance ID specified by parameter 'server_id'. If
         supplied server_id is instance ID of a cluster, this volume will be mapped to every server that is part of that
         cluster.
         This operation fails if volume is already mapped to some server.
         :param server_id: Instance ID of server to which this volume will be mapped
-        :return: True if operation is successful, otherwise False
+        :return: Result of the operation (evaluates to True if operation is successful)
         """
-        success = False
         payload = {'Server': server_id}
-        resp = self.session.post(self.mapping_url, json=payload)
-        if resp.status_code == 200:
-            success = True
-            print("OK - Volume '%s' (%s) sucessfully mapped to server." % (self.name, self.instance_id))
+        result = ApiResult.call('map_to_server', self.session, 'POST', self.mapping_url, 200, json=payload)
+        if result:
+            report("OK - Volume '%s' (%s) sucessfully mapped to server." % (self.name, self.instance_id))
         else:
-            print("Error: Failed to map volume - %s" % resp.json().get('result'))
-        return success
+            report("Error: Failed to map volume - %s" % result.error_message)
+        return result
 
-    def unmap(self) -> bool:
+    def unmap(self) -> ApiResult:
         """
         Perform API call to DSM that unmaps this volume from any servers it is currently mapped to.
         WARNING: unmapping volume from active servers will cause those servers to loose connectivity with this volume.
-        :return: True if operation is successful, otherwise False
+        :return: Result of the operation (evaluates to True if operation is successful)
         """
-        success = False
-        resp = self.session.post(self.unmapping_url)
-        if resp.status_code == 204:
-            success = True
-            print('OK - Volume successfully unmapped')
+        result = ApiResult.call('unmap', self.session, 'POST', self.unmapping_url, 204)
+        if result:
+            report('OK - Volume successfully unmapped')
         else:
-            print('Error: Failed to unamp volume - %s' % resp.text)
-        return success
+            report('Error: Failed to unamp volume - %s' % result.error_message)
+        return result
 
     def mapping(self) -> object:
         """
         """
-        success = False
-        resp = self.session.get(self.mapping_profile_url)
-        if resp.status_code == 200:
-            success = True
-            mapping_profiles = resp.json()
-            if mapping_profiles:
-                return mapping_profiles[0]['server']
-        else:
-            print("Error: Failed to get volume mapping list")
+        result = ApiResult.call('mapping', self.session, 'GET', self.mapping_profile_url, 200, decode=True)
+        if not result:
+            report("Error: Failed to get volume mapping list")
+        elif result.value:
+            return result.value[0]['server']
         return None
 
-    def expand(self, size: str) -> bool:
+    def expand(self, size: str) -> ApiResult:
         """
         Perform API call to DSM that expands this volume by specified amount.
         :param size: Size by which this volume will be expanded (e.g.: 10GB or 1.2TB)
-        :return: True if operation is successful, otherwise False
+        :return: Result of the operation (evaluates to True if operation is successful)
         """
-        success = False
         payload = {"ExpandAmount": size}
-        resp = self.session.post(self.expand_url, json=payload)
-        if resp.status_code == 200:
-            success = True
-            print("OK - Volume expanded by %s" % size)
+        result = ApiResult.call('expand', self.session, 'POST', self.expand_url, 200, json=payload)
+        if result:
+            report("OK - Volume expanded by %s" % size)
         else:
-            print("Error: Failed to expand volume - %s" % resp.json().get('result'))
-        return success
+            report("Error: Failed to expand volume - %s" % result.error_message)
+        return result
 
-    def expand_to_size(self, size: str) -> bool:
+    def expand_to_size(self, size: str) -> ApiResult:
         """
         Perform API call to DSM that expands this volume to the specified size. This method can be used only to
         increase volume size, DSM is unable to shrink volumes
         :param size: Size to which this volume is expanded (e.g.: 500GB or 2.5TB)
-        :return: True if operation is successful, otherwise False
+        :return: Result of the operation (evaluates to True if operation is successful)
         """
-        success = False
         payload = {"NewSize": size}
-        resp = self.session.post(self.expand_to_size_url, json=payload)
-        if resp.status_code == 200:
-            success = True
-            print("OK - Volume expanded to size %s" % size)
+        result = ApiResult.call('expand_to_size', self.session, 'POST', self.expand_to_size_url, 200, json=payload)
+        if result:
+            self.configured_size = size
+            report("OK - Volume expanded to size %s" % size)
         else:
-            print("Error: Failed to expand volume - %s" % resp.json().get('result'))
-        return success
+            report("Error: Failed to expand volume - %s" % result.error_message)
+        return result
 
-    def recycle(self) -> bool:
+    def recycle(self) -> ApiResult:
         """
         Perform API call to DSM that moves this volume to recycle bin. Volumes in recycle bin can be restored.
-        :return: True if operation is successful, otherwise False
+        :return: Result of the operation (evaluates to True if operation is successful)
         """
-        success = False
-        resp = self.session.post(self.recycle_url)
-        if resp.status_code == 204:
-            success = True
-            print('OK - Volume successfully moved to recycle bin')
+        result = ApiResult.call('recycle', self.session, 'POST', self.recycle_url, 204)
+        if result:
+            report('OK - Volume successfully moved to recycle bin')
         else:
-            print('Error: Failed to recycle volume - %s' % resp.text)
-        return success
+            report('Error: Failed to recycle volume - %s' % result.error_message)
+        return result
 
-    def delete(self) -> bool:
+    def delete(self) -> ApiResult:
         """
         Perform API call to DSM that permanently deletes this volume.
         WARNING: This action can not be undone.
-        :return: True if operation is successful, otherwise False
+        :return: Result of the operation (evaluates to True if operation is successful)
         """
-        success = False
-        resp = self.session.delete(self.delete_url)
-        if resp.status_code == 200:
-            success = True
-            print("Ok - Volume successfully deleted")
+        result = ApiResult.call('delete', self.session, 'DELETE', self.delete_url, 200)
+        if result:
+            report("Ok - Volume successfully deleted")
         else:
-            print("Error: Failed to delete volume - %s" % resp.json().get('result'))
-        return success
+            report("Error: Failed to delete volume - %s" % result.error_message)
+        return result
 
-    def _modify_volume(self, payload: Dict[str, str]) -> bool:
+    def _modify_volume(self, operation: str, payload: Dict[str, str]) -> ApiResult:
         """
         Internal method that performs API call to DSM to modify volume properties. Only properties that are modifiable
         are 'Name' and 'VolumeFolder'.
+        :param operation: Name of the operation reported in result (e.g.: 'rename')
         :param payload: Dictionary with modified properties and their new values (e.g.: {'Name': 'new_volume_name'})
-        :return: True if operation is successful, otherwise False
+        :return: Result of the operation (evaluates to True if operation is successful)
         """
         # TODO: Move common functionality (like modify/rename/move) to base class
-        success = False
-        resp = self.session.put(self.modify_url, json=payload)
-        if resp.status_code == 200:
-            success = True
-            print("Ok - Volume modified")
+        result = ApiResult.call(operation, self.session, 'PUT', self.modify_url, 200, json=payload)
+        if result:
+            report("Ok - Volume modified")
         else:
-            print("Error: Failed to modify volume")
-        return success
+            report("Error: Failed to modify volume - %s" % result.error_message)
+        return result
 
-    def rename(self, new_name: str) -> bool:
+    def rename(self, new_name: str) -> ApiResult:
         """
         Perform API call to DSM to change current volume name to the new value.
         Note: Volume names do not have to be unique even within same folder
         :param new_name: New name for this volume
-        :return: True if operation is successful, otherwise False
+        :return: Result of the operation (evaluates to True if operation is successful)
         """
-        if self._modify_volume({"Name": new_name}):
+        result = self._modify_volume('rename', {"Name": new_name})
+        if result:
             self.name = new_name
-            return True
-        else:
-            return False
+        return result
 
-    def move_to_folder(self, volume_folder_id: str) -> bool:
+    def move_to_folder(self, volume_folder_id: str) -> ApiResult:
         """
         Perform API call to DSM to move this volume to the folder with instance ID specified by parameters
         volume_folder_id.
         :param volume_folder_id: Instance ID of a Volume folder to which this volume will be moved
-        :return: True if operation is successful, otherwise False
+        :return: Result of the operation (evaluates to True if operation is successful)
         """
-        if self._modify_volume({"VolumeFolder": volume_folder_id}):
+        result = self._modify_volume('move_to_folder', {"VolumeFolder": volume_folder_id})
+        if result:
             self.parent_folder_id = volume_folder_id
-            return True
-        else:
-            return False
+        return result
 
     def details(self) -> Dict[str, Any]:
         """
@@ -279,13 +275,26 @@ class Volume(StorageObject):
         form of a dictionary
         :return: Dictionary containing details about this volume.
         """
-        result: Dict[str, Any] = {}
-        resp = self.session.put(self.details_url)
-        if resp.status_code == 200:
-            result = resp.json()
-        else:
-            print("Error: Failed to fetch volume details")
-        return result
+        result = ApiResult.call('details', self.session, 'PUT', self.details_url, 200, decode=True)
+        if not result:
+            report("Error: Failed to fetch volume details")
+            return {}
+        details: Dict[str, Any] = result.value
+        return details
+
+
+    def storage_usage(self) -> Dict[str, Any]:
+        """
+        Perform API call to DSM to get storage usage of this volume (e.g.: 'configuredSpace' or 'activeSpace') and
+        return it in form of a dictionary
+        :return: Dictionary containing storage usage of this volume
+        """
+        result = ApiResult.call('storage_usage', self.session, 'GET', self.storage_usage_url, 200, decode=True)
+        if not result:
+            report("Error: Failed to fetch volume storage usage")
+            return {}
+        usage: Dict[str, Any] = result.value
+        return usage
 
 
 class VolumeCollection(StorageObjectCollection):
@@ -298,9 +307,24 @@ class VolumeCollection(StorageObjectCollection):
         :return: Volumes with common parent specified by folder_id
         """
         result = VolumeCollection()
-        for volume in self:
-            if volume.parent_folder_id == folder_id:
-                result.add(volume)
+        with profiling.phase(profiling.PHASE_FILTER):
+            for volume in self:
+                if volume.parent_folder_id == folder_id:
+                    result.add(volume)
+        return result
+
+    def find_in_subtree(self, folder_tree: StorageObjectFolderTree, folder_id: str) -> 'VolumeCollection':
+        """
+        Return subset VolumeCollection that contains volumes located in specified folder or any of its subfolders.
+        :param folder_tree: Precomputed hierarchy of volume folders
+        :param folder_id: Instance ID of a folder whose subtree should be in the result
+        :return: Volumes located in subtree of folder specified by folder_id
+        """
+        result = VolumeCollection()
+        with profiling.phase(profiling.PHASE_FILTER):
+            for volume in self:
+                if folder_tree.is_in_subtree(volume.parent_folder_id, folder_id):
+                    result.add(volume)
         return result
 
 
@@ -310,12 +334,12 @@ class VolumeFolder(StorageObjectFolder):
     VOLUME_FOLDER_ENDPOINT = '/StorageCenter/ScVolumeFolder/%s'
 
     @classmethod
-    def from_json(cls, req_session: Session, base_url: str, source_dict: Dict[Any, Any]) -> 'VolumeFolder':
+    def from_json(cls, req_session: Transport, base_url: str, source_dict: Dict[Any, Any]) -> 'VolumeFolder':
         """
         Class method that creates instance of VolumeFolder class from supplied dictionary. Source dictionary is expected
         to contain at least 'instanceId' and 'name' keys. Optional key 'parent' can be present and its value is
         expected to be dict containing key 'instanceId'.
-        :param req_session: requests.Session object with stored login cookies. (passed down
+        :param req_session: Transport with stored login cookies. (passed down
         from dell_storage_api.session.DsmSession)
         :param base_url: base URL of DSM
         :param source_dict: Dictionary containing data about VolumeFolder object
@@ -352,73 +376,67 @@ class VolumeFolder(StorageObjectFolder):
         """
         return self.build_url(self.VOLUME_FOLDER_ENDPOINT)
 
-    def _modify_volume_folder(self, payload: Dict[str, str]) -> bool:
+    def _modify_volume_folder(self, operation: str, payload: Dict[str, str]) -> ApiResult:
         """
         Internal method that performs call to DMS to modify this volume folder. Only modifiable properties are
         'Name' and 'Parent'.
+        :param operation: Name of the operation reported in result (e.g.: 'rename')
         :param payload: Dictionary with modified properties and their new values (e.g.: {'Name': 'new_folder_name'})
-        :return: True if operation is successful, otherwise False
+        :return: Result of the operation (evaluates to True if operation is successful)
         """
-        success = False
-        resp = self.session.put(self.modify_url, json=payload)
-        if resp.status_code == 200:
-            success = True
-            print("Ok - Volume folder modified")
+        result = ApiResult.call(operation, self.session, 'PUT', self.modify_url, 200, json=payload)
+        if result:
+            report("Ok - Volume folder modified")
         else:
-            print("Error: Failed to modify volume folder")
-        return success
+            report("Error: Failed to modify volume folder - %s" % result.error_message)
+        return result
 
-    def rename(self, name: str) -> bool:
+    def rename(self, name: str) -> ApiResult:
         """
         Perform API call to DSM to change this volume folder name to the new value.
         Note: Volume Folder names do not have to be unique even within same parent folder
         :param name: New name for this volume folder
-        :return: True if operation is successful, otherwise False
+        :return: Result of the operation (evaluates to True if operation is successful)
         """
-        if self._modify_volume_folder({"Name": name}):
+        result = self._modify_volume_folder('rename', {"Name": name})
+        if result:
             self.name = name
-            return True
-        else:
-            return False
+        return result
 
-    def move_to_folder(self, parent_folder_id: str) -> bool:
+    def move_to_folder(self, parent_folder_id: str) -> ApiResult:
         """
         Perform API call to DSM to move this folder to different parent folder specified by Instance ID in
         'parent_folder_id' parameter.
         :param parent_folder_id: Instance ID of the new parent folder
-        :return: True if operation is successful, otherwise False
+        :return: Result of the operation (evaluates to True if operation is successful)
         """
-        if self._modify_volume_folder({"VolumeFolder": parent_folder_id}):
+        result = self._modify_volume_folder('move_to_folder', {"VolumeFolder": parent_folder_id})
+        if result:
             self.parent_id = parent_folder_id
-            return True
-        else:
-            return False
+        return result
 
     def details(self) -> Dict[str, Any]:
         """
         Perform API call to DSM to fetch details about this volume folder. Result is returned as dictionary
         :return: Dictionary containing details about this volume folder
         """
-        result: Dict[str, Any] = {}
-        resp = self.session.put(self.details_url)
-        if resp.status_code == 200:
-            result = resp.json()
-        else:
-            print("Error: Failed to fetch volume folder details")
-        return result
+        result = ApiResult.call('details', self.session, 'PUT', self.details_url, 200, decode=True)
+        if not result:
+            report("Error: Failed to fetch volume folder details")
+            return {}
+        details: Dict[str, Any] = result.value
+        return details
 
-    def delete(self) -> bool:
+    def delete(self) -> ApiResult:
         """
         Perform API call to DSM to permanently delete this volume folder.
         Note: Volume folder can not be removed if it contains volumes.
         WARNING: This action can not be undone
-        :return: True if operation is successful, otherwise False
+        :return: Result of the operation (evaluates to True if operation is successful)
         """
-        success = False
-        resp = self.session.delete(self.delete_url)
-        if resp.status_code == 200:
-            success = True
-            print("Ok - Volume folder successfully deleted")
+        result = ApiResult.call('delete', self.session, 'DELETE', self.delete_url, 200)
+        if result:
+            report("Ok - Volume folder successfully deleted")
         else:
-            print("Error: Failed to delete volume folder - %s" % resp.json().get('result'))
-        return success
+            report("Error: Failed to delete volume folder - %s" % result.error_message)
+        return result
@@ -0,0 +1,154 @@
+"""
+This module contains polling based watcher that detects changes of volumes and servers in Storage Centers managed by
+Dell Storage Manager (DSM). Every poll fetches lightweight snapshot of raw object state, compares it with the previous
+snapshot by instance ID and emits only change events.
+"""
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+Snapshot = Dict[str, Dict[str, Any]]
+
+
+class ChangeEvent:  # pylint: disable=R0903
+    """
+    Class representing single detected change of volume or server
+    """
+    ADDED = 'added'
+    REMOVED = 'removed'
+    STATUS_CHANGED = 'status_changed'
+    MAPPING_CHANGED = 'mapping_changed'
+    MODIFIED = 'modified'
+
+    def __init__(self, event_type: str, storage_center_id: str, kind: str, instance_id: str, name: str,
+                 changes: Optional[Dict[str, List[Any]]] = None, timestamp: Optional[float] = None) -> None:
+        self.event_type = event_type
+        self.storage_center_id = storage_center_id
+        self.kind = kind
+        self.instance_id = instance_id
+        self.name = name
+        self.changes = changes or {}
+        self.timestamp = timestamp if timestamp is not None else time.time()
+
+    def __str__(self) -> str:
+        return "%s %s '%s' (%s) %s" % (self.kind, self.event_type, self.name, self.instance_id, self.changes or '')
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return representation of this event that can be serialized to json
+        :return: Dictionary describing this event
+        """
+        return {'timestamp': self.timestamp,
+                'storage_center_id': self.storage_center_id,
+                'kind': self.kind,
+                'event': self.event_type,
+                'instance_id': self.instance_id,
+                'name': self.name,
+                'changes': self.changes}
+
+
+def diff_snapshots(storage_center_id: str, kind: str, previous: Snapshot, current: Snapshot) -> List[ChangeEvent]:
+    """
+    Compare two snapshots of objects of the same kind and return list of changes. Snapshots are indexed by instance
+    ID, so the comparison runs in linear time. Only attributes present in both versions of the object are compared.
+    :param storage_center_id: Instance ID of a Storage Center
+    :param kind: Kind of compared objects (e.g.: 'volume' or 'server')
+    :param previous: Previous snapshot
+    :param current: Current snapshot
+    :return: List of change events
+    """
+    events = []
+    for instance_id, state in current.items():
+        old_state = previous.get(instance_id, None)
+        if old_state is None:
+            events.append(ChangeEvent(ChangeEvent.ADDED, storage_center_id, kind, instance_id, state.get('name', '')))
+            continue
+        changes = {key: [old_state[key], value] for key, value in state.items()
+                   if key in old_state and old_state[key] != value}
+        if not changes:
+            continue
+        if 'status' in changes:
+            event_type = ChangeEvent.STATUS_CHANGED
+        elif 'mapping' in changes:
+            event_type = ChangeEvent.MAPPING_CHANGED
+        else:
+            event_type = ChangeEvent.MODIFIED
+        events.append(ChangeEvent(event_type, storage_center_id, kind, instance_id, state.get('name', ''), changes))
+    for instance_id, old_state in previous.items():
+        if instance_id not in current:
+            events.append(ChangeEvent(ChangeEvent.REMOVED, storage_center_id, kind, instance_id,
+                                      old_state.get('name', '')))
+    return events
+
+
+class Watcher:
+    """
+    Watcher that periodically polls snapshots of one or more Storage Centers (objects providing 'instance_id' and
+    'state_snapshot' method, e.g.: StorageCenter) and yields change events. Storage Centers are polled concurrently.
+    Interval between polls is randomized by +/- 'jitter' fraction, so that multiple watchers do not poll DSM in
+    lockstep. First poll only records initial state and does not produce any events. Kinds of objects, that failed to
+    be fetched (including Storage Centers whose poll raised an error), are skipped in the poll and compared again in
+    the next successful poll.
+    """
+    DEFAULT_INTERVAL = 30.0
+    DEFAULT_JITTER = 0.1
+
+    def __init__(self, storage_centers: Iterable[Any], interval: float = DEFAULT_INTERVAL,
+                 jitter: float = DEFAULT_JITTER, include_servers: bool = True, include_mapping: bool = False) -> None:
+        self.storage_centers = list(storage_centers)
+        self.interval = interval
+        self.jitter = jitter
+        self.include_servers = include_servers
+        self.include_mapping = include_mapping
+        self._snapshots: Dict[str, Dict[str, Snapshot]] = {}
+
+    def _poll_storage_center(self, storage_center: Any) -> List[ChangeEvent]:
+        """
+        Internal method that polls single Storage Center and compares the result with its previous snapshot
+        :param storage_center: Polled Storage Center
+        :return: List of change events
+        """
+        events: List[ChangeEvent] = []
+        try:
+            current = storage_center.state_snapshot(self.include_servers, self.include_mapping)
+        except Exception as exc:  # pylint: disable=W0703
+            # Error in one Storage Center must not end the watch of others
+            print("Error: Failed to poll storage center '%s' - %s" % (storage_center.instance_id, exc))
+            return events
+        previous = self._snapshots.setdefault(storage_center.instance_id, {})
+        for kind, snapshot in current.items():
+            if snapshot is None:
+                continue
+            if kind in previous:
+                events.extend(diff_snapshots(storage_center.instance_id, kind, previous[kind], snapshot))
+            previous[kind] = snapshot
+        return events
+
+    def poll(self) -> List[ChangeEvent]:
+        """
+        Poll all watched Storage Centers once
+        :return: List of change events since previous poll
+        """
+        with ThreadPoolExecutor(max_workers=max(1, len(self.storage_centers))) as executor:
+            results = executor.map(self._poll_storage_center, self.storage_centers)
+        return [event for events in results for event in events]
+
+    def watch(self, max_polls: Optional[int] = None,
+              callback: Optional[Callable[[ChangeEvent], None]] = None) -> Iterator[ChangeEvent]:
+        """
+        Poll watched Storage Centers in a loop and yield change events. If callback is specified, it is called with
+        every event before the event is yielded.
+        :param max_polls: Stop after this number of polls (Defaults to infinite loop)
+        :param callback: Optional callable invoked with every event
+        :return: Iterator of change events
+        """
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            if polls:
+                time.sleep(max(0.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter))))
+            for event in self.poll():
+                if callback is not None:
+                    callback(event)
+                yield event
+            polls += 1
@@ -0,0 +1,233 @@
+""" Fake Dell Storage Manager (DSM) backed by MemoryTransport, shared by tests """
+import re
+import threading
+from urllib.parse import urlsplit
+
+import pytest
+
+from dell_storage_api.resolver import NameResolver
+from dell_storage_api.session import DsmSession
+from dell_storage_api.storage_center import StorageCenter
+from dell_storage_api.transport import MemoryResponse, MemoryTransport
+
+BASE_URL = 'https://dsm:3033/api/rest'
+SC_ID = '64702'
+
+
+class FakeDsm:
+    """
+    In-memory state of single Storage Center served through MemoryTransport routes. Objects are stored in the same
+    form as DSM returns them, volume mapping is stored as list of (volume instance ID, server instance ID).
+    """
+
+    def __init__(self, storage_center_id=SC_ID, name='sc1'):
+        self.storage_center_id = storage_center_id
+        self.name = name
+        self.transport = MemoryTransport()
+        self.volumes = {}
+        self.servers = {}
+        self.folders = {}
+        self.mappings = []
+        self._next_id = 100
+        self._failures = []
+        self._lock = threading.Lock()
+        self.root_folder_id = self.add_folder('Volumes')
+
+        sc_path = '/StorageCenter/StorageCenter/%s' % storage_center_id
+        instance_id = r'(%s\.\d+)' % storage_center_id.replace('.', r'\.')
+        self._route('GET', sc_path + '/VolumeList$', lambda match, payload: (200, list(self.volumes.values())))
+        self._route('GET', sc_path + '/ServerList$', lambda match, payload: (200, list(self.servers.values())))
+        self._route('GET', sc_path + '/VolumeFolderList$', lambda match, payload: (200, list(self.folders.values())))
+        self._route('GET', '/StorageCenter/ScVolume/%s$' % instance_id, self._get(self.volumes))
+        self._route('GET', '/StorageCenter/ScServer/%s$' % instance_id, self._get(self.servers))
+        self._route('POST', '/StorageCenter/ScMappingProfile/GetList$', self._mapping_profiles)
+        self._route('POST', '/StorageCenter/ScVolume$', self._create_volume)
+        self._route('POST', '/StorageCenter/ScVolumeFolder$', self._create_folder)
+        self._route('DELETE', '/StorageCenter/ScVolumeFolder/%s$' % instance_id, self._delete_folder)
+        self._route('POST', '/StorageCenter/ScVolume/%s/Recycle$' % instance_id, self._delete(self.volumes, 204))
+        self._route('PUT', '/StorageCenter/ScVolume/%s$' % instance_id, self._modify_volume)
+        self._route('POST', '/StorageCenter/ScVolume/%s/ExpandToSize$' % instance_id, self._expand_volume)
+        self._route('POST', '/StorageCenter/ScVolume/%s/MapToServer$' % instance_id, self._map_volume)
+        self._route('POST', '/StorageCenter/ScVolume/%s/Unmap$' % instance_id, self._unmap_volume)
+
+    def _route(self, method, path_pattern, handler):
+        pattern = re.compile(path_pattern)
+
+        def respond(method, url, kwargs):  # pylint: disable=W0613
+            payload = kwargs.get('json') or {}
+            for failed_method, failed_pattern, items, status in self._failures:
+                if failed_method == method and failed_pattern.search(url) and items.items() <= payload.items():
+                    return MemoryResponse(status, {'result': 'Injected failure'})
+            with self._lock:
+                status, body = handler(pattern.search(urlsplit(url).path), kwargs.get('json'))
+            return MemoryResponse(status, body)
+
+        self.transport.add_route(method, path_pattern, respond)
+
+    def fail(self, method, path_pattern, status=500, payload=None):
+        """
+        Make all requests matching method and path pattern fail with given status. If payload is specified, only
+        requests whose JSON payload contains all its items fail.
+        """
+        if payload is None:
+            self.transport.add_route(method, path_pattern, status, {'result': 'Injected failure'})
+        else:
+            self._failures.append((method, re.compile(path_pattern), payload, status))
+
+    def serve_queries(self):
+        """ Serve filtered queries of volumes, servers and volume folders, which DSM rejects by default (404) """
+        for path, objects in (('ScVolume', self.volumes), ('ScServer', self.servers),
+                              ('ScVolumeFolder', self.folders)):
+            self._route('POST', '/StorageCenter/%s/GetList$' % path,
+                        lambda match, payload, objects=objects: (200, self.query(objects, payload)))
+
+    def query(self, objects, payload):
+        """ Return objects matching all conditions of query filter, references match by their instance ID """
+        result = []
+        for object_data in objects.values():
+            for condition in payload['filter']['filters']:
+                if condition['attributeName'] == 'scSerialNumber':
+                    value = self.storage_center_id
+                else:
+                    value = object_data.get(condition['attributeName'])
+                    value = value.get('instanceId') if isinstance(value, dict) else value
+                if value != condition['attributeValue']:
+                    break
+            else:
+                result.append(object_data)
+        return result
+
+    def new_id(self):
+        with self._lock:
+            self._next_id += 1
+            return '%s.%d' % (self.storage_center_id, self._next_id)
+
+    def storage_center(self, snapshot_store=None):
+        return StorageCenter(self.transport, BASE_URL, self.name, self.storage_center_id, self.storage_center_id,
+                             '10.0.0.1', snapshot_store)
+
+    def resolver(self, cache_path='', ttl=NameResolver.DEFAULT_TTL):
+        """ Return NameResolver of a logged in DSM session that manages only this Storage Center """
+        session = DsmSession('admin', 'secret', 'dsm', transport=self.transport)
+        session.conn_instance_id = '1'
+        self.transport.add_route('GET', r'/ApiConnection/ApiConnection/1/StorageCenterList$', 200,
+                                 [{'name': self.name, 'instanceId': self.storage_center_id,
+                                   'scSerialNumber': self.storage_center_id, 'hostOrIpAddress': '10.0.0.1'}])
+        return NameResolver(session, cache_path=cache_path, ttl=ttl)
+
+    def add_folder(self, name, parent_id=None):
+        instance_id = self.new_id()
+        self.folders[instance_id] = {'instanceId': instance_id, 'name': name}
+        if parent_id is not None:
+            self.folders[instance_id]['parent'] = {'instanceId': parent_id}
+        return instance_id
+
+    def add_volume(self, name, folder_id=None, size='10737418240 Bytes', status='Up'):
+        instance_id = self.new_id()
+        self.volumes[instance_id] = {'instanceId': instance_id, 'name': name, 'status': status,
+                                     'volumeFolder': {'instanceId': folder_id or self.root_folder_id},
+                                     'deviceId': '6000d310%s' % instance_id.replace('.', ''),
+                                     'configuredSize': size}
+        return instance_id
+
+    def add_server(self, name, object_type='ScPhysicalServer', parent_id=None):
+        instance_id = self.new_id()
+        self.servers[instance_id] = {'instanceId': instance_id, 'name': name, 'objectType': object_type,
+                                     'parent': {'instanceId': parent_id} if parent_id else None}
+        return instance_id
+
+    def map(self, volume_id, server_id):
+        self.mappings.append((volume_id, server_id))
+
+    def mapped_servers(self, volume_name):
+        """ Return sorted names of servers to which volume with given name is mapped """
+        return sorted(self.servers[server_id]['name'] for volume_id, server_id in self.mappings
+                      if self.volumes[volume_id]['name'] == volume_name)
+
+    def folder_path(self, folder_id):
+        """ Return path of folder with given instance ID (e.g.: '/prod/db/') """
+        path = '/'
+        while 'parent' in self.folders[folder_id]:
+            path = '/' + self.folders[folder_id]['name'] + path
+            folder_id = self.folders[folder_id]['parent']['instanceId']
+        return path
+
+    @staticmethod
+    def _get(objects):
+        return lambda match, payload: (200, objects[match.group(1)]) if match.group(1) in objects else \
+            (404, {'result': 'Object not found'})
+
+    @staticmethod
+    def _delete(objects, status):
+        return lambda match, payload: (status, objects.pop(match.group(1))) if match.group(1) in objects else \
+            (404, {'result': 'Object not found'})
+
+    def _mapping_profiles(self, match, payload):  # pylint: disable=W0613
+        return 200, [{'volume': {'instanceId': volume_id},
+                      'server': {'instanceId': server_id, 'instanceName': self.servers[server_id]['name']}}
+                     for volume_id, server_id in self.mappings]
+
+    def _create_volume(self, match, payload):  # pylint: disable=W0613
+        if payload['VolumeFolder'] not in self.folders:
+            return 400, {'result': 'Volume folder does not exist'}
+        self._next_id += 1
+        instance_id = '%s.%d' % (self.storage_center_id, self._next_id)
+        self.volumes[instance_id] = {'instanceId': instance_id, 'name': payload['Name'], 'status': 'Up',
+                                     'volumeFolder': {'instanceId': payload['VolumeFolder']},
+                                     'deviceId': '6000d310%s' % instance_id.replace('.', ''),
+                                     'configuredSize': payload['Size']}
+        return 201, self.volumes[instance_id]
+
+    def _create_folder(self, match, payload):  # pylint: disable=W0613
+        if payload['Parent'] not in self.folders:
+            return 400, {'result': 'Parent folder does not exist'}
+        self._next_id += 1
+        instance_id = '%s.%d' % (self.storage_center_id, self._next_id)
+        self.folders[instance_id] = {'instanceId': instance_id, 'name': payload['Name'],
+                                     'parent': {'instanceId': payload['Parent']}}
+        return 201, self.folders[instance_id]
+
+    def _delete_folder(self, match, payload):  # pylint: disable=W0613
+        folder_id = match.group(1)
+        if folder_id not in self.folders:
+            return 404, {'result': 'Volume folder not found'}
+        children = [child for child in list(self.volumes.values()) + list(self.folders.values())
+                    if (child.get('volumeFolder') or child.get('parent') or {}).get('instanceId') == folder_id]
+        if children:
+            return 400, {'result': 'Volume folder is not empty'}
+        return 200, self.folders.pop(folder_id)
+
+    def _modify_volume(self, match, payload):
+        volume = self.volumes.get(match.group(1))
+        if volume is None:
+            return 404, {'result': 'Volume not found'}
+        if 'Name' in payload:
+            volume['name'] = payload['Name']
+        if 'VolumeFolder' in payload:
+            volume['volumeFolder'] = {'instanceId': payload['VolumeFolder']}
+        return 200, volume
+
+    def _expand_volume(self, match, payload):
+        volume = self.volumes.get(match.group(1))
+        if volume is None:
+            return 404, {'result': 'Volume not found'}
+        volume['configuredSize'] = payload['NewSize']
+        return 200, volume
+
+    def _map_volume(self, match, payload):
+        volume_id, server_id = match.group(1), payload['Server']
+        if volume_id not in self.volumes or server_id not in self.servers:
+            return 404, {'result': 'Object not found'}
+        if (volume_id, server_id) in self.mappings:
+            return 400, {'result': 'Volume is already mapped to this server'}
+        self.mappings.append((volume_id, server_id))
+        return 200, {}
+
+    def _unmap_volume(self, match, payload):  # pylint: disable=W0613
+        self.mappings[:] = [mapping for mapping in self.mappings if mapping[0] != match.group(1)]
+        return 204, None
+
+
+@pytest.fixture
+def dsm():
+    return FakeDsm()
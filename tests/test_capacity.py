@@ -0,0 +1,108 @@
+""" Tests of capacity reporting (dell_storage_api.capacity and 'report capacity' command) """
+import json
+
+import pytest
+
+from dell_storage_api import capacity
+from dell_storage_api.capacity import CapacityReport, parse_size
+from dell_storage_api.commands import ReturnCode, report_capacity
+
+from conftest import FakeDsm
+
+GIB = 1024 ** 3
+
+
+def usage_record(volume_id, configured, active):
+    return {'instanceId': volume_id, 'volume': {'instanceId': volume_id},
+            'configuredSpace': '%d Bytes' % configured, 'activeSpace': '%d Bytes' % active}
+
+
+def populate(dsm):
+    """ Add three volumes, two of them mapped to servers 'esx01' and 'esx02', and serve their usage by bulk query """
+    esx01, esx02 = dsm.add_server('esx01'), dsm.add_server('esx02')
+    db01 = dsm.add_volume('db01', size='%d Bytes' % (10 * GIB))
+    web01 = dsm.add_volume('web01', size='%d Bytes' % (20 * GIB))
+    dsm.add_volume('tmp01', size='%d Bytes' % (5 * GIB))
+    dsm.map(db01, esx01)
+    dsm.map(db01, esx02)
+    dsm.map(web01, esx02)
+    records = [usage_record(db01, 10 * GIB, 4 * GIB), usage_record(web01, 20 * GIB, 2 * GIB)]
+    dsm.transport.add_route('POST', r'/ScVolumeStorageUsage/GetList$', 200, records)
+    return dsm.storage_center()
+
+
+def test_parse_size():
+    assert parse_size('10737418240 Bytes') == 10 * GIB
+    assert parse_size('1.5 TB') == 1536 * GIB
+    assert parse_size(None) == parse_size('many') == 0
+
+
+def test_group_sum_is_exact_for_large_values():
+    values = [2 ** 53 + 1, 1, 2 ** 60 + 3]
+    assert capacity._group_sum(['a', 'a', 'b'], capacity.array('q', values)) == {'a': 2 ** 53 + 2, 'b': 2 ** 60 + 3}
+
+
+def test_group_sum_without_numpy(monkeypatch):
+    monkeypatch.setattr(capacity, 'numpy', None)
+    assert capacity._group_sum([('sc', '1'), 'x', ('sc', '1')], capacity.array('q', [1, 2, 3])) == \
+        {('sc', '1'): 4, 'x': 2}
+
+
+def test_missing_usage_falls_back_to_configured_size(dsm):
+    dsm.add_volume('db01', size='%d Bytes' % (10 * GIB))
+    dsm.add_volume('db02', size='2 GB')
+    report = dsm.storage_center().storage_usage(include_mapping=False)
+    assert report.totals() == (12 * GIB, 0)
+    assert len(report.missing_usage) == 2
+    assert report.aggregate(CapacityReport.GROUP_STORAGE_CENTER) == {'64702': (2, 12 * GIB, 0)}
+
+
+def test_usage_is_fetched_per_volume_when_bulk_query_fails(dsm):
+    volume_id = dsm.add_volume('db01')
+    dsm.transport.add_route('GET', r'/ScVolume/%s/StorageUsage$' % volume_id.replace('.', r'\.'), 200,
+                            usage_record(volume_id, 30 * GIB, 3 * GIB))
+    report = dsm.storage_center().storage_usage(include_mapping=False)
+    assert (report.totals(), report.missing_usage) == ((30 * GIB, 3 * GIB), [])
+
+
+def test_servers_with_same_name_on_different_storage_centers_are_not_merged():
+    report = populate(FakeDsm()).storage_usage()
+    report.extend(populate(FakeDsm('64703', 'sc2')).storage_usage())
+    groups = report.aggregate(CapacityReport.GROUP_SERVER)
+    by_name = sorted((report.server_names.get(key, ''), key[0] if key else '', value) for key, value in groups.items())
+    assert by_name == [('', '', (2, 10 * GIB, 0)),
+                       ('esx01', '64702', (1, 10 * GIB, 4 * GIB)),
+                       ('esx01', '64703', (1, 10 * GIB, 4 * GIB)),
+                       ('esx02', '64702', (2, 30 * GIB, 6 * GIB)),
+                       ('esx02', '64703', (2, 30 * GIB, 6 * GIB))]
+    assert report.aggregate(CapacityReport.GROUP_STORAGE_CENTER) == {'64702': (3, 35 * GIB, 6 * GIB),
+                                                                     '64703': (3, 35 * GIB, 6 * GIB)}
+    assert report.totals() == (70 * GIB, 12 * GIB)
+
+
+def test_report_command_labels_servers_by_storage_center(capsys):
+    storage_centers = [populate(FakeDsm()), populate(FakeDsm('64703', 'sc2'))]
+    assert report_capacity(storage_centers, CapacityReport.GROUP_SERVER, as_json=True) == ReturnCode.SUCCESS
+    output = capsys.readouterr().out
+    rows = {row['server']: row for row in json.loads(output[output.index('['):])}
+    assert sorted(rows) == ['(unmapped)', 'TOTAL', 'sc1:esx01', 'sc1:esx02', 'sc2:esx01', 'sc2:esx02']
+    assert (rows['sc2:esx02']['volumes'], rows['sc2:esx02']['used_gb']) == ('2', '6.000')
+    assert rows['TOTAL']['volumes'] == '6'
+
+
+@pytest.mark.parametrize('method, failed_path', [('GET', r'/VolumeList$'),
+                                                 ('POST', r'/ScMappingProfile/GetList$')])
+def test_report_command_fails_when_listing_fails(dsm, capsys, method, failed_path):
+    storage_center = populate(dsm)
+    dsm.fail(method, failed_path)
+    assert report_capacity([storage_center], CapacityReport.GROUP_SERVER) == ReturnCode.FAILURE
+    assert "Error: Failed to collect capacity report" in capsys.readouterr().out
+
+
+def test_report_command_warns_about_missing_usage(dsm, capsys):
+    dsm.add_volume('db01', size='1 GB')
+    assert report_capacity([dsm.storage_center()], CapacityReport.GROUP_FOLDER, as_json=True) == ReturnCode.SUCCESS
+    output = capsys.readouterr().out
+    assert "WARNING: Storage usage of 1 volumes could not be fetched" in output
+    rows = json.loads(output[output.index('['):])
+    assert rows[0]['folder'] == 'sc1:/' and rows[0]['configured_gb'] == '1.000'
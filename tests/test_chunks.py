@@ -0,0 +1,74 @@
+""" Tests of chunked volume and server listings (StorageCenter.iter_volume_chunks and iter_server_chunks) """
+import pytest
+
+from dell_storage_api.storage_center import InventoryError
+from dell_storage_api.transport import MemoryResponse
+
+
+def populate(dsm):
+    """ Add volume folders 'prod' and 'test' with two volumes each and one volume in root folder """
+    prod = dsm.add_folder('prod', dsm.root_folder_id)
+    test = dsm.add_folder('test', dsm.root_folder_id)
+    volume_ids = [dsm.add_volume('db01', prod), dsm.add_volume('db02', prod), dsm.add_volume('dev01', test),
+                  dsm.add_volume('dev02', test), dsm.add_volume('tmp01')]
+    return prod, test, volume_ids
+
+
+def calls(dsm, method, path):
+    return [url for call_method, url, _ in dsm.transport.calls if call_method == method and url.endswith(path)]
+
+
+def fail_slice(dsm, folder_id):
+    """ Make query of volumes from single Volume Folder fail, queries of other folders still succeed """
+    def query(method, url, kwargs):
+        conditions = kwargs['json']['filter']['filters']
+        if {'attributeName': 'volumeFolder', 'attributeValue': folder_id, 'filterType': 'Equals'} in conditions:
+            return MemoryResponse(500, {'result': 'Query timed out'})
+        return MemoryResponse(200, dsm.query(dsm.volumes, kwargs['json']))
+
+    dsm.transport.add_route('POST', r'/StorageCenter/ScVolume/GetList$', query)
+
+
+def test_volumes_are_fetched_in_slices_per_folder(dsm):
+    _, _, volume_ids = populate(dsm)
+    dsm.serve_queries()
+    chunks = list(dsm.storage_center().iter_volume_chunks(max_workers=2))
+    assert sorted(len(chunk) for chunk in chunks) == [1, 2, 2]
+    assert sorted(volume.instance_id for chunk in chunks for volume in chunk) == volume_ids
+    assert len(calls(dsm, 'POST', '/ScVolume/GetList')) == 3
+    assert calls(dsm, 'GET', '/VolumeList') == []
+
+
+def test_failed_slice_is_taken_from_full_listing(dsm, capsys):
+    _, test, volume_ids = populate(dsm)
+    fail_slice(dsm, test)
+    volumes = dsm.storage_center().volume_list_chunked()
+    assert sorted(volume.instance_id for volume in volumes) == volume_ids
+    assert len(calls(dsm, 'GET', '/VolumeList')) == 1
+    assert capsys.readouterr().out == ''
+
+
+def test_failed_slice_without_full_listing_raises(dsm):
+    _, test, _ = populate(dsm)
+    fail_slice(dsm, test)
+    dsm.fail('GET', r'/VolumeList$')
+    with pytest.raises(InventoryError, match='Failed to fetch 1 of 3 slices'):
+        dsm.storage_center().volume_list_chunked()
+
+
+def test_volumes_are_listed_at_once_without_folders(dsm):
+    _, _, volume_ids = populate(dsm)
+    dsm.serve_queries()
+    dsm.fail('GET', r'/VolumeFolderList$')
+    chunks = list(dsm.storage_center().iter_volume_chunks())
+    assert [sorted(volume.instance_id for volume in chunk) for chunk in chunks] == [volume_ids]
+    assert calls(dsm, 'POST', '/ScVolume/GetList') == []
+
+
+def test_servers_are_listed_at_once_without_server_folders(dsm):
+    server_ids = [dsm.add_server('esx01'), dsm.add_server('esx02')]
+    servers = dsm.storage_center().server_list_chunked()
+    assert sorted(server.instance_id for server in servers) == server_ids
+    dsm.fail('GET', r'/ServerList$')
+    with pytest.raises(InventoryError):
+        dsm.storage_center().server_list_chunked()
@@ -0,0 +1,114 @@
+""" Tests of columnar inventory export (dell_storage_api.columnar) """
+import io
+import mmap
+
+import pytest
+
+from dell_storage_api import columnar
+from dell_storage_api.commands import ReturnCode, export_inventory
+from dell_storage_api.server import Server
+from dell_storage_api.transport import MemoryTransport
+from dell_storage_api.volume import Volume, VolumeFolder
+
+BASE_URL = 'https://dsm:3033/api/rest'
+
+
+def create_volumes(count, folders):
+    transport = MemoryTransport()
+    return [Volume(transport, BASE_URL, 'vol-%d-é' % index, '64702.%d' % (1000 + index),
+                   '64702.%d' % (index % folders), '6000d31%09d' % index, 'Up' if index % 7 else 'Down')
+            for index in range(count)]
+
+
+def export(export_function, objects, row_group_size=columnar.DEFAULT_ROW_GROUP_SIZE):
+    stream = io.BytesIO()
+    assert export_function(stream, objects, row_group_size) == len(objects)
+    return stream.getvalue()
+
+
+def volume_rows(volumes):
+    return [(volume.instance_id, volume.name, volume.parent_folder_id, volume.wwid, volume.status)
+            for volume in volumes]
+
+
+@pytest.mark.parametrize('count, folders, row_group_size', [(0, 1, 10),
+                                                            (1, 1, 10),
+                                                            (25, 3, 10),
+                                                            (1500, 600, 2000)])
+def test_volume_round_trip(count, folders, row_group_size):
+    volumes = create_volumes(count, folders)
+    data = export(columnar.export_volumes, volumes, row_group_size)
+    reader = columnar.ColumnarReader(data)
+    assert reader.kind == columnar.KIND_VOLUME
+    assert reader.row_count == count
+    assert len(list(reader.iter_row_groups())) == -(-count // row_group_size)
+    loaded = columnar.load_volumes(data, MemoryTransport(), BASE_URL)
+    assert volume_rows(loaded) == volume_rows(volumes)
+
+
+def test_repeated_values_are_dictionary_encoded():
+    volumes = create_volumes(1000, 2)
+    unique = create_volumes(1000, 1000)
+    assert len(export(columnar.export_volumes, volumes)) < len(export(columnar.export_volumes, unique))
+
+
+@pytest.mark.parametrize('unique, typecode, width', [(2, b'B', 1), (300, b'H', 2), (70000, b'I', 4)])
+def test_dictionary_index_width(unique, typecode, width):
+    values = ['64702.%d' % (index % unique) for index in range(2 * unique + 1)]
+    block = columnar._encode_strings(values)  # pylint: disable=W0212
+    assert block[:1] == columnar.ENCODING_DICTIONARY
+    assert block[-width * len(values) - 1:][:1] == typecode
+    assert columnar._decode_strings(block, len(values)) == values  # pylint: disable=W0212
+
+
+def test_platform_sized_index_is_rejected():
+    block = columnar._encode_strings(['a', 'b', 'a', 'a', 'b'])  # pylint: disable=W0212
+    with pytest.raises(columnar.ColumnarFormatError):
+        columnar._decode_strings(block[:-6] + b'L' + block[-5:], 5)  # pylint: disable=W0212
+
+
+def test_reader_works_on_mmap(tmp_path):
+    volumes = create_volumes(50, 5)
+    path = tmp_path / 'volumes.dscf'
+    path.write_bytes(export(columnar.export_volumes, volumes, 20))
+    with open(str(path), 'rb') as export_file:
+        with mmap.mmap(export_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            rows = list(columnar.ColumnarReader(buffer).iter_rows())
+            assert [row['instance_id'] for row in rows] == [volume.instance_id for volume in volumes]
+            assert rows[7]['status'] == 'Down'
+
+
+def test_server_and_folder_round_trip():
+    transport = MemoryTransport()
+    servers = [Server(transport, BASE_URL, 'cluster', '64702.1', 'ScServerCluster'),
+               Server(transport, BASE_URL, 'node1', '64702.2', 'ScPhysicalServer', '64702.1'),
+               Server(transport, BASE_URL, 'node2', '64702.3', 'ScPhysicalServer', '64702.1')]
+    loaded = columnar.load_servers(export(columnar.export_servers, servers), transport, BASE_URL)
+    assert [(server.instance_id, server.name, server.type, server.parent_id) for server in loaded] == \
+        [(server.instance_id, server.name, server.type, server.parent_id) for server in servers]
+
+    folders = [VolumeFolder(transport, BASE_URL, 'Volumes', '64702.10', None),
+               VolumeFolder(transport, BASE_URL, 'prod', '64702.11', '64702.10')]
+    loaded_folders = columnar.load_volume_folders(export(columnar.export_volume_folders, folders), transport, BASE_URL)
+    assert [(folder.instance_id, folder.name, folder.parent_id) for folder in loaded_folders] == \
+        [('64702.10', 'Volumes', None), ('64702.11', 'prod', '64702.10')]
+    assert loaded_folders.tree().path('64702.11') == '/prod/'
+
+
+def test_invalid_files_are_rejected():
+    data = export(columnar.export_volumes, create_volumes(10, 2))
+    with pytest.raises(columnar.ColumnarFormatError):
+        columnar.load_servers(data, MemoryTransport(), BASE_URL)
+    with pytest.raises(columnar.ColumnarFormatError):
+        columnar.ColumnarReader(b'PK\x03\x04' + data[4:])
+    with pytest.raises(columnar.ColumnarFormatError):
+        columnar.ColumnarReader(data[:-4]).row_count  # pylint: disable=W0106
+    with pytest.raises(ValueError):
+        columnar.ColumnarWriter(io.BytesIO(), 'snapshot')
+
+
+def test_export_to_unwritable_path_fails(dsm, tmp_path, capsys):
+    dsm.add_volume('db01')
+    output_path = str(tmp_path / 'missing' / 'volumes.dscf')
+    assert export_inventory(dsm.storage_center(), columnar.KIND_VOLUME, output_path) == ReturnCode.FAILURE
+    assert "Error: Failed to write objects of type 'volume'" in capsys.readouterr().out
@@ -0,0 +1,66 @@
+""" Tests of listings filtered by DSM query endpoints and of their client side fallback """
+import pytest
+
+from dell_storage_api.server import Server
+
+
+def populate(dsm):
+    """ Add volume folder 'prod' with subfolder and volume, volume in root folder, cluster and two servers """
+    prod = dsm.add_folder('prod', dsm.root_folder_id)
+    db = dsm.add_folder('db', prod)
+    cluster = dsm.add_server('cluster01', Server.TYPE_SERVER_CLUSTER)
+    dsm.add_server('esx01', parent_id=cluster)
+    dsm.add_server('esx02')
+    dsm.add_volume('db01', prod)
+    dsm.add_volume('tmp01')
+    return prod, db
+
+
+def names(collection):
+    return sorted(storage_object.name for storage_object in collection)
+
+
+def listing_calls(dsm):
+    return sorted((method, url.rsplit('/', 1)[1]) for method, url, _ in dsm.transport.calls)
+
+
+@pytest.mark.parametrize('queries', [True, False])
+def test_filtered_listings(dsm, capsys, queries):
+    prod, db = populate(dsm)
+    if queries:
+        dsm.serve_queries()
+    storage_center = dsm.storage_center()
+    assert names(storage_center.volume_list(prod)) == ['db01']
+    assert names(storage_center.volume_list(db)) == []
+    assert names(storage_center.volume_folder_list(prod)) == ['db']
+    assert names(storage_center.server_list(Server.TYPE_SERVER_CLUSTER)) == ['cluster01']
+    assert capsys.readouterr().out == ''
+
+
+def test_filter_is_sent_to_dsm(dsm):
+    prod, _ = populate(dsm)
+    dsm.serve_queries()
+    dsm.storage_center().volume_list(prod)
+    assert dsm.transport.calls == [
+        ('POST', 'https://dsm:3033/api/rest/StorageCenter/ScVolume/GetList',
+         {'filter': {'filterType': 'AND',
+                     'filters': [{'attributeName': 'volumeFolder', 'attributeValue': prod, 'filterType': 'Equals'},
+                                 {'attributeName': 'scSerialNumber', 'attributeValue': dsm.storage_center_id,
+                                  'filterType': 'Equals'}]}})]
+
+
+def test_rejected_filter_falls_back_to_full_listing(dsm):
+    prod, _ = populate(dsm)
+    storage_center = dsm.storage_center()
+    storage_center.volume_list(prod)
+    storage_center.volume_folder_list(prod)
+    storage_center.server_list(Server.TYPE_SERVER_CLUSTER)
+    assert listing_calls(dsm) == [('GET', 'ServerList'), ('GET', 'VolumeFolderList'), ('GET', 'VolumeList'),
+                                  ('POST', 'GetList'), ('POST', 'GetList'), ('POST', 'GetList')]
+
+
+def test_failed_fallback_is_reported(dsm, capsys):
+    prod, _ = populate(dsm)
+    dsm.fail('GET', r'/VolumeList$')
+    assert len(dsm.storage_center().volume_list(prod)) == 0
+    assert capsys.readouterr().out == "Error: Failed to fetch object list (500) - Injected failure\n"
@@ -0,0 +1,108 @@
+""" Tests of precomputed volume folder hierarchy (dell_storage_api.storage_object.StorageObjectFolderTree) """
+from dell_storage_api.storage_object import StorageObjectFolder, StorageObjectFolderCollection
+from dell_storage_api.transport import MemoryTransport
+from dell_storage_api.volume import Volume, VolumeCollection
+
+BASE_URL = 'https://dsm:3033/api/rest'
+
+# (instance ID, name, parent instance ID)
+FOLDERS = [('1.1', 'Volumes', None),
+           ('1.2', 'prod', '1.1'),
+           ('1.3', 'db', '1.2'),
+           ('1.4', 'web', '1.2'),
+           ('1.5', 'dev', '1.1'),
+           ('1.6', 'logs', '1.3'),
+           ('1.7', 'orphan', '9.9')]
+
+
+def build_tree():
+    folders = StorageObjectFolderCollection()
+    for instance_id, name, parent_id in FOLDERS:
+        folders.add(StorageObjectFolder(MemoryTransport(), BASE_URL, name, instance_id, parent_id))
+    return folders.tree()
+
+
+def test_paths_and_depths():
+    tree = build_tree()
+    assert len(tree) == len(FOLDERS)
+    assert tree.path('1.1') == '/'
+    assert tree.path('1.6') == '/prod/db/logs/'
+    assert tree.depth('1.1') == 0
+    assert tree.depth('1.6') == 3
+    assert tree.path('0.0') is None
+    assert tree.depth('0.0') is None
+
+
+def test_folders_with_unknown_parent_are_roots():
+    tree = build_tree()
+    assert [folder.instance_id for folder in tree.roots()] == ['1.1', '1.7']
+    assert tree.path('1.7') == '/'
+
+
+def test_children_are_ordered_by_name():
+    tree = build_tree()
+    assert [folder.name for folder in tree.children('1.1')] == ['dev', 'prod']
+    assert [folder.name for folder in tree.children('1.2')] == ['db', 'web']
+    assert tree.children('1.6') == []
+
+
+def test_subtree_intervals():
+    tree = build_tree()
+    assert tree.subtree_ids('1.2') == ['1.2', '1.3', '1.6', '1.4']
+    assert tree.subtree_ids('1.6') == ['1.6']
+    assert tree.subtree_ids('0.0') == []
+    assert tree.is_in_subtree('1.6', '1.2')
+    assert tree.is_in_subtree('1.2', '1.2')
+    assert not tree.is_in_subtree('1.5', '1.2')
+    assert not tree.is_in_subtree('1.2', '1.6')
+    assert not tree.is_in_subtree('1.7', '1.1')
+    assert not tree.is_in_subtree('0.0', '1.1')
+
+
+def test_subtree_membership_matches_parent_chain():
+    tree = build_tree()
+    parents = {instance_id: parent_id for instance_id, _, parent_id in FOLDERS}
+
+    def ancestors(folder_id):
+        while folder_id in parents:
+            yield folder_id
+            folder_id = parents[folder_id]
+
+    for folder_id in parents:
+        for ancestor_id in parents:
+            assert tree.is_in_subtree(folder_id, ancestor_id) == (ancestor_id in set(ancestors(folder_id)))
+
+
+def test_walk_in_pre_order():
+    tree = build_tree()
+    assert [folder.instance_id for folder in tree.walk()] == ['1.1', '1.5', '1.2', '1.3', '1.6', '1.4', '1.7']
+    assert [folder.name for folder in tree.walk('1.3')] == ['db', 'logs']
+
+
+def test_find_by_path():
+    tree = build_tree()
+    assert tree.find_by_path('/prod/db/').instance_id == '1.3'
+    assert tree.find_by_path('prod/db').instance_id == '1.3'
+    assert tree.find_by_path('/').instance_id == '1.1'
+    assert tree.find_by_path('/prod/missing/') is None
+
+
+def test_deep_hierarchy_does_not_recurse():
+    folders = StorageObjectFolderCollection()
+    depth = 5000
+    for level in range(depth):
+        parent_id = '2.%d' % (level - 1) if level else None
+        folders.add(StorageObjectFolder(MemoryTransport(), BASE_URL, 'f%d' % level, '2.%d' % level, parent_id))
+    tree = folders.tree()
+    assert tree.depth('2.%d' % (depth - 1)) == depth - 1
+    assert tree.is_in_subtree('2.%d' % (depth - 1), '2.0')
+
+
+def test_volumes_in_subtree():
+    tree = build_tree()
+    volumes = VolumeCollection()
+    for index, folder_id in enumerate(['1.1', '1.3', '1.6', '1.4', '1.5']):
+        volumes.add(Volume(MemoryTransport(), BASE_URL, 'vol%d' % index, '1.%d' % (100 + index), folder_id,
+                           'wwid%d' % index, 'Up'))
+    assert sorted(volume.name for volume in volumes.find_in_subtree(tree, '1.2')) == ['vol1', 'vol2', 'vol3']
+    assert [volume.name for volume in volumes.find_in_subtree(tree, '1.6')] == ['vol2']
@@ -0,0 +1,182 @@
+""" Tests of resumable job queue (dell_storage_api.jobs) """
+import json
+import threading
+
+import pytest
+
+from dell_storage_api.jobs import Job, JobQueue, JobStateError
+from dell_storage_api.session import DsmSession
+from dell_storage_api.transport import MemoryResponse, MemoryTransport
+
+
+def create_session(transport):
+    return DsmSession('admin', 'secret', 'dsm', transport=transport)
+
+
+def create_transport():
+    transport = MemoryTransport()
+    transport.add_route('POST', r'/StorageCenter/ScVolume/[0-9.]+/ExpandToSize$', 200, {})
+    transport.add_route('POST', r'/StorageCenter/ScVolume/[0-9.]+/MapToServer$', 200, {})
+    transport.add_route('POST', r'/StorageCenter/ScVolume/64702\.13/MapToServer$', 400, {'result': 'Already mapped'})
+    transport.add_route('POST', r'/StorageCenter/ScVolume/64702\.14/Recycle$', 503, {'result': 'Busy'})
+    return transport
+
+
+def volume_calls(transport):
+    return sorted(url.split('/ScVolume/')[1] for _, url, _ in transport.calls)
+
+
+def test_job_id_depends_on_content_only():
+    job = Job.create('64702', '64702.11', 'expand_to_size', {'size': '20GB'})
+    assert job.job_id == Job.create('64702', '64702.11', 'expand_to_size', {'size': '20GB'}).job_id
+    assert job.job_id != Job.create('64702', '64702.11', 'expand_to_size', {'size': '30GB'}).job_id
+    assert job.job_id != Job.create('64702', '64702.12', 'expand_to_size', {'size': '20GB'}).job_id
+    assert job.job_id != Job.create('64702', '64702.11', 'expand_to_size', {'size': '20GB'}, occurrence=1).job_id
+
+
+def test_invalid_jobs_are_rejected():
+    with pytest.raises(ValueError):
+        Job.create('64702', '64702.11', 'shrink', {'size': '20GB'})
+    with pytest.raises(ValueError):
+        Job.create('64702', '64702.11', 'map_to_server')
+
+
+def test_run_records_results():
+    transport = create_transport()
+    queue = JobQueue(create_session(transport))
+    done = queue.add(Job.create('64702', '64702.11', 'expand_to_size', {'size': '20GB'}))
+    rejected = queue.add(Job.create('64702', '64702.13', 'map_to_server', {'server_id': '64702.1'}))
+    busy = queue.add(Job.create('64702', '64702.14', 'recycle'))
+    progress = queue.run()
+    assert (progress.total, progress.done, progress.failed, progress.running) == (3, 1, 2, 0)
+    assert done.state == Job.STATE_DONE
+    assert (rejected.state, rejected.status_code, rejected.error, rejected.retryable) == \
+        (Job.STATE_FAILED, 400, 'Already mapped', False)
+    assert (busy.state, busy.status_code, busy.retryable) == (Job.STATE_FAILED, 503, True)
+    assert {'NewSize': '20GB'} in [payload for _, _, payload in transport.calls]
+    assert queue.retry_failed(retryable_only=True) == 1
+    assert busy.state == Job.STATE_PENDING
+    assert rejected.state == Job.STATE_FAILED
+
+
+def test_resume_skips_finished_jobs(tmp_path):
+    state_path = str(tmp_path / 'jobs.json')
+    jobs = [Job.create('64702', '64702.11', 'expand_to_size', {'size': '20GB'}),
+            Job.create('64702', '64702.12', 'map_to_server', {'server_id': '64702.1'})]
+
+    first_transport = create_transport()
+    first_queue = JobQueue(create_session(first_transport), state_path)
+    first_queue.add(jobs[0])
+    first_queue.run()
+    assert volume_calls(first_transport) == ['64702.11/ExpandToSize']
+
+    second_transport = create_transport()
+    second_queue = JobQueue(create_session(second_transport), state_path)
+    assert [job.state for job in second_queue] == [Job.STATE_DONE]
+    for job in reversed(jobs):
+        second_queue.add(Job.create(job.storage_center_id, job.volume_id, job.operation, job.arguments))
+    progress = second_queue.run()
+    assert volume_calls(second_transport) == ['64702.12/MapToServer']
+    assert (progress.total, progress.done, progress.resumed) == (2, 2, 1)
+    with open(state_path, 'r', encoding='utf-8') as state_file:
+        assert sorted(job['state'] for job in json.load(state_file)) == [Job.STATE_DONE, Job.STATE_DONE]
+
+
+def write_interrupted(state_path, *jobs):
+    for job in jobs:
+        job.state = Job.STATE_RUNNING
+        job.started = 1.0
+    state_path.write_text(json.dumps([job.to_dict() for job in jobs]), encoding='utf-8')
+
+
+def test_interrupted_expand_is_not_replayed(tmp_path):
+    state_path = tmp_path / 'jobs.json'
+    expand = Job.create('64702', '64702.11', 'expand', {'size': '10GB'})
+    write_interrupted(state_path, expand)
+    transport = create_transport()
+    transport.add_route('POST', r'/StorageCenter/ScVolume/[0-9.]+/Expand$', 200, {})
+    queue = JobQueue(create_session(transport), str(state_path))
+    loaded = queue.add(Job.create('64702', '64702.11', 'expand', {'size': '10GB'}))
+    assert (loaded.state, loaded.error, loaded.retryable) == (Job.STATE_FAILED, Job.INTERRUPTED_ERROR, False)
+
+    assert queue.run().failed == 1
+    assert queue.retry_failed(retryable_only=True) == 0
+    queue.run()
+    assert transport.calls == []
+    assert queue.retry_failed() == 1
+    assert queue.run().done == 1
+    assert volume_calls(transport) == ['64702.11/Expand']
+
+
+def test_interrupted_expand_to_size_is_replayed(tmp_path):
+    state_path = tmp_path / 'jobs.json'
+    write_interrupted(state_path, Job.create('64702', '64702.11', 'expand_to_size', {'size': '20GB'}))
+    transport = create_transport()
+    queue = JobQueue(create_session(transport), str(state_path))
+    assert [(job.state, job.started) for job in queue] == [(Job.STATE_PENDING, None)]
+    assert queue.run().done == 1
+    assert volume_calls(transport) == ['64702.11/ExpandToSize']
+
+
+def test_running_job_is_saved_to_state_file(tmp_path):
+    state_path = tmp_path / 'jobs.json'
+    transport = create_transport()
+    states = []
+
+    def expand(method, url, kwargs):
+        states.extend(job['state'] for job in json.loads(state_path.read_text(encoding='utf-8')))
+        return MemoryResponse(200, {})
+
+    transport.add_route('POST', r'/ExpandToSize$', expand)
+    queue = JobQueue(create_session(transport), str(state_path))
+    queue.add(Job.create('64702', '64702.11', 'expand_to_size', {'size': '20GB'}))
+    queue.run()
+    assert states == [Job.STATE_RUNNING]
+
+
+def test_busy_storage_center_does_not_block_others():
+    transport = create_transport()
+    release = threading.Event()
+    other_done = threading.Event()
+
+    def slow_expand(method, url, kwargs):
+        release.wait(5)
+        return MemoryResponse(200, {})
+
+    def fast_expand(method, url, kwargs):
+        other_done.set()
+        return MemoryResponse(200, {})
+
+    transport.add_route('POST', r'/ScVolume/64702\.[0-9]+/ExpandToSize$', slow_expand)
+    transport.add_route('POST', r'/ScVolume/64703\.[0-9]+/ExpandToSize$', fast_expand)
+    queue = JobQueue(create_session(transport), max_workers_per_sc=2)
+    for index in range(6):
+        queue.add(Job.create('64702', '64702.%d' % index, 'expand_to_size', {'size': '20GB'}))
+    queue.add(Job.create('64703', '64703.1', 'expand_to_size', {'size': '20GB'}))
+
+    runner = threading.Thread(target=queue.run)
+    runner.start()
+    assert other_done.wait(2)
+    release.set()
+    runner.join(10)
+    assert queue.progress().done == 7
+
+
+def test_retain_removes_jobs_missing_from_job_list(tmp_path):
+    state_path = str(tmp_path / 'jobs.json')
+    queue = JobQueue(create_session(create_transport()), state_path)
+    kept = queue.add(Job.create('64702', '64702.11', 'unmap'))
+    queue.add(Job.create('64702', '64702.12', 'unmap'))
+    assert queue.retain([kept.job_id]) == 1
+    assert [job.job_id for job in queue] == [kept.job_id]
+    assert [job.job_id for job in JobQueue(create_session(create_transport()), state_path)] == [kept.job_id]
+
+
+def test_corrupt_state_file_raises(tmp_path):
+    state_path = tmp_path / 'jobs.json'
+    state_path.write_text('[{"job_id": ', encoding='utf-8')
+    with pytest.raises(JobStateError):
+        JobQueue(create_session(create_transport()), str(state_path))
+    state_path.write_text('[{"job_id": "1"}]', encoding='utf-8')
+    with pytest.raises(JobStateError):
+        JobQueue(create_session(create_transport()), str(state_path))
@@ -0,0 +1,83 @@
+""" Tests of volume mapping and cluster membership index (dell_storage_api.mapping and 'server show' command) """
+import json
+
+from dell_storage_api.commands import ReturnCode, server_show
+from dell_storage_api.server import Server
+
+
+def populate(dsm):
+    """ Map 'shared01' to cluster of 'esx01' and 'esx02', 'local01' to 'esx01' only and 'other01' to 'esx03' """
+    cluster = dsm.add_server('cluster01', Server.TYPE_SERVER_CLUSTER)
+    esx01 = dsm.add_server('esx01', parent_id=cluster)
+    esx02 = dsm.add_server('esx02', parent_id=cluster)
+    esx03 = dsm.add_server('esx03')
+    shared01, local01, other01 = dsm.add_volume('shared01'), dsm.add_volume('local01'), dsm.add_volume('other01')
+    dsm.add_volume('free01')
+    dsm.map(shared01, cluster)
+    dsm.map(local01, esx01)
+    dsm.map(other01, esx03)
+    return cluster, esx01, esx02, esx03
+
+
+def names(collection):
+    return sorted(storage_object.name for storage_object in collection)
+
+
+def test_index_includes_volumes_inherited_from_cluster(dsm):
+    cluster, esx01, esx02, esx03 = populate(dsm)
+    index = dsm.storage_center().mapping_index()
+    assert names(index.volumes_of(esx01)) == ['local01', 'shared01']
+    assert names(index.volumes_of(esx01, include_cluster=False)) == ['local01']
+    assert names(index.volumes_of(esx02)) == ['shared01']
+    assert names(index.volumes_of(esx03)) == ['other01']
+    assert names(index.volumes_of(cluster)) == ['shared01']
+    assert (index.cluster_id(esx01), index.cluster_id(esx03), index.cluster_id(cluster)) == (cluster, '', '')
+    assert sorted(index.server_ids(index.volume_ids(esx02)[0])) == [cluster]
+
+
+def test_servers_are_attached_to_index(dsm):
+    cluster, esx01, _, esx03 = populate(dsm)
+    index = dsm.storage_center().mapping_index()
+    servers = {server.instance_id: server for server in index.servers}
+    assert names(servers[cluster].members()) == ['esx01', 'esx02']
+    assert names(servers[esx03].members()) == []
+    assert names(servers[esx01].volumes()) == ['local01', 'shared01']
+    assert names(Server('session', 'url', 'esx09', '64702.999', Server.TYPE_PHYSICAL_SERVER).volumes()) == []
+
+
+def test_index_is_built_from_one_request_per_listing(dsm):
+    populate(dsm)
+    dsm.storage_center().mapping_index()
+    assert sorted((method, url.rsplit('/', 1)[1]) for method, url, _ in dsm.transport.calls) == \
+        [('GET', 'ServerList'), ('GET', 'VolumeList'), ('POST', 'GetList')]
+
+
+def test_index_without_volumes_returns_only_instance_ids(dsm):
+    *_, esx03 = populate(dsm)
+    index = dsm.storage_center().mapping_index(include_volumes=False)
+    assert index.volume_ids(esx03) == [volume_id for volume_id, server_id in dsm.mappings if server_id == esx03]
+    assert len(index.volumes_of(esx03)) == 0
+    assert not [url for _, url, _ in dsm.transport.calls if url.endswith('/VolumeList')]
+
+
+def test_server_show_marks_volumes_mapped_via_cluster(dsm, capsys):
+    populate(dsm)
+    assert server_show(dsm.storage_center(), 'esx01', as_json=True) == ReturnCode.SUCCESS
+    tables = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith('[')]
+    assert sorted((row['volume'], row['mapped_via']) for row in tables[-1]) == \
+        [('local01', 'direct'), ('shared01', 'cluster cluster01')]
+
+
+def test_server_show_lists_cluster_members(dsm, capsys):
+    populate(dsm)
+    assert server_show(dsm.storage_center(), 'cluster01', as_json=True) == ReturnCode.SUCCESS
+    tables = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith('[')]
+    assert sorted(row['member'] for row in tables[1]) == ['esx01', 'esx02']
+    assert [(row['volume'], row['mapped_via']) for row in tables[2]] == [('shared01', 'direct')]
+
+
+def test_server_show_fails_without_mapping(dsm, capsys):
+    populate(dsm)
+    dsm.fail('POST', r'/ScMappingProfile/GetList$')
+    assert server_show(dsm.storage_center(), 'esx01') == ReturnCode.FAILURE
+    assert "Failed to fetch mapping of volumes in Storage Center 'sc1'" in capsys.readouterr().out
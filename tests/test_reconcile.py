@@ -0,0 +1,127 @@
+""" Tests of declarative provisioning (dell_storage_api.reconcile and 'apply' command) """
+import json
+
+import pytest
+
+from dell_storage_api.commands import ReturnCode, apply
+from dell_storage_api.reconcile import PlanStep, ReconcileError, Reconciler, normalize_path, parent_path
+
+DESIRED = {'storage_center': 'sc1',
+           'folders': ['/prod/db'],
+           'volumes': [{'name': 'db01', 'folder': '/prod/db/', 'size': '20GB', 'servers': ['esx02']},
+                       {'name': 'web01', 'folder': 'web', 'size': '5GB', 'servers': ['esx02', 'esx01']},
+                       {'name': 'tmp01'}]}
+
+
+def populate(dsm):
+    prod_id = dsm.add_folder('prod', dsm.root_folder_id)
+    volume_id = dsm.add_volume('db01', prod_id, size='10737418240 Bytes')
+    dsm.add_volume('tmp01')
+    dsm.map(volume_id, dsm.add_server('esx01'))
+    dsm.add_server('esx02')
+
+
+def describe(plan):
+    return [(step.action, step.target, [plan.steps[step_id].action for step_id in step.depends_on])
+            for step in plan.steps]
+
+
+def test_paths():
+    assert normalize_path('prod/db') == '/prod/db/'
+    assert normalize_path('') == '/'
+    assert parent_path('/prod/db/') == '/prod/'
+    assert parent_path('/') == '/'
+
+
+def test_plan_contains_only_needed_changes(dsm):
+    populate(dsm)
+    plan = Reconciler(dsm.storage_center()).plan(DESIRED)
+    assert describe(plan) == [
+        (PlanStep.CREATE_FOLDER, '/web/', []),
+        (PlanStep.CREATE_FOLDER, '/prod/db/', []),
+        (PlanStep.EXPAND, 'db01', []),
+        (PlanStep.MOVE, 'db01', [PlanStep.CREATE_FOLDER, PlanStep.EXPAND]),
+        (PlanStep.UNMAP, 'db01', [PlanStep.MOVE]),
+        (PlanStep.MAP, 'db01', [PlanStep.UNMAP]),
+        (PlanStep.CREATE_VOLUME, 'web01', [PlanStep.CREATE_FOLDER]),
+        (PlanStep.MAP, 'web01', [PlanStep.CREATE_VOLUME]),
+        (PlanStep.MAP, 'web01', [PlanStep.MAP]),
+    ]
+    assert [step.arguments for step in plan.steps if step.target == 'web01'] == \
+        [{'size': '5GB', 'folder': '/web/'}, {'server': 'esx01'}, {'server': 'esx02'}]
+    assert [len(level) for level in plan.levels()] == [3, 2, 2, 2]
+    assert dsm.transport.calls and all(method == 'GET' or url.endswith('/GetList')
+                                       for method, url, _ in dsm.transport.calls)
+
+
+def test_executed_plan_reaches_desired_state(dsm):
+    populate(dsm)
+    storage_center = dsm.storage_center()
+    assert Reconciler(storage_center).plan(DESIRED).execute(quiet=True)
+
+    volumes = {volume['name']: volume for volume in dsm.volumes.values()}
+    assert dsm.folder_path(volumes['db01']['volumeFolder']['instanceId']) == '/prod/db/'
+    assert dsm.folder_path(volumes['web01']['volumeFolder']['instanceId']) == '/web/'
+    assert volumes['db01']['configuredSize'] == '20GB'
+    assert dsm.mapped_servers('db01') == ['esx02']
+    assert dsm.mapped_servers('web01') == ['esx01', 'esx02']
+    assert len(Reconciler(storage_center).plan(DESIRED)) == 0
+
+
+def test_mapping_is_extended_without_unmap(dsm):
+    populate(dsm)
+    desired = {'volumes': [{'name': 'db01', 'folder': '/prod/', 'servers': ['esx01', 'esx02']}]}
+    plan = Reconciler(dsm.storage_center()).plan(desired)
+    assert describe(plan) == [(PlanStep.MAP, 'db01', [])]
+    assert plan.execute(quiet=True)
+    assert dsm.mapped_servers('db01') == ['esx01', 'esx02']
+
+
+def test_smaller_size_is_not_planned(dsm, capsys):
+    populate(dsm)
+    desired = {'volumes': [{'name': 'db01', 'folder': '/prod/', 'size': '1GB'}]}
+    assert len(Reconciler(dsm.storage_center()).plan(desired)) == 0
+    assert "volumes can not be shrunk" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('method, failed_path', [('GET', r'/VolumeList$'),
+                                                 ('GET', r'/ServerList$'),
+                                                 ('GET', r'/VolumeFolderList$'),
+                                                 ('POST', r'/ScMappingProfile/GetList$')])
+def test_incomplete_inventory_is_fatal(dsm, method, failed_path):
+    populate(dsm)
+    dsm.fail(method, failed_path)
+    with pytest.raises(ReconcileError):
+        Reconciler(dsm.storage_center()).plan(DESIRED)
+
+
+def test_invalid_desired_state_is_rejected(dsm):
+    populate(dsm)
+    reconciler = Reconciler(dsm.storage_center())
+    with pytest.raises(ReconcileError):
+        reconciler.plan({'volumes': [{'name': 'db01', 'servers': ['esx09']}]})
+    with pytest.raises(ReconcileError, match="can not be created without 'size'"):
+        reconciler.plan({'volumes': [{'name': 'db02', 'servers': ['esx01']}]})
+    with pytest.raises(ReconcileError, match="has no 'name'"):
+        reconciler.plan({'volumes': [{'size': '1GB'}]})
+    dsm.add_volume('db01')
+    with pytest.raises(ReconcileError):
+        reconciler.plan({'volumes': [{'name': 'db01'}]})
+
+
+@pytest.mark.parametrize('invalid', [{'storage_center': 'sc9'},
+                                     {'storage_center': 'sc1', 'volumes': [{'name': 'new01'}]}])
+def test_apply_executes_nothing_if_any_plan_fails(dsm, tmp_path, invalid):
+    populate(dsm)
+    state_path = tmp_path / 'desired.json'
+    state_path.write_text(json.dumps([DESIRED, invalid]), encoding='utf-8')
+    assert apply(dsm.resolver(), str(state_path), workers=2) == ReturnCode.FAILURE
+    assert all(method == 'GET' or url.endswith('/GetList') for method, url, _ in dsm.transport.calls)
+
+
+def test_apply_executes_plans_of_all_storage_centers(dsm, tmp_path):
+    populate(dsm)
+    state_path = tmp_path / 'desired.json'
+    state_path.write_text(json.dumps(DESIRED), encoding='utf-8')
+    assert apply(dsm.resolver(), str(state_path), workers=2) == ReturnCode.SUCCESS
+    assert dsm.mapped_servers('web01') == ['esx01', 'esx02']
@@ -0,0 +1,123 @@
+""" Tests of cached name resolution (dell_storage_api.resolver) and of jobs file loading """
+import json
+import threading
+
+from dell_storage_api.commands import load_jobs
+
+
+def get_calls(dsm, path):
+    return [url for method, url, _ in dsm.transport.calls if method == 'GET' and path in url]
+
+
+def test_cached_name_is_resolved_without_dsm(dsm):
+    volume_id = dsm.add_volume('db01')
+    resolver = dsm.resolver()
+    storage_center = dsm.storage_center()
+    assert resolver.volume_id(storage_center, 'db01') == volume_id
+    assert resolver.volume_id(storage_center, volume_id) == volume_id
+    assert len(get_calls(dsm, '/VolumeList')) == 1
+
+
+def test_stale_cache_is_refreshed(dsm):
+    dsm.add_volume('db01')
+    resolver = dsm.resolver(ttl=0)
+    resolver.volume_id(dsm.storage_center(), 'db01')
+    resolver.volume_id(dsm.storage_center(), 'db01')
+    assert len(get_calls(dsm, '/VolumeList')) == 2
+
+
+def test_cache_miss_refreshes_mapping(dsm):
+    dsm.add_volume('db01')
+    resolver = dsm.resolver()
+    storage_center = dsm.storage_center()
+    resolver.volume_id(storage_center, 'db01')
+    volume_id = dsm.add_volume('db02')
+    assert resolver.volume_id(storage_center, 'db02') == volume_id
+    assert len(get_calls(dsm, '/VolumeList')) == 2
+
+
+def test_verify_detects_recreated_object(dsm):
+    old_id = dsm.add_volume('db01')
+    server_id = dsm.add_server('esx01')
+    resolver = dsm.resolver()
+    storage_center = dsm.storage_center()
+    assert resolver.volume_id(storage_center, 'db01', verify=True) == old_id
+    assert resolver.server_id(storage_center, 'esx01', verify=True) == server_id
+    del dsm.volumes[old_id]
+    new_id = dsm.add_volume('db01')
+    assert resolver.volume_id(storage_center, 'db01') == old_id
+    assert resolver.volume_id(storage_center, 'db01', verify=True) == new_id
+    assert resolver.server_id(storage_center, 'esx01', verify=True) == server_id
+
+
+def test_unknown_and_ambiguous_names_are_not_resolved(dsm, capsys):
+    dsm.add_volume('db01')
+    dsm.add_volume('db01')
+    resolver = dsm.resolver()
+    assert resolver.volume_id(dsm.storage_center(), 'db01') is None
+    assert resolver.volume_id(dsm.storage_center(), 'db09') is None
+    output = capsys.readouterr().out
+    assert "Reference 'db01' is ambiguous, it matches 2 volumes" in output
+    assert "Error: No volume matches 'db09'" in output
+
+
+def test_cache_is_shared_through_cache_file(dsm, tmp_path):
+    volume_id = dsm.add_volume('db01')
+    cache_path = str(tmp_path / 'cache' / 'names.json')
+    resolver = dsm.resolver(cache_path)
+    assert resolver.volume_id(resolver.storage_center('sc1'), 'db01') == volume_id
+    dsm.transport.calls.clear()
+    resolver = dsm.resolver(cache_path)
+    assert resolver.storage_center('sc1').instance_id == dsm.storage_center_id
+    assert resolver.volume_id(dsm.storage_center(), 'db01') == volume_id
+    assert dsm.transport.calls == []
+
+
+def test_concurrent_misses_fetch_mapping_once(dsm):
+    volume_ids = [dsm.add_volume('db%02d' % index) for index in range(8)]
+    resolver = dsm.resolver()
+    storage_center = dsm.storage_center()
+    resolved = {}
+
+    def resolve(index):
+        resolved[index] = resolver.volume_id(storage_center, 'db%02d' % index)
+
+    threads = [threading.Thread(target=resolve, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [resolved[index] for index in range(8)] == volume_ids
+    assert len(get_calls(dsm, '/VolumeList')) == 1
+
+
+def test_load_jobs_verifies_each_distinct_object_once(dsm, tmp_path):
+    volume_ids = [dsm.add_volume('db01'), dsm.add_volume('db02')]
+    server_id = dsm.add_server('esx01')
+    jobs_data = [{'storage_center': 'sc1', 'volume': 'db0%d' % (index % 2 + 1), 'operation': 'map_to_server',
+                  'arguments': {'server_id': 'esx01', 'lun': index}} for index in range(50)]
+    jobs_path = tmp_path / 'jobs.json'
+    jobs_path.write_text(json.dumps(jobs_data), encoding='utf-8')
+    resolver = dsm.resolver()
+    storage_center = dsm.storage_center()
+    resolver.volume_id(storage_center, 'db01')
+    resolver.server_id(storage_center, 'esx01')
+    dsm.transport.calls.clear()
+
+    jobs = load_jobs(resolver, str(jobs_path))
+    assert [(job.volume_id, job.arguments['server_id']) for job in jobs[:2]] == \
+        [(volume_ids[0], server_id), (volume_ids[1], server_id)]
+    assert len(jobs) == 50
+    assert sorted(get_calls(dsm, '/StorageCenter/Sc')) == sorted(
+        ['https://dsm:3033/api/rest/StorageCenter/ScVolume/%s' % volume_id for volume_id in volume_ids] +
+        ['https://dsm:3033/api/rest/StorageCenter/ScServer/%s' % server_id])
+
+
+def test_load_jobs_fails_on_unknown_volume(dsm, tmp_path, capsys):
+    dsm.add_volume('db01')
+    jobs_path = tmp_path / 'jobs.json'
+    jobs_path.write_text(json.dumps([{'storage_center': 'sc1', 'volume': 'db01', 'operation': 'recycle'},
+                                     {'storage_center': 'sc1', 'volume': 'db09', 'operation': 'recycle'}]),
+                         encoding='utf-8')
+    assert load_jobs(dsm.resolver(), str(jobs_path)) is None
+    assert "Error: No volume matches 'db09'" in capsys.readouterr().out
@@ -0,0 +1,96 @@
+""" Tests of structured results of DSM calls (dell_storage_api.result) """
+import threading
+
+import pytest
+
+from dell_storage_api import result as api_result
+from dell_storage_api.result import ApiResult
+from dell_storage_api.session import DsmSession
+from dell_storage_api.transport import MemoryResponse, MemoryTransport, TransportError
+
+URL = 'https://dsm:3033/api/rest/StorageCenter/ScVolume/64702.11'
+
+
+def unreachable(method, url, kwargs):
+    raise TransportError('%s %s - connection refused' % (method, url))
+
+
+def call(status, body=None, decode=False):
+    transport = MemoryTransport()
+    transport.add_route('GET', r'/ScVolume/', status, body)
+    return ApiResult.call('get_volume', transport, 'GET', URL, decode=decode)
+
+
+@pytest.mark.parametrize('status, retryable', [(408, True), (429, True), (500, True), (503, True), (504, True),
+                                               (400, False), (404, False), (409, False)])
+def test_failed_status_is_classified(status, retryable):
+    result = call(status, {'result': 'Rejected'})
+    assert not result
+    assert (result.status_code, result.retryable, result.error_message) == (status, retryable, 'Rejected')
+
+
+def test_successful_call_is_not_retryable():
+    result = call(200, {'instanceId': '64702.11'}, decode=True)
+    assert result and not result.retryable
+    assert (result.value, result.error_message) == ({'instanceId': '64702.11'}, '')
+
+
+def test_call_without_response_is_retryable():
+    transport = MemoryTransport()
+    transport.add_route('GET', r'/ScVolume/', unreachable)
+    result = ApiResult.call('get_volume', transport, 'GET', URL)
+    assert (result.ok, result.status_code, result.retryable) == (False, api_result.STATUS_NO_RESPONSE, True)
+    assert 'connection refused' in result.error_message
+
+
+def test_synthetic_failure_is_not_retryable():
+    assert not ApiResult.failure('expand', ValueError('bad size')).retryable
+    assert ApiResult.failure('expand', 'timeout', api_result.STATUS_NO_RESPONSE).retryable
+
+
+def test_undecodable_successful_response_fails():
+    result = call(200, b'<html>Proxy error</html>', decode=True)
+    assert (result.ok, result.status_code, result.retryable, result.value) == (False, 200, False, None)
+    assert '<html>Proxy error</html>' in result.error_message
+    assert call(200, b'<html>Proxy error</html>')
+
+
+def test_plain_text_error_is_kept():
+    assert call(502, b'Bad gateway').error_message == 'Bad gateway'
+
+
+def test_quiet_silences_report_in_all_threads(capsys):
+    with api_result.quiet():
+        with api_result.quiet():
+            api_result.report('nested')
+        api_result.report('outer')
+        thread = threading.Thread(target=api_result.report, args=('thread',))
+        thread.start()
+        thread.join()
+    api_result.report('loud')
+    assert capsys.readouterr().out == 'loud\n'
+
+
+def test_quiet_is_restored_after_exception(capsys):
+    with pytest.raises(RuntimeError):
+        with api_result.quiet():
+            raise RuntimeError('failed')
+    api_result.report('loud')
+    assert capsys.readouterr().out == 'loud\n'
+
+
+def test_session_survives_unreachable_dsm(capsys):
+    transport = MemoryTransport()
+    for method in ('GET', 'POST'):
+        transport.add_route(method, r'/ApiConnection/', unreachable)
+    session = DsmSession('admin', 'secret', 'dsm', transport=transport)
+    assert not session.login()
+    session.conn_instance_id = '1'
+    assert len(session.storage_centers()) == 0
+    session.logout()
+    session.logout(silent=True)
+    assert capsys.readouterr().out.splitlines() == [
+        "ERROR: Login failed - POST https://dsm:3033/api/rest/ApiConnection/Login - connection refused",
+        "ERROR: Failed to load Storage Center list - GET https://dsm:3033/api/rest/ApiConnection/ApiConnection/1/"
+        "StorageCenterList - connection refused",
+        "WARNING: Logout failed - POST https://dsm:3033/api/rest/ApiConnection/Logout - connection refused"]
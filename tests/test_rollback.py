@@ -0,0 +1,128 @@
+""" Tests of plan execution, rollback and estimates (dell_storage_api.reconcile.Plan) """
+from dell_storage_api.reconcile import Plan, PlanStep, Reconciler
+from dell_storage_api.storage_center import StorageCenter
+from dell_storage_api.throttle import EndpointLatencies
+from dell_storage_api.volume import Volume
+
+NEW_VOLUME = {'volumes': [{'name': 'web01', 'folder': '/web/', 'size': '5GB', 'servers': ['esx01', 'esx02']}]}
+
+
+def populate(dsm):
+    volume_id = dsm.add_volume('db01', size='10GB')
+    dsm.map(volume_id, dsm.add_server('esx01'))
+    dsm.add_server('esx02')
+
+
+def states(plan):
+    return [(step.action, step.state) for step in plan.steps]
+
+
+def test_failed_step_rolls_back_finished_steps(dsm):
+    populate(dsm)
+    dsm.fail('POST', r'/MapToServer$')
+    folders, volumes = dict(dsm.folders), dict(dsm.volumes)
+    plan = Reconciler(dsm.storage_center()).plan(NEW_VOLUME)
+    assert not plan.execute(rollback=True, quiet=True)
+    assert states(plan) == [(PlanStep.CREATE_FOLDER, PlanStep.STATE_ROLLED_BACK),
+                            (PlanStep.CREATE_VOLUME, PlanStep.STATE_ROLLED_BACK),
+                            (PlanStep.MAP, PlanStep.STATE_FAILED),
+                            (PlanStep.MAP, PlanStep.STATE_SKIPPED)]
+    assert plan.steps[2].result.status_code == 500
+    assert (dsm.folders, dsm.volumes) == (folders, volumes)
+    undo_calls = [(method, url) for method, url, _ in dsm.transport.calls if method != 'GET'][-2:]
+    assert undo_calls[0][1].endswith('/Recycle')
+    assert undo_calls[1][0] == 'DELETE' and '/StorageCenter/ScVolumeFolder/' in undo_calls[1][1]
+
+
+def test_failure_without_rollback_skips_dependent_steps(dsm):
+    populate(dsm)
+    dsm.fail('POST', r'/StorageCenter/ScVolume$')
+    desired = {'volumes': NEW_VOLUME['volumes'] + [{'name': 'db01', 'size': '20GB'}]}
+    plan = Reconciler(dsm.storage_center()).plan(desired)
+    assert not plan.execute(quiet=True)
+    assert states(plan) == [(PlanStep.CREATE_FOLDER, PlanStep.STATE_DONE),
+                            (PlanStep.CREATE_VOLUME, PlanStep.STATE_FAILED),
+                            (PlanStep.MAP, PlanStep.STATE_SKIPPED),
+                            (PlanStep.MAP, PlanStep.STATE_SKIPPED),
+                            (PlanStep.EXPAND, PlanStep.STATE_DONE)]
+    assert [folder['name'] for folder in dsm.folders.values()] == ['Volumes', 'web']
+
+
+def test_unmap_is_rolled_back_by_mapping_previous_servers(dsm):
+    populate(dsm)
+    esx02 = [server_id for server_id, server in dsm.servers.items() if server['name'] == 'esx02'][0]
+    dsm.fail('POST', r'/MapToServer$', payload={'Server': esx02})
+    plan = Reconciler(dsm.storage_center()).plan({'volumes': [{'name': 'db01', 'size': '20GB',
+                                                               'servers': ['esx02']}]})
+    assert [[step.action for step in level] for level in plan.levels()] == [[PlanStep.EXPAND], [PlanStep.UNMAP],
+                                                                            [PlanStep.MAP]]
+    assert not plan.execute(rollback=True, quiet=True)
+    assert states(plan) == [(PlanStep.EXPAND, PlanStep.STATE_DONE),
+                            (PlanStep.UNMAP, PlanStep.STATE_ROLLED_BACK),
+                            (PlanStep.MAP, PlanStep.STATE_FAILED)]
+    assert dsm.mapped_servers('db01') == ['esx01']
+
+
+def test_map_is_rolled_back_keeping_previous_servers(dsm):
+    populate(dsm)
+    plan = Reconciler(dsm.storage_center()).plan({'volumes': [{'name': 'db01', 'servers': ['esx01', 'esx02']}]})
+    assert plan.execute(quiet=True)
+    assert dsm.mapped_servers('db01') == ['esx01', 'esx02']
+    assert plan.rollback()
+    assert dsm.mapped_servers('db01') == ['esx01']
+
+
+def test_exception_in_step_fails_only_this_step(dsm, capsys):
+    populate(dsm)
+
+    def broken_create(method, url, kwargs):
+        raise RuntimeError('connection reset')
+
+    dsm.transport.add_route('POST', r'/StorageCenter/ScVolume$', broken_create)
+    plan = Reconciler(dsm.storage_center()).plan(NEW_VOLUME)
+    assert not plan.execute(rollback=True)
+    assert plan.steps[1].state == PlanStep.STATE_FAILED
+    assert 'connection reset' in plan.steps[1].result.error_message
+    assert plan.steps[0].state == PlanStep.STATE_ROLLED_BACK
+    assert "Error: Step #1 create_volume web01" in capsys.readouterr().out
+
+
+def test_failed_undo_is_reported(dsm, capsys):
+    populate(dsm)
+    plan = Reconciler(dsm.storage_center()).plan(NEW_VOLUME)
+    assert plan.execute(quiet=True)
+    dsm.fail('POST', r'/Recycle$')
+    assert not plan.rollback()
+    assert states(plan) == [(PlanStep.CREATE_FOLDER, PlanStep.STATE_DONE),
+                            (PlanStep.CREATE_VOLUME, PlanStep.STATE_DONE),
+                            (PlanStep.MAP, PlanStep.STATE_ROLLED_BACK),
+                            (PlanStep.MAP, PlanStep.STATE_ROLLED_BACK)]
+    assert "Error: Failed to roll back step #1" in capsys.readouterr().out
+    assert dsm.mapped_servers('web01') == []
+
+
+def test_calls_and_estimate(dsm):
+    populate(dsm)
+    storage_center = dsm.storage_center()
+    plan = Plan(storage_center)
+    create = plan.add(PlanStep.CREATE_VOLUME, 'web01', {'size': '5GB', 'folder_id': ''})
+    server_id = [server_id for server_id, server in dsm.servers.items() if server['name'] == 'esx02'][0]
+    plan.add(PlanStep.MAP, 'web01', {'server_id': server_id}, [create])
+    plan.add(PlanStep.EXPAND, 'db01', {'size': '20GB'})
+    volume_id = [volume_id for volume_id, volume in dsm.volumes.items() if volume['name'] == 'db01'][0]
+    plan.volumes['db01'] = Volume(dsm.transport, storage_center.base_url, 'db01', volume_id, '', '', '')
+    assert plan.calls(plan.steps[0]) == [('GET', StorageCenter.VOLUME_FOLDER_LIST_ENDPOINT % '64702'),
+                                         ('POST', Volume.ENDPOINT)]
+    assert plan.calls(plan.steps[1]) == [('POST', Volume.MAPPING_ENDPOINT % '<web01>')]
+    assert plan.calls(plan.steps[2]) == [('POST', Volume.EXPAND_TO_SIZE_ENDPOINT % volume_id)]
+
+    latencies = EndpointLatencies()
+    latencies.record('POST', Volume.ENDPOINT, 2.0)
+    latencies.record('POST', Volume.EXPAND_TO_SIZE_ENDPOINT, 1.0)
+    assert plan.estimate(latencies, max_workers=1) == (4, (2.0 + Plan.DEFAULT_LATENCY) + 1.0 + Plan.DEFAULT_LATENCY)
+    assert plan.estimate(max_workers=4) == (4, 2 * Plan.DEFAULT_LATENCY + Plan.DEFAULT_LATENCY)
+
+    assert plan.execute(quiet=True)
+    assert dsm.folder_path(plan.volumes['web01'].parent_folder_id) == '/'
+    assert dsm.mapped_servers('web01') == ['esx02']
+    assert dsm.volumes[volume_id]['configuredSize'] == '20GB'
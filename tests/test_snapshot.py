@@ -0,0 +1,105 @@
+""" Tests of inventory snapshots shared across processes (dell_storage_api.snapshot) """
+import pytest
+
+from dell_storage_api import columnar
+from dell_storage_api.snapshot import InventorySnapshot, SnapshotFormatError, SnapshotStore
+
+
+def populate(dsm):
+    prod_id = dsm.add_folder('prod', dsm.root_folder_id)
+    dsm.add_volume('db01', prod_id)
+    dsm.add_volume('web01', status='Down')
+    cluster_id = dsm.add_server('cluster', 'ScServerCluster')
+    dsm.add_server('node1', parent_id=cluster_id)
+
+
+def volume_rows(volumes):
+    return sorted((volume.instance_id, volume.name, volume.parent_folder_id, volume.wwid, volume.status)
+                  for volume in volumes)
+
+
+def test_snapshot_round_trip(dsm, tmp_path):
+    populate(dsm)
+    store = SnapshotStore(str(tmp_path / 'snapshots'))
+    fetched = dsm.storage_center()
+    path = fetched.refresh_snapshot(store)
+    assert path == store.path('64702')
+
+    snapshot = InventorySnapshot(path)
+    assert snapshot.storage_center_id == '64702'
+    assert 0 <= snapshot.age() < 60
+    assert sorted(snapshot.sections) == sorted([columnar.KIND_VOLUME, columnar.KIND_SERVER,
+                                                columnar.KIND_VOLUME_FOLDER])
+    assert volume_rows(snapshot.volumes(dsm.transport, fetched.base_url)) == volume_rows(fetched.volume_list())
+    servers = {server.name: server for server in snapshot.servers(dsm.transport, fetched.base_url)}
+    assert (servers['node1'].parent_id, servers['cluster'].type) == (servers['cluster'].instance_id,
+                                                                    'ScServerCluster')
+    folders = snapshot.volume_folders(dsm.transport, fetched.base_url)
+    assert sorted(folders.tree().path(folder.instance_id) for folder in folders) == ['/', '/prod/']
+
+
+def test_listings_are_served_from_snapshot(dsm, tmp_path):
+    populate(dsm)
+    store = SnapshotStore(str(tmp_path))
+    dsm.storage_center().refresh_snapshot(store)
+    dsm.add_volume('db02')
+
+    cached = dsm.storage_center(snapshot_store=store)
+    calls = len(dsm.transport.calls)
+    assert sorted(volume.name for volume in cached.volume_list()) == ['db01', 'web01']
+    assert [volume.name for volume in cached.volume_list(folder_id=dsm.root_folder_id)] == ['web01']
+    assert sorted(server.name for server in cached.server_list()) == ['cluster', 'node1']
+    assert len(cached.volume_folder_list()) == 2
+    assert len(dsm.transport.calls) == calls
+
+    inventory = cached.fetch_inventory(include_mapping=False)
+    assert sorted(volume.name for volume in inventory.volumes) == ['db01', 'db02', 'web01']
+    assert len(dsm.transport.calls) > calls
+
+
+def test_snapshot_is_not_used_after_change(dsm, tmp_path):
+    populate(dsm)
+    store = SnapshotStore(str(tmp_path))
+    cached = dsm.storage_center(snapshot_store=store)
+    cached.refresh_snapshot()
+    assert cached.new_volume('db02', '10GB', dsm.root_folder_id)
+    assert sorted(volume.name for volume in cached.volume_list()) == ['db01', 'db02', 'web01']
+
+
+def test_store_reopens_replaced_snapshot(dsm, tmp_path):
+    populate(dsm)
+    store = SnapshotStore(str(tmp_path))
+    storage_center = dsm.storage_center()
+    storage_center.refresh_snapshot(store)
+    previous = store.get('64702')
+    assert store.get('64702') is previous
+
+    dsm.add_volume('db02')
+    storage_center.refresh_snapshot(store)
+    current = store.get('64702')
+    assert current is not previous
+    assert len(current.volumes(dsm.transport, storage_center.base_url)) == 3
+    assert len(previous.volumes(dsm.transport, storage_center.base_url)) == 2
+
+
+def test_stale_and_missing_snapshots_are_ignored(dsm, tmp_path):
+    populate(dsm)
+    dsm.storage_center().refresh_snapshot(SnapshotStore(str(tmp_path)))
+    assert SnapshotStore(str(tmp_path), max_age=-1).get('64702') is None
+    assert SnapshotStore(str(tmp_path)).get('64703') is None
+
+
+@pytest.mark.parametrize('content', [b'', b'DSSN', b'PK\x03\x04' + b'\x00' * 32])
+def test_corrupted_snapshot_is_ignored(tmp_path, capsys, content):
+    store = SnapshotStore(str(tmp_path))
+    with open(store.path('64702'), 'wb') as snapshot_file:
+        snapshot_file.write(content)
+    assert store.get('64702') is None
+    assert "WARNING: Failed to open inventory snapshot" in capsys.readouterr().out
+
+
+def test_missing_section_is_reported(dsm, tmp_path):
+    populate(dsm)
+    path = dsm.storage_center().refresh_snapshot(SnapshotStore(str(tmp_path)))
+    with pytest.raises(SnapshotFormatError):
+        InventorySnapshot(path).section('snapshot')
@@ -0,0 +1,112 @@
+""" Tests of client side throttling (dell_storage_api.throttle) """
+import threading
+
+from dell_storage_api.storage_center import StorageCenter
+from dell_storage_api.throttle import AdaptiveConcurrencyLimiter, EndpointLatencies, ThrottleRegistry
+from dell_storage_api.transport import MemoryTransport, Transport
+
+BASE_URL = 'https://dsm:3033/api/rest'
+UNMAP = 'POST /StorageCenter/ScVolume/%s/Unmap'
+RECYCLE = 'POST /StorageCenter/ScVolume/%s/Recycle'
+
+
+def finish(limiter, latency, overloaded=False, endpoint=UNMAP):
+    limiter.acquire()
+    limiter.release(latency, overloaded, endpoint)
+
+
+def test_overload_decreases_limit_multiplicatively():
+    limiter = AdaptiveConcurrencyLimiter(initial=8, minimum=2, maximum=16)
+    finish(limiter, 0.1, overloaded=True)
+    assert limiter.limit == 6
+    for _ in range(10):
+        finish(limiter, 0.1, overloaded=True)
+    assert limiter.limit == 2
+    assert limiter.in_flight == 0
+
+
+def test_success_increases_limit_additively():
+    limiter = AdaptiveConcurrencyLimiter(initial=4, minimum=1, maximum=5)
+    for _ in range(3):
+        finish(limiter, 0.1)
+    assert limiter.limit == 4
+    finish(limiter, 0.1)
+    assert limiter.limit == 5
+    for _ in range(20):
+        finish(limiter, 0.1)
+    assert limiter.limit == 5
+
+
+def test_slow_request_decreases_limit():
+    limiter = AdaptiveConcurrencyLimiter(initial=4, minimum=1, maximum=16, latency_tolerance=2.0)
+    finish(limiter, 0.1)
+    finish(limiter, 0.15)
+    assert limiter.limit == 4
+    finish(limiter, 0.5)
+    assert limiter.limit == 3
+
+
+def test_latency_is_compared_per_endpoint():
+    limiter = AdaptiveConcurrencyLimiter(initial=4, minimum=1, maximum=16, latency_tolerance=2.0)
+    finish(limiter, 0.01, endpoint=UNMAP)
+    finish(limiter, 2.0, endpoint=RECYCLE)
+    finish(limiter, 2.5, endpoint=RECYCLE)
+    assert limiter.limit == 4
+    finish(limiter, 2.0, endpoint=UNMAP)
+    assert limiter.limit == 3
+
+
+def test_acquire_waits_for_free_slot():
+    limiter = AdaptiveConcurrencyLimiter(initial=1, minimum=1, maximum=1)
+    limiter.acquire()
+    acquired = threading.Event()
+
+    def acquire():
+        limiter.acquire()
+        acquired.set()
+
+    waiting = threading.Thread(target=acquire)
+    waiting.start()
+    assert not acquired.wait(0.05)
+    limiter.release(0.1, False)
+    assert acquired.wait(5)
+    waiting.join()
+    assert limiter.in_flight == 1
+
+
+def test_endpoint_key_replaces_instance_ids():
+    url = BASE_URL + '/StorageCenter/ScVolume/64702.15/Unmap'
+    assert EndpointLatencies.endpoint_key('post', url) == UNMAP
+    assert EndpointLatencies.endpoint_key('POST', '/StorageCenter/ScVolume/%s/Unmap') == UNMAP
+    assert Transport.storage_center_id(url) == '64702'
+    assert Transport.storage_center_id(BASE_URL + '/StorageCenter/ScVolume', {'StorageCenter': 64703}) == '64703'
+    assert Transport.storage_center_id(BASE_URL + '/StorageCenter/ScVolume/GetList', {'filter': {}}) == ''
+
+
+def test_latencies_survive_save_and_load(tmp_path):
+    latencies = EndpointLatencies()
+    latencies.record('POST', BASE_URL + '/StorageCenter/ScVolume/64702.15/Unmap', 0.5)
+    latencies.record('POST', BASE_URL + '/StorageCenter/ScVolume/64702.16/Unmap', 1.0)
+    path = str(tmp_path / 'latencies' / 'endpoints.json')
+    latencies.save(path)
+
+    loaded = EndpointLatencies()
+    loaded.load(path)
+    loaded.load(str(tmp_path / 'missing.json'))
+    assert len(loaded) == 1
+    endpoint = '/StorageCenter/ScVolume/%s/Unmap'
+    assert loaded.latency('POST', endpoint) == latencies.latency('POST', endpoint) == 0.5 + 0.2 * (1.0 - 0.5)
+    assert loaded.latency('GET', '/StorageCenter/ScVolume/%s', default=0.25) == 0.25
+
+
+def test_queries_use_throttle_of_storage_center():
+    registry = ThrottleRegistry(rate=0, initial_concurrency=4)
+    transport = MemoryTransport(registry)
+    transport.add_route('POST', r'/StorageCenter/ScVolume/GetList$', 503, {'result': 'Busy'})
+    transport.add_route('GET', r'/StorageCenter/StorageCenter/64702/VolumeList$', 200, [])
+    storage_center = StorageCenter(transport, BASE_URL, 'sc1', '64702', '64702', '10.0.0.1')
+    assert len(storage_center.volume_list(folder_id='64702.5')) == 0
+    assert [call[0] for call in transport.calls] == ['POST', 'GET']
+    assert registry.get('dsm:3033', '64702').limiter.limit == 3
+    assert registry.get('dsm:3033', '').limiter.limit == 4
+    assert registry.latencies.latency('POST', StorageCenter.VOLUME_QUERY_ENDPOINT) is not None
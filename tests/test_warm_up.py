@@ -0,0 +1,66 @@
+""" Tests of session warm up and prefetched listings (DsmSession.warm_up and StorageCenter.prefetch) """
+
+
+def populate(dsm):
+    prod = dsm.add_folder('prod', dsm.root_folder_id)
+    dsm.add_server('esx01')
+    dsm.add_volume('db01', prod)
+    return prod
+
+
+def listing_calls(dsm):
+    return sorted(url.rsplit('/', 1)[1] for _, url, _ in dsm.transport.calls)
+
+
+def test_warm_up_prefetches_servers_and_folders(dsm):
+    prod = populate(dsm)
+    resolver = dsm.resolver()
+    storage_centers = resolver.session.warm_up()
+    assert listing_calls(dsm) == ['ServerList', 'StorageCenterList', 'VolumeFolderList']
+    dsm.transport.calls.clear()
+
+    storage_center = resolver.storage_center('sc1')
+    assert storage_center is storage_centers.find_by_instance_id(dsm.storage_center_id)
+    assert [server.name for server in storage_center.server_list()] == ['esx01']
+    assert [folder.name for folder in storage_center.volume_folder_list(prod)] == []
+    assert resolver.volume_folder_id(storage_center, '/prod/') == prod
+    assert len(resolver.session.storage_centers()) == 1
+    assert dsm.transport.calls == []
+
+
+def test_warm_up_without_prefetch_only_discovers_storage_centers(dsm):
+    populate(dsm)
+    session = dsm.resolver().session
+    storage_center = session.warm_up(prefetch=False).find_by_instance_id(dsm.storage_center_id)
+    storage_center.server_list()
+    assert listing_calls(dsm) == ['ServerList', 'StorageCenterList']
+
+
+def test_expired_prefetch_is_fetched_again(dsm):
+    populate(dsm)
+    storage_center = dsm.storage_center()
+    assert storage_center.prefetch()
+    storage_center.PREFETCH_TTL = -1
+    storage_center.server_list()
+    storage_center.server_list()
+    assert listing_calls(dsm) == ['ServerList', 'ServerList', 'ServerList', 'VolumeFolderList']
+
+
+def test_change_discards_prefetched_listing(dsm):
+    prod = populate(dsm)
+    storage_center = dsm.storage_center()
+    storage_center.prefetch()
+    assert storage_center.new_volume_folder('db', prod)
+    assert [folder.name for folder in storage_center.volume_folder_list(prod)] == ['db']
+    assert [server.name for server in storage_center.server_list()] == ['esx01']
+    assert listing_calls(dsm) == ['GetList', 'ScVolumeFolder', 'ServerList', 'VolumeFolderList', 'VolumeFolderList']
+
+
+def test_failed_prefetch_is_fetched_on_demand(dsm, capsys):
+    populate(dsm)
+    dsm.fail('GET', r'/ServerList$')
+    storage_center = dsm.storage_center()
+    assert not storage_center.prefetch()
+    assert "Error: Failed to fetch object list (500)" in capsys.readouterr().out
+    dsm.transport.add_route('GET', r'/ServerList$', 200, list(dsm.servers.values()))
+    assert [server.name for server in storage_center.server_list()] == ['esx01']
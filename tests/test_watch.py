@@ -0,0 +1,96 @@
+""" Tests of change detection (dell_storage_api.watch) """
+from dell_storage_api.watch import ChangeEvent, Watcher, diff_snapshots
+
+from conftest import SC_ID, FakeDsm
+
+
+def events_by_id(events):
+    return {event.instance_id: event for event in events}
+
+
+def test_diff_snapshots():
+    previous = {'1': {'name': 'kept', 'status': 'Up', 'folder': 'f1'},
+                '2': {'name': 'removed', 'status': 'Up'},
+                '3': {'name': 'failing', 'status': 'Up', 'mapping': 'srv1'},
+                '4': {'name': 'remapped', 'status': 'Up', 'mapping': 'srv1'},
+                '5': {'name': 'moved', 'status': 'Up', 'folder': 'f1'},
+                '6': {'name': 'legacy', 'status': 'Up'}}
+    current = {'1': {'name': 'kept', 'status': 'Up', 'folder': 'f1'},
+               '3': {'name': 'failing', 'status': 'Down', 'mapping': ''},
+               '4': {'name': 'remapped', 'status': 'Up', 'mapping': 'srv1,srv2'},
+               '5': {'name': 'moved', 'status': 'Up', 'folder': 'f2'},
+               '6': {'name': 'legacy', 'status': 'Up', 'mapping': 'srv1'},
+               '7': {'name': 'added', 'status': 'Up'}}
+    events = events_by_id(diff_snapshots(SC_ID, 'volume', previous, current))
+    assert {instance_id: event.event_type for instance_id, event in events.items()} == \
+        {'2': ChangeEvent.REMOVED,
+         '3': ChangeEvent.STATUS_CHANGED,
+         '4': ChangeEvent.MAPPING_CHANGED,
+         '5': ChangeEvent.MODIFIED,
+         '7': ChangeEvent.ADDED}
+    assert events['3'].changes == {'status': ['Up', 'Down'], 'mapping': ['srv1', '']}
+    assert events['5'].changes == {'folder': ['f1', 'f2']}
+    assert (events['2'].name, events['7'].name) == ('removed', 'added')
+    assert events['7'].to_dict()['event'] == ChangeEvent.ADDED
+    assert diff_snapshots(SC_ID, 'volume', current, current) == []
+
+
+def test_watch_reports_changes_since_previous_poll(dsm):
+    volume_id = dsm.add_volume('db01')
+    server_id = dsm.add_server('esx01')
+    old_server_id = dsm.add_server('esx00')
+    watcher = Watcher([dsm.storage_center()], include_mapping=True)
+    assert watcher.poll() == []
+
+    dsm.volumes[volume_id]['status'] = 'Down'
+    dsm.map(volume_id, server_id)
+    new_volume_id = dsm.add_volume('db02')
+    del dsm.servers[old_server_id]
+    dsm.add_server('esx02')
+    events = watcher.poll()
+    assert sorted((event.kind, event.event_type, event.name) for event in events) == \
+        [('server', ChangeEvent.ADDED, 'esx02'),
+         ('server', ChangeEvent.REMOVED, 'esx00'),
+         ('volume', ChangeEvent.ADDED, 'db02'),
+         ('volume', ChangeEvent.STATUS_CHANGED, 'db01')]
+    assert events_by_id(events)[volume_id].changes['mapping'] == ['', 'esx01']
+    assert new_volume_id in events_by_id(events)
+    assert watcher.poll() == []
+
+
+def test_failed_listing_is_compared_in_next_poll(dsm):
+    volume_id = dsm.add_volume('db01')
+    watcher = Watcher([dsm.storage_center()], include_servers=False)
+    watcher.poll()
+    dsm.fail('GET', r'/VolumeList$')
+    dsm.volumes[volume_id]['status'] = 'Down'
+    assert watcher.poll() == []
+
+    dsm.transport.add_route('GET', r'/VolumeList$', 200, list(dsm.volumes.values()))
+    assert [event.event_type for event in watcher.poll()] == [ChangeEvent.STATUS_CHANGED]
+
+
+def test_failing_storage_center_does_not_stop_watch(dsm, capsys):
+    healthy = dsm.storage_center()
+    broken = FakeDsm()
+    broken_sc = broken.storage_center()
+    broken_sc.instance_id = '64703'
+    broken_sc.state_snapshot = lambda *args: 1 / 0
+    watcher = Watcher([broken_sc, healthy], interval=0, include_servers=False)
+    dsm.add_volume('db01')
+    received = []
+    events = list(watcher.watch(max_polls=2, callback=received.append))
+    assert events == received == []
+
+    dsm.add_volume('db02')
+    assert [(event.event_type, event.name) for event in watcher.poll()] == [(ChangeEvent.ADDED, 'db02')]
+    assert "Error: Failed to poll storage center '64703'" in capsys.readouterr().out
+
+
+def test_null_references_are_accepted(dsm):
+    volume_id = dsm.add_volume('db01')
+    dsm.volumes[volume_id]['volumeFolder'] = None
+    dsm.add_server('esx01')
+    snapshot = dsm.storage_center().state_snapshot()
+    assert snapshot['volume'][volume_id]['folder'] is None
+    assert [server.name for server in dsm.storage_center().server_list()] == ['esx01']